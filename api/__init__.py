@@ -1,4 +1,5 @@
 from .ebay import ebay_client
 from .chrono24 import chrono24_client
+from .watchcharts import watchcharts_client
 
-__all__ = ["ebay_client", "chrono24_client"]
+__all__ = ["ebay_client", "chrono24_client", "watchcharts_client"]
@@ -0,0 +1,131 @@
+"""
+Record-and-replay of raw marketplace responses.
+
+In "record" mode every live response (eBay search JSON, Chrono24 result
+dicts) is saved to a gzip-compressed cassette keyed by platform and query.
+In "replay" mode the clients never touch the network: responses come from
+the cassettes, with configurable latency and error injection, so full
+Scanner runs are deterministic and benchmarkable offline.
+
+Set CASSETTE_MODE=record|replay (and CASSETTE_DIR) or call cassette.configure().
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import random
+import time
+from datetime import datetime
+from typing import Any, Callable, Optional
+
+import requests
+
+from config import Config
+from metrics import HTTP_ERRORS, HTTP_LATENCY
+
+
+class CassetteMiss(KeyError):
+    """No recorded response for a query in replay mode."""
+
+
+class CassetteStore:
+    """Compressed JSON responses on disk, one file per (platform, query)."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, platform: str, key: dict) -> str:
+        digest = hashlib.sha1(json.dumps(key, sort_keys=True).encode()).hexdigest()
+        return os.path.join(self.directory, platform, f"{digest}.json.gz")
+
+    def save(self, platform: str, key: dict, payload: Any):
+        path = self._path(platform, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        record = {"key": key, "recorded_at": datetime.utcnow().isoformat(), "payload": payload}
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(record, f, default=str)
+        os.replace(tmp_path, path)
+
+    def load(self, platform: str, key: dict) -> Any:
+        path = self._path(platform, key)
+        if not os.path.exists(path):
+            raise CassetteMiss(f"No {platform} cassette for {key}")
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return json.load(f)["payload"]
+
+
+class Cassette:
+    """Routes client fetches to the network, the recorder or the replayer."""
+
+    MODES = ("off", "record", "replay")
+
+    def __init__(self):
+        self.configure(
+            mode=Config.CASSETTE_MODE,
+            directory=Config.CASSETTE_DIR,
+            latency_ms=Config.REPLAY_LATENCY_MS,
+            error_rate=Config.REPLAY_ERROR_RATE,
+            seed=Config.REPLAY_SEED
+        )
+
+    def configure(
+        self,
+        mode: Optional[str] = None,
+        directory: Optional[str] = None,
+        latency_ms: Optional[float] = None,
+        error_rate: Optional[float] = None,
+        seed: Optional[int] = None
+    ):
+        """Change any of the settings; unspecified ones are left as they are."""
+        if mode is not None:
+            if mode not in self.MODES:
+                raise ValueError(f"Unknown cassette mode: {mode}")
+            self.mode = mode
+        if directory is not None:
+            self.store = CassetteStore(directory)
+        if latency_ms is not None:
+            self.latency_ms = latency_ms
+        if error_rate is not None:
+            self.error_rate = error_rate
+        if seed is not None:
+            self._random = random.Random(seed)
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == "replay"
+
+    def fetch(self, platform: str, key: dict, live: Callable[[], Any]) -> Any:
+        """
+        Return the raw response for a query.
+
+        Args:
+            platform: Platform name, used to namespace cassettes
+            key: JSON-serializable description of the request
+            live: Performs the real request and returns its JSON-serializable payload
+        """
+        try:
+            with HTTP_LATENCY.time(platform=platform):
+                if self.replaying:
+                    return self._replay(platform, key)
+                payload = live()
+        except Exception:
+            HTTP_ERRORS.inc(platform=platform)
+            raise
+
+        if self.mode == "record":
+            self.store.save(platform, key, payload)
+        return payload
+
+    def _replay(self, platform: str, key: dict) -> Any:
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        if self.error_rate and self._random.random() < self.error_rate:
+            raise requests.ConnectionError(f"Injected replay error for {platform} {key}")
+        return self.store.load(platform, key)
+
+
+# Singleton instance
+cassette = Cassette()
@@ -4,17 +4,17 @@ Requires FlareSolverr running for Cloudflare bypass.
 """
 
 from typing import Optional
+import importlib.util
 import re
 
+from api.cassette import cassette
+from api.ratelimit import rate_limits
 from config import Config
 
 # Note: chrono24 library requires FlareSolverr
 # docker run -p 8191:8191 flaresolverr/flaresolverr
-try:
-    import chrono24
-    CHRONO24_AVAILABLE = True
-except ImportError:
-    CHRONO24_AVAILABLE = False
+# The library itself is imported on first search (it is slow to import)
+CHRONO24_AVAILABLE = importlib.util.find_spec("chrono24") is not None
 
 
 class Chrono24Client:
@@ -24,8 +24,8 @@ class Chrono24Client:
         self.flaresolverr_url = Config.FLARESOLVERR_URL
 
     def is_available(self) -> bool:
-        """Check if chrono24 library is available."""
-        return CHRONO24_AVAILABLE
+        """Check if chrono24 library is available (or responses are being replayed)."""
+        return CHRONO24_AVAILABLE or cassette.replaying
 
     def search_watches(
         self,
@@ -46,13 +46,30 @@ class Chrono24Client:
         Returns:
             List of normalized listing dictionaries
         """
-        if not CHRONO24_AVAILABLE:
+        return self.search(query, min_price, max_price, limit)["listings"]
+
+    def search(
+        self,
+        query: str,
+        min_price: int = 3000,
+        max_price: Optional[int] = None,
+        limit: int = 50
+    ) -> dict:
+        """
+        Like search_watches, but also reports whether the results are every
+        matching listing ("complete") rather than the first `limit` of them.
+        A failed search is never complete.
+        """
+        if not self.is_available():
             print("chrono24 library not available. Install with: pip install chrono24")
-            return []
+            return {"listings": [], "complete": False}
 
         try:
-            results = chrono24.query(query)
-            listings = results.search(limit=limit)
+            listings = cassette.fetch(
+                "chrono24",
+                {"query": query, "limit": limit},
+                lambda: self._search(query, limit)
+            )
 
             normalized = []
             for listing in listings:
@@ -65,11 +82,19 @@ class Chrono24Client:
 
                 normalized.append(self._normalize_listing(listing, query))
 
-            return normalized
+            # Price filtering happens here, so completeness goes by the raw count
+            return {"listings": normalized, "complete": len(listings) < limit}
 
         except Exception as e:
             print(f"Chrono24 search error: {e}")
-            return []
+            return {"listings": [], "complete": False}
+
+    def _search(self, query: str, limit: int) -> list[dict]:
+        """Run a live chrono24 search and return the raw result dicts."""
+        import chrono24
+
+        rate_limits.acquire("chrono24")
+        return list(chrono24.query(query).search(limit=limit))
 
     def _normalize_listing(self, item: dict, search_query: str) -> dict:
         """Convert Chrono24 item to our normalized listing format."""
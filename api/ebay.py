@@ -8,12 +8,16 @@ from datetime import datetime, timedelta
 from typing import Optional
 import re
 
+from api.cassette import cassette
+from api.ratelimit import rate_limits
 from config import Config
 
 
 class eBayClient:
     """Client for eBay Browse API."""
 
+    GET_ITEMS_BATCH = 20  # Item IDs accepted per getItems request
+
     def __init__(self):
         self.client_id = Config.EBAY_CLIENT_ID
         self.client_secret = Config.EBAY_CLIENT_SECRET
@@ -21,6 +25,10 @@ class eBayClient:
         self._access_token = None
         self._token_expires = None
 
+    def is_available(self) -> bool:
+        """Check if API credentials are configured (or responses are being replayed)."""
+        return bool(self.client_id and self.client_secret) or cassette.replaying
+
     def _get_access_token(self) -> str:
         """Get OAuth access token (cached until expiry)."""
         if self._access_token and self._token_expires and datetime.now() < self._token_expires:
@@ -70,8 +78,16 @@ class eBayClient:
         Returns:
             List of normalized listing dictionaries
         """
-        token = self._get_access_token()
+        return self.search(query, min_price, max_price, limit)["listings"]
 
+    def search_params(
+        self,
+        query: str,
+        min_price: int = 3000,
+        max_price: Optional[int] = None,
+        limit: int = 50
+    ) -> dict:
+        """Query parameters for a search (also the cassette key)."""
         # Build price filter
         price_filter = f"price:[{min_price}.."
         if max_price:
@@ -79,13 +95,18 @@ class eBayClient:
         price_filter += "]"
 
         # Category 31387 is "Wristwatches"
-        params = {
+        return {
             "q": query,
             "filter": f"{price_filter},categoryIds:{{31387}}",
             "limit": limit,
             "sort": "price"
         }
 
+    def _search(self, params: dict) -> dict:
+        """Call the item_summary/search endpoint and return the raw JSON."""
+        rate_limits.acquire("ebay")
+        token = self._get_access_token()
+
         headers = {
             "Authorization": f"Bearer {token}",
             "Content-Type": "application/json",
@@ -96,10 +117,65 @@ class eBayClient:
         response = requests.get(url, headers=headers, params=params)
         response.raise_for_status()
 
-        data = response.json()
+        return response.json()
+
+    def search(
+        self,
+        query: str,
+        min_price: int = 3000,
+        max_price: Optional[int] = None,
+        limit: int = 50
+    ) -> dict:
+        """
+        Like search_watches, but also reports whether the results are every
+        matching listing ("complete") rather than the first `limit` of them.
+        """
+        params = self.search_params(query, min_price, max_price, limit)
+        data = cassette.fetch("ebay", params, lambda: self._search(params))
         items = data.get("itemSummaries", [])
+        total = data.get("total")
+
+        return {
+            "listings": [self._normalize_listing(item, query) for item in items],
+            "complete": total <= len(items) if total is not None else len(items) < limit,
+        }
+
+    def get_items(self, item_ids: list[str]) -> dict[str, dict]:
+        """
+        Look listings up by item ID, GET_ITEMS_BATCH IDs per request.
+        Returns raw items keyed by itemId; ended or unknown items are absent.
+        """
+        items = {}
+        for i in range(0, len(item_ids), self.GET_ITEMS_BATCH):
+            params = {"item_ids": ",".join(item_ids[i:i + self.GET_ITEMS_BATCH])}
+            data = cassette.fetch("ebay", params, lambda: self._get_items(params))
+            for item in data.get("items", []):
+                items[item["itemId"]] = item
+        return items
+
+    @staticmethod
+    def is_item_available(item: dict) -> bool:
+        """False if eBay reports the item as sold out."""
+        return not any(
+            availability.get("estimatedAvailabilityStatus") == "OUT_OF_STOCK"
+            for availability in item.get("estimatedAvailabilities", [])
+        )
+
+    def _get_items(self, params: dict) -> dict:
+        """Call the getItems endpoint and return the raw JSON."""
+        rate_limits.acquire("ebay")
+        token = self._get_access_token()
+
+        headers = {
+            "Authorization": f"Bearer {token}",
+            "X-EBAY-C-MARKETPLACE-ID": "EBAY_US"
+        }
+
+        url = f"{self.base_url}/buy/browse/v1/item/"
+        response = requests.get(url, headers=headers, params=params)
+        response.raise_for_status()
 
-        return [self._normalize_listing(item, query) for item in items]
+        return response.json()
 
     def _normalize_listing(self, item: dict, search_query: str) -> dict:
         """Convert eBay item to our normalized listing format."""
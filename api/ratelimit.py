@@ -0,0 +1,69 @@
+"""
+Request rate limiting for the marketplace clients.
+
+Each platform has a request budget (Config.PLATFORM_RATE_LIMITS) shared by
+all scan workers. Workers don't coordinate per request: each takes an equal
+share of the budget, based on how many workers currently hold scan leases
+(kept up to date by services/scan_queue.py).
+"""
+
+import threading
+import time
+
+from config import Config
+
+
+class RateLimiter:
+    """Token bucket allowing `rate` requests per second, with bursts up to `burst`."""
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def set_rate(self, rate: float):
+        with self._lock:
+            self._refill()
+            self.rate = rate
+
+    def acquire(self):
+        """Block until a request may be made."""
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class PlatformRateLimits:
+    """One limiter per platform, each running at this process's share of the budget."""
+
+    def __init__(self, limits: dict[str, float]):
+        self.limits = dict(limits)
+        self.share = 1.0
+        self._limiters = {platform: RateLimiter(rate) for platform, rate in self.limits.items()}
+
+    def acquire(self, platform: str):
+        limiter = self._limiters.get(platform)
+        if limiter is not None:
+            limiter.acquire()
+
+    def set_share(self, share: float):
+        """Run at `share` (0-1] of each platform's budget, e.g. 1/N with N workers."""
+        self.share = share
+        for platform, limiter in self._limiters.items():
+            limiter.set_rate(self.limits[platform] * share)
+
+
+# Singleton instance
+rate_limits = PlatformRateLimits(Config.PLATFORM_RATE_LIMITS)
@@ -0,0 +1,184 @@
+"""
+WatchCharts API client for market prices.
+
+A reference takes two calls: a search that resolves its brand and
+reference number to a WatchCharts UUID, and an info lookup by UUID for the
+current market price. Callers store the UUID (WatchReference.watchcharts_uuid),
+so each reference is resolved once (see services/market_data.py).
+
+Requests share the "watchcharts" budget in Config.PLATFORM_RATE_LIMITS
+(1 request/second) and go through the cassette recorder like the
+marketplace clients. For local testing, run a stand-in API that serves
+deterministic prices and rejects requests faster than 1/second:
+
+    python -m api.watchcharts serve --port 8767
+    WATCHCHARTS_API_BASE=http://localhost:8767/v3 WATCHCHARTS_API_KEY=test python -m services.market_data refresh
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+from api.cassette import cassette
+from api.ratelimit import rate_limits
+from config import Config
+
+
+class WatchChartsClient:
+    """Client for the WatchCharts v3 API."""
+
+    def __init__(self):
+        self.api_key = Config.WATCHCHARTS_API_KEY
+        self.base_url = Config.WATCHCHARTS_API_BASE.rstrip("/")
+
+    def is_available(self) -> bool:
+        """Check if an API key is configured (or responses are being replayed)."""
+        return bool(self.api_key) or cassette.replaying
+
+    def resolve_uuid(self, brand: str, reference_number: str) -> Optional[str]:
+        """WatchCharts UUID of a reference, or None if WatchCharts doesn't list it."""
+        params = {"brand_name": brand, "reference": reference_number}
+        payload = cassette.fetch(
+            "watchcharts", {"path": "/search/watch", **params}, lambda: self._get("/search/watch", params)
+        )
+
+        # Prefer an exact reference match over the first fuzzy result
+        wanted = _compact(reference_number)
+        results = payload.get("results") or []
+        for result in results:
+            if _compact(result.get("reference")) == wanted:
+                return result["uuid"]
+        return None
+
+    def market_price(self, uuid: str) -> Optional[dict]:
+        """Current prices for a UUID: market_price_usd and dealer_price_usd (None if unknown)."""
+        params = {"uuid": uuid}
+        payload = cassette.fetch(
+            "watchcharts", {"path": "/watch/info", **params}, lambda: self._get("/watch/info", params)
+        )
+
+        market_price = payload.get("market_price")
+        if not market_price or payload.get("currency", "USD") != "USD":
+            return None
+        return {
+            "market_price_usd": float(market_price),
+            "dealer_price_usd": float(payload["dealer_price"]) if payload.get("dealer_price") else None,
+        }
+
+    def _get(self, path: str, params: dict) -> dict:
+        rate_limits.acquire("watchcharts")
+        response = requests.get(
+            f"{self.base_url}{path}",
+            headers={"x-api-key": self.api_key},
+            params=params,
+            timeout=Config.WATCHCHARTS_TIMEOUT
+        )
+        response.raise_for_status()
+        return response.json()
+
+
+def _compact(reference: Optional[str]) -> str:
+    """Reference number without case or separators, e.g. "5711/1A-010" -> "57111a010"."""
+    return "".join(c for c in (reference or "").lower() if c.isalnum())
+
+
+# Singleton instance
+watchcharts_client = WatchChartsClient()
+
+
+class _StandIn(BaseHTTPRequestHandler):
+    """
+    Serves /v3/search/watch and /v3/watch/info with prices derived from the
+    reference, answers 404 to unknown UUIDs and 429 to requests less than
+    0.9s apart.
+    """
+
+    min_interval = 0.9
+    _last_request = 0.0
+    _lock = threading.Lock()
+
+    def do_GET(self):
+        if not self.headers.get("x-api-key"):
+            self._send(401, {"error": "Missing API key"})
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            too_fast = now - _StandIn._last_request < self.min_interval
+            _StandIn._last_request = now
+        if too_fast:
+            self._send(429, {"error": "Rate limit exceeded"})
+            return
+
+        url = urlparse(self.path)
+        params = {name: values[0] for name, values in parse_qs(url.query).items()}
+        if url.path == "/v3/search/watch":
+            reference = params.get("reference", "")
+            uuid = hashlib.md5(f"{params.get('brand_name')}|{reference}".encode()).hexdigest()
+            # References starting with "UNLISTED" aren't on WatchCharts; "NOPRICE" ones have no price
+            if reference.upper().startswith("NOPRICE"):
+                uuid = f"noprice-{uuid}"
+            results = [] if not reference or reference.upper().startswith("UNLISTED") else [{
+                "uuid": uuid,
+                "brand_name": params.get("brand_name"),
+                "reference": reference,
+            }]
+            self._send(200, {"results": results})
+        elif url.path == "/v3/watch/info" and params.get("uuid", "").startswith("noprice-"):
+            self._send(200, {"uuid": params["uuid"], "currency": "USD", "market_price": None, "dealer_price": None})
+        elif url.path == "/v3/watch/info" and re.fullmatch(r"[0-9a-f]{32}", params.get("uuid", "")):
+            # 5,000 - 55,000 USD, fixed per UUID
+            price = 5000 + int(params["uuid"][:8], 16) % 50000
+            self._send(200, {
+                "uuid": params["uuid"],
+                "currency": "USD",
+                "market_price": price,
+                "dealer_price": round(price * 1.12),
+            })
+        else:
+            self._send(404, {"error": "Not found"})
+
+    def _send(self, status: int, payload: dict):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Every request is logged with its status (see BaseHTTPRequestHandler.log_request)
+        print(f"[watchcharts] {format % args}", flush=True)
+
+
+def serve_stand_in(port: int):
+    """Local stand-in for the WatchCharts API."""
+    print(f"WatchCharts stand-in listening on http://localhost:{port}/v3")
+    ThreadingHTTPServer(("", port), _StandIn).serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="WatchCharts API tools.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="Run a local stand-in WatchCharts API")
+    serve.add_argument("--port", type=int, default=8767)
+    lookup = commands.add_parser("lookup", help="Resolve a reference and fetch its price")
+    lookup.add_argument("brand")
+    lookup.add_argument("reference")
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        serve_stand_in(args.port)
+    else:
+        uuid = watchcharts_client.resolve_uuid(args.brand, args.reference)
+        print(f"UUID: {uuid}")
+        if uuid:
+            print(watchcharts_client.market_price(uuid))
@@ -4,47 +4,36 @@ Built with Dash + Plotly
 """
 
 import dash
-from dash import html, dcc, dash_table, callback, Input, Output, State
+from dash import html, dcc, dash_table, callback, Input, Output, State, Patch, no_update
 import dash_bootstrap_components as dbc
-import plotly.express as px
-import plotly.graph_objects as go
-import pandas as pd
+import time
+from bisect import bisect_left
 from datetime import datetime
-
-from models import init_db, get_session, Brand, WatchReference, Listing, ArbitrageOpportunity
-from services import ArbitrageEngine, Scanner
+from contextlib import ExitStack
+import requests
+from flask import Response, abort, g, redirect, request, stream_with_context
+from sqlalchemy.orm import joinedload
+
+from models import get_session, get_generation, Brand, WatchReference, Listing, ArbitrageOpportunity, Generation
+from services import ArbitrageEngine
+from services.events import event_broker
+from services.export import EXPORT_FORMATS, EXPORT_TABLES, export_rows
+from services.images import PLACEHOLDER, image_cache, proxied_src, sniff_type
+from services.pipeline import ScanPipeline
+from services.search import catalog_index
 from config import Config
+from metrics import CALLBACK_LATENCY, CATALOG_SEARCH, IMAGE_REQUESTS, LAST_SCAN_AGE, registry
+from querycount import track_queries
 
-# Initialize database
-init_db()
-
-# Auto-seed if database is empty
-def auto_seed_if_needed():
-    """Seed the database if no brands exist."""
-    session = get_session()
-    brand_count = session.query(Brand).count()
-    session.close()
-
-    if brand_count == 0:
-        print("Database empty - running seed_data.py...")
-        from seed_data import seed_database
-        seed_database()
-        print("Seeding complete!")
-
-auto_seed_if_needed()
+# Importing this module does no database work: the schema and seed data are
+# prepared once before workers start (gunicorn.conf.py, or __main__ below)
+# and pages that query the database are built per request.
 
-# Initialize Dash app with Bootstrap theme
-app = dash.Dash(
-    __name__,
-    external_stylesheets=[dbc.themes.DARKLY],
-    suppress_callback_exceptions=True,
-    title="Watch Arbitrage"
-)
-
-server = app.server  # For deployment
+# Max cards shown in the opportunity feed
+FEED_LIMIT = 50
 
 # Custom CSS for Helvetica font
-app.index_string = '''
+INDEX_STRING = '''
 <!DOCTYPE html>
 <html>
     <head>
@@ -99,8 +88,8 @@ def get_brands():
     return [{"label": b.name, "value": b.id} for b in brands]
 
 
-def get_opportunities(brand_id=None, min_profit=0, min_roi=0, bp_status=None):
-    """Get arbitrage opportunities with filters."""
+def get_opportunities(brand_id=None, min_profit=0, min_roi=0, bp_status=None, ids=None):
+    """Get arbitrage opportunities with filters (optionally restricted to the given IDs)."""
     session = get_session()
     query = session.query(ArbitrageOpportunity).filter(
         ArbitrageOpportunity.is_active == True
@@ -114,14 +103,20 @@ def get_opportunities(brand_id=None, min_profit=0, min_roi=0, bp_status=None):
         query = query.filter(ArbitrageOpportunity.roi_percent >= min_roi)
     if bp_status and bp_status != "all":
         query = query.filter(ArbitrageOpportunity.box_papers_status == bp_status)
+    if ids is not None:
+        query = query.filter(ArbitrageOpportunity.id.in_(ids))
 
-    opportunities = query.order_by(ArbitrageOpportunity.estimated_profit.desc()).limit(50).all()
+    # Load references, brands and listings with the opportunities (no N+1)
+    opportunities = query.options(
+        joinedload(ArbitrageOpportunity.watch_reference).joinedload(WatchReference.brand),
+        joinedload(ArbitrageOpportunity.listing)
+    ).order_by(ArbitrageOpportunity.estimated_profit.desc()).limit(FEED_LIMIT).all()
 
     results = []
     for opp in opportunities:
-        ref = session.query(WatchReference).get(opp.watch_reference_id)
-        brand = session.query(Brand).get(ref.brand_id)
-        listing = session.query(Listing).get(opp.listing_id)
+        ref = opp.watch_reference
+        brand = ref.brand
+        listing = opp.listing
 
         results.append({
             "id": opp.id,
@@ -185,59 +180,60 @@ navbar = dbc.Navbar(
 )
 
 
-# Filter bar
-filter_bar = dbc.Card([
-    dbc.CardBody([
-        dbc.Row([
-            dbc.Col([
-                html.Label("Brand", className="text-muted small"),
-                dbc.Select(
-                    id="brand-filter",
-                    options=[{"label": "All Brands", "value": ""}] + get_brands(),
-                    value=""
-                )
-            ], md=3),
-            dbc.Col([
-                html.Label("Min Profit ($)", className="text-muted small"),
-                dcc.Input(
-                    id="min-profit-filter",
-                    type="number",
-                    value=0,
-                    min=0,
-                    className="form-control"
-                )
-            ], md=2),
-            dbc.Col([
-                html.Label("Min ROI (%)", className="text-muted small"),
-                dcc.Input(
-                    id="min-roi-filter",
-                    type="number",
-                    value=0,
-                    min=0,
-                    className="form-control"
-                )
-            ], md=2),
-            dbc.Col([
-                html.Label("Box & Papers", className="text-muted small"),
-                dbc.Select(
-                    id="bp-filter",
-                    options=[
-                        {"label": "All", "value": "all"},
-                        {"label": "Full Set", "value": "full_set"},
-                        {"label": "Papers Only", "value": "papers_only"},
-                        {"label": "Box Only", "value": "box_only"},
-                        {"label": "None", "value": "none"},
-                    ],
-                    value="all"
-                )
-            ], md=3),
-            dbc.Col([
-                html.Label(" ", className="text-muted small d-block"),
-                dbc.Button("Apply Filters", id="apply-filters", color="primary", className="w-100")
-            ], md=2),
+# Filter bar (built per page load so new brands show up)
+def make_filter_bar():
+    return dbc.Card([
+        dbc.CardBody([
+            dbc.Row([
+                dbc.Col([
+                    html.Label("Brand", className="text-muted small"),
+                    dbc.Select(
+                        id="brand-filter",
+                        options=[{"label": "All Brands", "value": ""}] + get_brands(),
+                        value=""
+                    )
+                ], md=3),
+                dbc.Col([
+                    html.Label("Min Profit ($)", className="text-muted small"),
+                    dcc.Input(
+                        id="min-profit-filter",
+                        type="number",
+                        value=0,
+                        min=0,
+                        className="form-control"
+                    )
+                ], md=2),
+                dbc.Col([
+                    html.Label("Min ROI (%)", className="text-muted small"),
+                    dcc.Input(
+                        id="min-roi-filter",
+                        type="number",
+                        value=0,
+                        min=0,
+                        className="form-control"
+                    )
+                ], md=2),
+                dbc.Col([
+                    html.Label("Box & Papers", className="text-muted small"),
+                    dbc.Select(
+                        id="bp-filter",
+                        options=[
+                            {"label": "All", "value": "all"},
+                            {"label": "Full Set", "value": "full_set"},
+                            {"label": "Papers Only", "value": "papers_only"},
+                            {"label": "Box Only", "value": "box_only"},
+                            {"label": "None", "value": "none"},
+                        ],
+                        value="all"
+                    )
+                ], md=3),
+                dbc.Col([
+                    html.Label(" ", className="text-muted small d-block"),
+                    dbc.Button("Apply Filters", id="apply-filters", color="primary", className="w-100")
+                ], md=2),
+            ])
         ])
-    ])
-], className="mb-4")
+    ], className="mb-4")
 
 
 # Opportunity card component
@@ -257,7 +253,7 @@ def make_opportunity_card(opp):
         dbc.Row([
             dbc.Col([
                 html.Img(
-                    src=opp["image"] or "https://via.placeholder.com/120",
+                    src=proxied_src(opp["image"]),
                     style={"width": "100%", "maxWidth": "120px", "borderRadius": "8px"}
                 )
             ], width=2, className="d-flex align-items-center"),
@@ -299,61 +295,218 @@ def make_opportunity_card(opp):
 
 
 # Main dashboard layout
-dashboard_layout = html.Div([
-    # Stats row
-    dbc.Row([
-        dbc.Col([
-            dbc.Card([
-                dbc.CardBody([
-                    html.H6("Active Opportunities", className="text-muted"),
-                    html.H3(id="stat-opportunities", children="0", className="text-success")
+def make_dashboard_layout():
+    return html.Div([
+        # Stats row
+        dbc.Row([
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardBody([
+                        html.H6("Active Opportunities", className="text-muted"),
+                        html.H3(id="stat-opportunities", children="0", className="text-success")
+                    ])
                 ])
-            ])
-        ], md=4),
-        dbc.Col([
-            dbc.Card([
-                dbc.CardBody([
-                    html.H6("Total Listings", className="text-muted"),
-                    html.H3(id="stat-listings", children="0")
+            ], md=4),
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardBody([
+                        html.H6("Total Listings", className="text-muted"),
+                        html.H3(id="stat-listings", children="0")
+                    ])
                 ])
-            ])
-        ], md=4),
-        dbc.Col([
-            dbc.Card([
-                dbc.CardBody([
-                    html.H6("Avg Profit", className="text-muted"),
-                    html.H3(id="stat-avg-profit", children="$0", className="text-success")
+            ], md=4),
+            dbc.Col([
+                dbc.Card([
+                    dbc.CardBody([
+                        html.H6("Avg Profit", className="text-muted"),
+                        html.H3(id="stat-avg-profit", children="$0", className="text-success")
+                    ])
                 ])
-            ])
-        ], md=4),
-    ], className="mb-4"),
+            ], md=4),
+        ], className="mb-4"),
+
+        # Filters
+        make_filter_bar(),
+
+        # Opportunities list
+        html.Div(id="opportunities-list"),
+
+        # Scan status
+        dcc.Loading(
+            id="loading-scan",
+            type="default",
+            children=html.Div(id="scan-output")
+        ),
+
+        # Auto-refresh interval (every 5 minutes). Each tick only looks up the
+        # scan generation; the feed and stats re-render when it changes.
+        dcc.Interval(id="refresh-interval", interval=5*60*1000, n_intervals=0),
+        dcc.Store(id="scan-generation"),
+        dcc.Store(id="feed-key"),
+
+        # Diffs pushed over /events by assets/live_updates.js
+        dcc.Store(id="live-update")
+    ])
 
-    # Filters
-    filter_bar,
 
-    # Opportunities list
-    html.Div(id="opportunities-list"),
+def make_explorer_layout():
+    return html.Div([
+        html.H3("Watch Explorer"),
+        # Options come from the catalog index as you type (search_catalog)
+        dcc.Dropdown(
+            id="catalog-search",
+            placeholder="Search by reference, model or collection, e.g. 126610 or 5711 1a",
+            search_order="original",
+            className="mb-4",
+            style={"color": "#212529"}
+        ),
+        html.Div(id="reference-details")
+    ])
 
-    # Scan status
-    dcc.Loading(
-        id="loading-scan",
-        type="default",
-        children=html.Div(id="scan-output")
-    ),
 
-    # Auto-refresh interval (every 5 minutes)
-    dcc.Interval(id="refresh-interval", interval=5*60*1000, n_intervals=0)
-])
+def get_reference_details(reference_id):
+    """A reference with its active listings summarized per platform."""
+    from sqlalchemy import func
+    session = get_session()
+    ref = session.query(WatchReference).options(
+        joinedload(WatchReference.brand)
+    ).filter(WatchReference.id == reference_id).first()
+    if ref is None:
+        session.close()
+        return None
+
+    platforms = session.query(
+        Listing.platform, func.count(Listing.id), func.min(Listing.price_usd), func.avg(Listing.price_usd)
+    ).filter(
+        Listing.watch_reference_id == reference_id,
+        Listing.is_active == True,
+        Listing.duplicate_of_id.is_(None)
+    ).group_by(Listing.platform).all()
+
+    details = {
+        "brand": ref.brand.name,
+        "model": ref.model_name,
+        "reference": ref.reference_number,
+        "collection": ref.collection,
+        "platforms": [
+            {"platform": platform, "listings": count, "lowest": lowest, "average": average}
+            for platform, count, lowest, average in platforms
+        ],
+    }
+    session.close()
+    return details
 
 
 # App layout with routing
-app.layout = html.Div([
-    dcc.Location(id="url", refresh=False),
-    navbar,
-    dbc.Container([
-        html.Div(id="page-content")
-    ], fluid=True, className="px-4")
-])
+def serve_layout():
+    return html.Div([
+        dcc.Location(id="url", refresh=False),
+        navbar,
+        dbc.Container([
+            html.Div(id="page-content")
+        ], fluid=True, className="px-4")
+    ])
+
+
+# Server-sent events for live feed updates
+def events():
+    def current_generation():
+        session = get_session()
+        try:
+            return get_generation(session)
+        finally:
+            session.close()
+
+    subscription = event_broker.subscribe()
+    if subscription is None:
+        # Every stream slot of this worker is taken; the dashboard still
+        # polls the generation, and live_updates.js tries again later
+        return Response("Too many live update streams", status=503, headers={"Retry-After": "60"})
+    return Response(
+        stream_with_context(event_broker.stream(subscription, poll=current_generation)),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+# Bulk export, e.g. /export/listings.csv?active=1
+def export(table, fmt):
+    if table not in EXPORT_TABLES or fmt not in EXPORT_FORMATS:
+        abort(404)
+
+    active_only = request.args.get("active", "0").lower() in ("1", "true")
+    return Response(
+        stream_with_context(export_rows(table, fmt, active_only=active_only)),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f"attachment; filename={table}.{fmt}"}
+    )
+
+
+# Card thumbnails, fetched once and then served from the disk cache
+def image_proxy():
+    try:
+        data, key, cached = image_cache.get(request.args.get("url", ""))
+    except (ValueError, OSError, requests.RequestException) as e:
+        IMAGE_REQUESTS.inc(result="error")
+        print(f"Image proxy error: {e}")
+        return redirect(PLACEHOLDER)
+
+    IMAGE_REQUESTS.inc(result="hit" if cached else "miss")
+    response = Response(data, mimetype=sniff_type(data))
+    response.set_etag(key)
+    response.cache_control.public = True
+    response.cache_control.max_age = Config.IMAGE_MAX_AGE
+    response.cache_control.immutable = True
+    return response.make_conditional(request)
+
+
+# Per-request SQL statement budgets (development)
+def start_query_tracking():
+    # Streaming routes outlive the request; skip them
+    if not Config.QUERY_TRACKING or request.path in ("/events",) or request.path.startswith("/export/"):
+        return
+    payload = request.get_json(silent=True) if request.is_json else None
+    name = (payload or {}).get("output") or f"{request.method} {request.path}"
+    g.query_tracking = ExitStack()
+    g.query_tracking.enter_context(track_queries(name))
+
+
+def stop_query_tracking(exc):
+    tracking = g.pop("query_tracking", None)
+    if tracking is not None:
+        tracking.close()
+
+
+# Dash callback timing, labelled by callback output ID
+def start_callback_timer():
+    if request.path.endswith("/_dash-update-component"):
+        g.callback_started = time.perf_counter()
+
+
+def record_callback_latency(response):
+    started = g.pop("callback_started", None)
+    if started is not None:
+        payload = request.get_json(silent=True) or {}
+        CALLBACK_LATENCY.observe(time.perf_counter() - started, callback=payload.get("output", "unknown"))
+    return response
+
+
+# Prometheus metrics
+def metrics_endpoint():
+    """
+    This process's metrics (see metrics.py). Counters and histograms only
+    cover work done in this worker: scans run by cli.py, the pipeline or
+    scan queue workers aren't counted here, except for the last scan age,
+    which is read from the database.
+    """
+    session = get_session()
+    last_scan = session.query(Generation.updated_at).filter(Generation.name == "scan_completed").scalar()
+    session.close()
+
+    if last_scan:
+        LAST_SCAN_AGE.set((datetime.utcnow() - last_scan).total_seconds())
+
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
 
 
 # Routing callback
@@ -363,30 +516,113 @@ app.layout = html.Div([
 )
 def display_page(pathname):
     if pathname == "/explorer":
-        return html.Div([
-            html.H3("Watch Explorer"),
-            html.P("Coming soon - browse all watches and compare prices.", className="text-muted")
-        ])
+        return make_explorer_layout()
     elif pathname == "/market":
         return html.Div([
             html.H3("Market Overview"),
             html.P("Coming soon - brand trends and top movers.", className="text-muted")
         ])
     else:
-        return dashboard_layout
+        return make_dashboard_layout()
+
+
+# Explorer typeahead, answered from the in-memory catalog index
+@callback(
+    Output("catalog-search", "options"),
+    Input("catalog-search", "search_value"),
+    [State("catalog-search", "value"),
+     State("catalog-search", "options")]
+)
+def search_catalog(search_value, value, options):
+    if not search_value:
+        return no_update
+
+    catalog_index.ensure_loaded()
+    start = time.perf_counter()
+    results = catalog_index.search(search_value)
+    CATALOG_SEARCH.observe(time.perf_counter() - start)
+
+    # "search" repeats the query so the dropdown's own filter keeps every match
+    matches = [{"label": entry["label"], "value": entry["id"], "search": search_value} for entry in results]
+
+    # Keep the selected option, or the dropdown would clear it
+    if value is not None and all(option["value"] != value for option in matches):
+        matches += [option for option in options or [] if option["value"] == value]
+    return matches
+
+
+@callback(
+    Output("reference-details", "children"),
+    Input("catalog-search", "value")
+)
+def show_reference(reference_id):
+    if reference_id is None:
+        return None
+    details = get_reference_details(reference_id)
+    if details is None:
+        return dbc.Alert("Reference not found.", color="warning")
+
+    rows = [
+        html.Tr([
+            html.Td(p["platform"].title()),
+            html.Td(p["listings"]),
+            html.Td(f"${p['lowest']:,.0f}"),
+            html.Td(f"${p['average']:,.0f}"),
+        ])
+        for p in details["platforms"]
+    ]
+    return dbc.Card([
+        dbc.CardBody([
+            html.H4(f"{details['brand']} {details['model']}", className="card-title"),
+            html.H6(
+                " · ".join(filter(None, [details["reference"], details["collection"]])),
+                className="text-muted mb-3"
+            ),
+            dbc.Table([
+                html.Thead(html.Tr([html.Th("Platform"), html.Th("Listings"), html.Th("Lowest"), html.Th("Average")])),
+                html.Tbody(rows)
+            ], size="sm", className="mb-0") if rows else html.P("No active listings.", className="text-muted mb-0"),
+        ])
+    ])
+
+
+# Poll the scan generation (one tiny lookup per interval)
+@callback(
+    Output("scan-generation", "data"),
+    Input("refresh-interval", "n_intervals"),
+    State("scan-generation", "data")
+)
+def check_generation(n_intervals, current):
+    session = get_session()
+    generation = get_generation(session)
+    session.close()
+
+    if generation == current:
+        return no_update
+    return generation
 
 
 # Update opportunities list
 @callback(
-    Output("opportunities-list", "children"),
+    [Output("opportunities-list", "children"),
+     Output("feed-key", "data")],
     [Input("apply-filters", "n_clicks"),
-     Input("refresh-interval", "n_intervals")],
+     Input("scan-generation", "data")],
     [State("brand-filter", "value"),
      State("min-profit-filter", "value"),
      State("min-roi-filter", "value"),
-     State("bp-filter", "value")]
+     State("bp-filter", "value"),
+     State("feed-key", "data")]
 )
-def update_opportunities(n_clicks, n_intervals, brand_id, min_profit, min_roi, bp_status):
+def update_opportunities(n_clicks, generation, brand_id, min_profit, min_roi, bp_status, feed_key):
+    if generation is None:
+        return no_update, no_update
+
+    # Skip the rebuild when neither the data nor the filters changed
+    filters = [brand_id, min_profit, min_roi, bp_status]
+    if feed_key and feed_key["generation"] == generation and feed_key["filters"] == filters:
+        return no_update, no_update
+
     opportunities = get_opportunities(
         brand_id=brand_id if brand_id else None,
         min_profit=min_profit or 0,
@@ -394,18 +630,86 @@ def update_opportunities(n_clicks, n_intervals, brand_id, min_profit, min_roi, b
         bp_status=bp_status
     )
 
+    # Remember which cards are shown (in order) so live updates can patch them
+    key = {
+        "generation": generation,
+        "filters": filters,
+        "cards": [[opp["id"], opp["profit"]] for opp in opportunities]
+    }
+
     if not opportunities:
         return dbc.Alert(
             "No arbitrage opportunities found. Try adjusting filters or run a scan.",
             color="info"
-        )
+        ), key
 
-    return html.Div([make_opportunity_card(opp) for opp in opportunities])
+    return [make_opportunity_card(opp) for opp in opportunities], key
+
+
+# Apply a pushed diff to just the affected cards
+@callback(
+    [Output("opportunities-list", "children", allow_duplicate=True),
+     Output("feed-key", "data", allow_duplicate=True),
+     Output("scan-generation", "data", allow_duplicate=True)],
+    Input("live-update", "data"),
+    [State("brand-filter", "value"),
+     State("min-profit-filter", "value"),
+     State("min-roi-filter", "value"),
+     State("bp-filter", "value"),
+     State("feed-key", "data")],
+    prevent_initial_call=True
+)
+def apply_live_update(update, brand_id, min_profit, min_roi, bp_status, feed_key):
+    if not update or not feed_key or update["generation"] <= feed_key["generation"]:
+        return no_update, no_update, no_update
+
+    cards = feed_key["cards"]
+
+    # Updated cards are removed and re-inserted at their new position
+    removed = set(update["retired"]) | set(update.get("updated", []))
+
+    # An empty feed is an alert, and a full feed may have hidden cards that
+    # move up after removals; both need a full re-render
+    if not cards or (len(cards) >= FEED_LIMIT and any(c[0] in removed for c in cards)):
+        return no_update, no_update, update["generation"]
+
+    patch = Patch()
+    for index in reversed(range(len(cards))):
+        if cards[index][0] in removed:
+            del patch[index]
+    cards = [c for c in cards if c[0] not in removed]
+
+    added = get_opportunities(
+        brand_id=brand_id if brand_id else None,
+        min_profit=min_profit or 0,
+        min_roi=min_roi or 0,
+        bp_status=bp_status,
+        ids=update["added"] + update.get("updated", [])
+    )
+
+    # Cards are ordered by profit (descending); insert each at its position
+    for opp in added:
+        position = bisect_left([-c[1] for c in cards], -opp["profit"])
+        if position >= FEED_LIMIT:
+            continue
+        patch.insert(position, make_opportunity_card(opp))
+        cards.insert(position, [opp["id"], opp["profit"]])
+
+    while len(cards) > FEED_LIMIT:
+        del patch[len(cards) - 1]
+        cards.pop()
+
+    if not cards:
+        return no_update, no_update, update["generation"]
+
+    key = dict(feed_key, generation=update["generation"], cards=cards)
+    return patch, key, update["generation"]
 
 
 # Scan button callback
 @callback(
-    Output("scan-output", "children"),
+    [Output("scan-output", "children"),
+     Output("scan-generation", "data", allow_duplicate=True)],
     Input("scan-button", "n_clicks"),
     prevent_initial_call=True
 )
@@ -425,20 +729,21 @@ def run_scan(n_clicks):
                 return dbc.Alert(
                     "No watch references in database. Seeding failed.",
                     color="danger"
-                )
-
-            print("Creating scanner...")
-            scanner = Scanner()
-
-            print("Starting scan_all_references...")
-            stats = scanner.scan_all_references()
-            print(f"Scan stats: {stats}")
+                ), no_update
+
+            # Scan and analyze together; opportunities are committed per reference
+            print("Starting scan pipeline...")
+            stats = ScanPipeline().run()
+            opportunities = stats["opportunities"]
+            print(
+                f"Scan stats: {stats['references_scanned']} references, "
+                f"{stats['ebay_listings']} eBay + {stats['chrono24_listings']} Chrono24 listings, "
+                f"{len(stats['errors'])} errors in {stats['seconds']:.1f}s"
+            )
 
-            # Run arbitrage detection
-            print("Running arbitrage detection...")
             session = get_session()
-            engine = ArbitrageEngine(session)
-            opportunities = engine.analyze_all()
+            ArbitrageEngine(session).compact()
+            generation = get_generation(session)
             session.close()
 
             print(f"=== SCAN COMPLETE: {len(opportunities)} opportunities ===")
@@ -448,7 +753,7 @@ def run_scan(n_clicks):
                 f"{stats['ebay_listings']} eBay + {stats['chrono24_listings']} Chrono24 listings.",
                 color="success",
                 dismissable=True
-            )
+            ), generation
         except Exception as e:
             import traceback
             error_msg = traceback.format_exc()
@@ -457,8 +762,8 @@ def run_scan(n_clicks):
                 f"Scan failed: {str(e)}",
                 color="danger",
                 dismissable=True
-            )
-    return ""
+            ), no_update
+    return "", no_update
 
 
 # Update stats
@@ -466,9 +771,12 @@ def run_scan(n_clicks):
     [Output("stat-opportunities", "children"),
      Output("stat-listings", "children"),
      Output("stat-avg-profit", "children")],
-    Input("refresh-interval", "n_intervals")
+    Input("scan-generation", "data")
 )
-def update_stats(n):
+def update_stats(generation):
+    if generation is None:
+        return no_update, no_update, no_update
+
     session = get_session()
 
     opps = session.query(ArbitrageOpportunity).filter(
@@ -487,5 +795,38 @@ def update_stats(n):
     return str(opps), str(listings), f"${avg:,.0f}"
 
 
+def create_app() -> dash.Dash:
+    """Build the Dash app and its Flask routes. Does no database work."""
+    dash_app = dash.Dash(
+        __name__,
+        external_stylesheets=[dbc.themes.DARKLY],
+        suppress_callback_exceptions=True,
+        title="Watch Arbitrage"
+    )
+    dash_app.index_string = INDEX_STRING
+    dash_app.layout = serve_layout
+
+    flask_app = dash_app.server
+    flask_app.add_url_rule("/events", view_func=events)
+    flask_app.add_url_rule("/export/<table>.<fmt>", view_func=export)
+    flask_app.add_url_rule("/metrics", view_func=metrics_endpoint)
+    flask_app.add_url_rule("/img", view_func=image_proxy)
+    flask_app.before_request(start_query_tracking)
+    flask_app.teardown_request(stop_query_tracking)
+    flask_app.before_request(start_callback_timer)
+    flask_app.after_request(record_callback_latency)
+    return dash_app
+
+
+app = create_app()
+server = app.server  # For deployment
+
+
 if __name__ == "__main__":
+    from models import init_db
+    from seed_data import seed_if_empty
+
+    init_db()
+    seed_if_empty()
+    catalog_index.ensure_loaded()
     app.run(debug=Config.DEBUG, host="0.0.0.0", port=8050)
@@ -0,0 +1,44 @@
+// Subscribe to server-sent events from /events and hand them to Dash.
+// "opportunities" carries a diff of added/retired IDs that is patched into
+// the feed; "generation" means something changed elsewhere, so re-render.
+(function () {
+    if (!window.EventSource) {
+        return;
+    }
+
+    // The browser reconnects by itself when the server ends a stream, but
+    // gives up on an error response (503 when the worker has no free stream
+    // slots), so try again after a while
+    var RETRY_MS = 60000;
+
+    function setProps(id, props) {
+        if (!window.dash_clientside || !window.dash_clientside.set_props) {
+            return;
+        }
+        try {
+            window.dash_clientside.set_props(id, props);
+        } catch (err) {
+            // The stores only exist on the dashboard page
+        }
+    }
+
+    function connect() {
+        var source = new EventSource("/events");
+
+        source.addEventListener("opportunities", function (event) {
+            setProps("live-update", {data: JSON.parse(event.data)});
+        });
+
+        source.addEventListener("generation", function (event) {
+            setProps("scan-generation", {data: JSON.parse(event.data).generation});
+        });
+
+        source.onerror = function () {
+            if (source.readyState === EventSource.CLOSED) {
+                setTimeout(connect, RETRY_MS);
+            }
+        };
+    }
+
+    connect();
+})();
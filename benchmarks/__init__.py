@@ -0,0 +1,3 @@
+"""
+Benchmarks. Run individual modules with `python -m benchmarks.<name>`.
+"""
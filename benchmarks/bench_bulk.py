@@ -0,0 +1,130 @@
+"""
+Listing ingest throughput: ORM session.add, a plain executemany INSERT and
+services.bulk.load_listings (COPY + ON CONFLICT merge on Postgres,
+executemany upsert on SQLite), inserting N fresh listings and then
+reloading them all with changed prices (every row an update).
+
+Runs against a fresh SQLite database unless --database-url is given. Point
+it at a scratch Postgres database to measure the COPY path; the catalog is
+seeded there and the benchmark's listings are deleted afterwards:
+
+    python -m benchmarks.bench_bulk [--rows 1000000] [--orm-rows 100000]
+    python -m benchmarks.bench_bulk --database-url postgresql://localhost/watches_bench
+
+The ORM insert is timed on --orm-rows rows, as it's too slow to run at 1M.
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime
+
+PREFIX = "bulkbench_"
+
+
+def listing_rows(reference_ids: list[int], n_rows: int, seed: int, price_factor: float = 1.0):
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    for i in range(n_rows):
+        price = round(rng.uniform(3_000, 60_000) * price_factor, 2)
+        platform = "ebay" if i % 2 else "chrono24"
+        yield {
+            "watch_reference_id": reference_ids[i % len(reference_ids)],
+            "platform": platform,
+            "external_id": f"{PREFIX}{platform}_{i}",
+            "price": price,
+            "currency": "USD",
+            "price_usd": price,
+            "box_papers_status": rng.choice(["full_set", "papers_only", "box_only", "none"]),
+            "condition": "Pre-owned",
+            "seller_name": f"seller_{rng.randrange(5_000)}",
+            "seller_rating": round(rng.uniform(90, 100), 1),
+            "listing_url": f"https://example.com/listing/{i}",
+            "location": "United States",
+            "is_active": True,
+            "scraped_at": now,
+            "created_at": now,
+        }
+
+
+def run(n_rows: int, orm_rows: int, batch_size: int, seed: int):
+    from sqlalchemy import insert
+    from models import init_db, get_session, Listing, WatchReference
+    from seed_data import seed_database
+    from services.bulk import load_listings
+
+    init_db()
+    seed_database()
+    session = get_session()
+    reference_ids = [ref_id for (ref_id,) in session.query(WatchReference.id).order_by(WatchReference.id)]
+    print(f"\n{session.get_bind().dialect.name}, {n_rows:,} rows, batches of {batch_size:,}")
+
+    def clear():
+        session.query(Listing).filter(Listing.external_id.like(f"{PREFIX}%")).delete(synchronize_session=False)
+        session.commit()
+
+    def orm_insert(rows):
+        for i, row in enumerate(rows, 1):
+            session.add(Listing(**row))
+            if i % batch_size == 0:
+                session.commit()
+        session.commit()
+
+    def executemany(rows):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == batch_size:
+                session.execute(insert(Listing), batch)
+                session.commit()
+                batch = []
+        if batch:
+            session.execute(insert(Listing), batch)
+            session.commit()
+
+    def timed(label, count, load):
+        start = time.perf_counter()
+        load()
+        elapsed = time.perf_counter() - start
+        print(f"  {label:<28} {count:>10,} rows {elapsed:>8.2f}s {count / elapsed:>10,.0f} rows/s")
+
+    try:
+        clear()
+        timed("ORM session.add", orm_rows, lambda: orm_insert(listing_rows(reference_ids, orm_rows, seed)))
+        clear()
+        timed("executemany INSERT", n_rows, lambda: executemany(listing_rows(reference_ids, n_rows, seed)))
+        clear()
+        timed("load_listings (insert)", n_rows,
+              lambda: load_listings(session, listing_rows(reference_ids, n_rows, seed), batch_size))
+        timed("load_listings (update)", n_rows,
+              lambda: load_listings(session, listing_rows(reference_ids, n_rows, seed, 0.95), batch_size))
+    finally:
+        clear()
+        session.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark bulk listing ingest.")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--orm-rows", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--database-url", help="Scratch database to use instead of a fresh SQLite file")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    orm_rows = min(args.orm_rows, args.rows)
+
+    # Point the app at the benchmark database (and no SQL echo) before models is imported
+    os.environ["DEBUG"] = "false"
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+        run(args.rows, orm_rows, args.batch_size, args.seed)
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bulk.db')}"
+        run(args.rows, orm_rows, args.batch_size, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Catalog import throughput: a synthetic catalog (default 30k references
+across 60 brands) imported into a fresh SQLite database, then re-imported
+unchanged (idempotency) and with a share of rows edited (updates).
+
+Usage:
+    python -m benchmarks.bench_catalog [--references 30000] [--format csv|ndjson]
+"""
+
+import argparse
+import csv
+import json
+import os
+import random
+import tempfile
+import time
+
+BRANDS = 60
+EDITED_SHARE = 0.1
+
+
+def write_catalog(path: str, n_references: int, fmt: str, seed: int, edited_share: float = 0.0):
+    rng = random.Random(seed)
+    fields = ["brand", "reference_number", "model_name", "collection", "case_size_mm", "movement"]
+    rows = (
+        {
+            "brand": f"Brand {i % BRANDS}",
+            "reference_number": f"REF-{i:06d}",
+            "model_name": f"Model {i}" + (" (rev)" if rng.random() < edited_share else ""),
+            "collection": f"Collection {i % 40}",
+            "case_size_mm": 36 + i % 9,
+            "movement": "Automatic",
+        }
+        for i in range(n_references)
+    )
+
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(rows)
+        else:
+            for row in rows:
+                f.write(json.dumps(row) + "\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the catalog import.")
+    parser.add_argument("--references", type=int, default=30_000)
+    parser.add_argument("--format", choices=["csv", "ndjson"], default="csv")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Point the app at a throwaway database (and no SQL echo) before models is imported
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'catalog.db')}"
+        os.environ["DEBUG"] = "false"
+        from models import init_db, get_session
+        from services.catalog import import_catalog, iter_records
+
+        init_db()
+        original = os.path.join(tmp, f"catalog.{args.format}")
+        edited = os.path.join(tmp, f"edited.{args.format}")
+        write_catalog(original, args.references, args.format, args.seed)
+        write_catalog(edited, args.references, args.format, args.seed, edited_share=EDITED_SHARE)
+
+        print(f"{args.references:,} references, {args.format}")
+        for label, path in (("initial import", original), ("re-import", original), ("edited import", edited)):
+            session = get_session()
+            start = time.perf_counter()
+            stats = import_catalog(session, iter_records(path))
+            elapsed = time.perf_counter() - start
+            session.close()
+            print(
+                f"  {label:<15} {elapsed:>7.2f}s {args.references / elapsed:>10,.0f} rows/s  "
+                f"added={stats['added']} updated={stats['updated']} unchanged={stats['unchanged']}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Accuracy and throughput of the streaming market estimator against the
+exact computation (sorting every tier's prices on every change).
+
+Usage:
+    python -m benchmarks.bench_market [--listings 20000] [--changes 20000]
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from services.market import QuantileSketch
+from config import Config
+
+
+def exact_trimmed_mean(prices: list[float], trim: float) -> float:
+    """Trimmed mean with the same fractional-rank definition as the sketch."""
+    values = sorted(prices)
+    low = trim * len(values)
+    high = (1 - trim) * len(values)
+    total = 0.0
+    for index, value in enumerate(values):
+        weight = min(index + 1, high) - max(index, low)
+        if weight > 0:
+            total += weight * value
+    return total / (high - low)
+
+
+def make_prices(n: int, rng: random.Random, market: float, outlier_rate: float) -> list[float]:
+    """Log-normal prices around a market value with occasional junk listings."""
+    prices = []
+    for _ in range(n):
+        if rng.random() < outlier_rate:
+            prices.append(rng.choice([1.0, 99.0, 999_999.0, market * 10]))
+        else:
+            prices.append(market * rng.lognormvariate(0, 0.08))
+    return prices
+
+
+def bench_accuracy(rng: random.Random, trim: float):
+    print("Accuracy (relative error vs. true market value, 200 tiers per row)")
+    print(f"{'listings/tier':>14} {'outliers':>9} {'plain mean':>11} {'exact trim':>11} {'sketch trim':>12} {'sketch vs exact':>16}")
+
+    for size in (5, 20, 100, 1000):
+        for outlier_rate in (0.0, 0.1):
+            plain, exact, sketched, drift = [], [], [], []
+            for _ in range(200):
+                market = rng.uniform(3_000, 150_000)
+                prices = make_prices(size, rng, market, outlier_rate)
+                sketch = QuantileSketch()
+                for price in prices:
+                    sketch.add(price)
+
+                exact_value = exact_trimmed_mean(prices, trim)
+                sketch_value = sketch.trimmed_mean(trim)
+                plain.append(abs(statistics.fmean(prices) - market) / market)
+                exact.append(abs(exact_value - market) / market)
+                sketched.append(abs(sketch_value - market) / market)
+                drift.append(abs(sketch_value - exact_value) / exact_value)
+
+            print(
+                f"{size:>14} {outlier_rate:>9.0%} {statistics.median(plain):>11.2%} "
+                f"{statistics.median(exact):>11.2%} {statistics.median(sketched):>12.2%} "
+                f"{max(drift):>16.3%}"
+            )
+
+
+def bench_throughput(rng: random.Random, trim: float, n_listings: int, n_changes: int, n_tiers: int = 200):
+    """Apply a stream of add/reprice/retire changes, re-estimating the touched tier each time."""
+    tiers = {t: make_prices(n_listings // n_tiers, rng, rng.uniform(3_000, 150_000), 0.05) for t in range(n_tiers)}
+    changes = []
+    for _ in range(n_changes):
+        tier = rng.randrange(n_tiers)
+        kind = rng.choice(["add", "reprice", "retire"])
+        changes.append((tier, kind, rng.random(), rng.uniform(0.9, 1.1)))
+
+    def run(apply_exact: bool) -> float:
+        prices = {t: list(p) for t, p in tiers.items()}
+        sketches = {}
+        if not apply_exact:
+            for t, values in prices.items():
+                sketches[t] = QuantileSketch()
+                for value in values:
+                    sketches[t].add(value)
+
+        start = time.perf_counter()
+        for tier, kind, position, factor in changes:
+            values = prices[tier]
+            index = int(position * len(values)) if values else 0
+            if kind == "add" or not values:
+                new_price = (values[index % len(values)] if values else 10_000) * factor
+                values.append(new_price)
+                if not apply_exact:
+                    sketches[tier].add(new_price)
+            elif kind == "reprice":
+                old_price = values[index]
+                values[index] = old_price * factor
+                if not apply_exact:
+                    sketches[tier].remove(old_price)
+                    sketches[tier].add(values[index])
+            else:
+                old_price = values.pop(index)
+                if not apply_exact:
+                    sketches[tier].remove(old_price)
+
+            if apply_exact:
+                exact_trimmed_mean(values, trim) if values else None
+            else:
+                sketches[tier].trimmed_mean(trim)
+        return time.perf_counter() - start
+
+    exact_seconds = run(apply_exact=True)
+    sketch_seconds = run(apply_exact=False)
+
+    print(f"\nThroughput ({n_listings:,} listings over {n_tiers} tiers, {n_changes:,} changes, re-estimate after each)")
+    print(f"  exact (sort per change): {n_changes / exact_seconds:>12,.0f} changes/s")
+    print(f"  streaming sketch:        {n_changes / sketch_seconds:>12,.0f} changes/s")
+    print(f"  speedup:                 {exact_seconds / sketch_seconds:>12.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--listings", type=int, default=20_000)
+    parser.add_argument("--changes", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    trim = Config.MARKET_TRIM_FRACTION
+    bench_accuracy(rng, trim)
+    bench_throughput(rng, trim, args.listings, args.changes)
+
+
+if __name__ == "__main__":
+    main()
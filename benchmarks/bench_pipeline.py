@@ -0,0 +1,113 @@
+"""
+Time to first opportunity (TTFO) and throughput: batch flow vs pipeline.
+
+Both flows scan every seed reference from synthetic cassettes (see
+bench_scan_queue.write_cassettes) replayed with a fixed per-request
+latency, each against its own fresh database:
+
+  batch     Scanner.scan_all_references(), then ArbitrageEngine.analyze_all().
+            Nothing is committed until the whole scan is over.
+  pipeline  services.pipeline.ScanPipeline, which analyzes references while
+            later ones are still being scanned.
+
+TTFO is the time from the start of the scan until the first opportunity is
+committed. The pipeline should cut it to roughly one reference's scan time
+while keeping total throughput about the same.
+
+Usage:
+    python -m benchmarks.bench_pipeline [--latency-ms 100]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_flow(flow: str) -> dict:
+    """Run one flow in this process (environment already set up)."""
+    from seed_data import seed_database
+    from benchmarks.bench_scan_queue import write_cassettes
+
+    seed_database()
+    write_cassettes(os.environ["CASSETTE_DIR"])
+
+    if flow == "pipeline":
+        from services.pipeline import ScanPipeline
+
+        stats = ScanPipeline().run()
+        return {
+            "references": stats["references_scanned"],
+            "opportunities": len(stats["opportunities"]),
+            "ttfo": stats["first_opportunity_seconds"],
+            "seconds": stats["seconds"],
+        }
+
+    from models import get_session
+    from services.arbitrage import ArbitrageEngine
+    from services.scanner import Scanner
+
+    start = time.perf_counter()
+    scanner = Scanner()
+    stats = scanner.scan_all_references()
+    scanner.session.close()
+    session = get_session()
+    opportunities = ArbitrageEngine(session).analyze_all()
+    session.close()
+    seconds = time.perf_counter() - start
+    return {
+        "references": stats["references_scanned"],
+        "opportunities": len(opportunities),
+        "ttfo": seconds if opportunities else None,
+        "seconds": seconds,
+    }
+
+
+def measure(flow: str, latency_ms: float) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'pipeline.db')}",
+            DEBUG="false",
+            CASSETTE_MODE="replay",
+            CASSETTE_DIR=os.path.join(tmp, "cassettes"),
+            REPLAY_LATENCY_MS=str(latency_ms),
+            REPLAY_ERROR_RATE="0",
+        )
+        result = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_pipeline", "--flow", flow],
+            cwd=ROOT, env=env, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"{flow} flow failed:\n{result.stderr}")
+        # Scanner progress goes to stdout too; the result is the last line
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark time to first opportunity.")
+    parser.add_argument("--latency-ms", type=float, default=100)
+    parser.add_argument("--flow", choices=["batch", "pipeline"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.flow:
+        print(json.dumps(run_flow(args.flow)))
+        return
+
+    print(f"{'flow':>9} {'refs':>6} {'opps':>6} {'ttfo (s)':>9} {'total (s)':>10} {'refs/s':>8}")
+    for flow in ("batch", "pipeline"):
+        r = measure(flow, args.latency_ms)
+        ttfo = "-" if r["ttfo"] is None else f"{r['ttfo']:.2f}"
+        print(
+            f"{flow:>9} {r['references']:>6} {r['opportunities']:>6} {ttfo:>9} "
+            f"{r['seconds']:>10.2f} {r['references'] / r['seconds']:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Scan throughput against the number of queue workers.
+
+Synthetic eBay and Chrono24 responses are written as cassettes for every
+seed reference, then N worker processes (`python -m services.scan_queue
+work`) drain the queue in replay mode with a fixed per-request latency
+standing in for the marketplace APIs. Scan time should fall roughly
+linearly with N until the database's write throughput becomes the limit
+(on SQLite, which allows one writer at a time, sooner than on Postgres).
+
+Usage:
+    python -m benchmarks.bench_scan_queue [--workers 1 2 4 8] [--latency-ms 100]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LISTINGS_PER_RESPONSE = 10
+
+
+def write_cassettes(cassette_dir: str):
+    """One eBay and one Chrono24 response per reference, shaped like the real APIs."""
+    from api import ebay_client
+    from api.cassette import CassetteStore
+    from models import get_session, WatchReference
+    from config import Config
+
+    store = CassetteStore(cassette_dir)
+    session = get_session()
+    for ref in session.query(WatchReference):
+        query = f"{ref.brand.name} {ref.reference_number}"
+        store.save("ebay", ebay_client.search_params(query, Config.MIN_PRICE_USD, limit=25), {
+            "itemSummaries": [
+                {
+                    "itemId": f"v1|{ref.id}|{i}",
+                    "title": f"{query} full set",
+                    "price": {"value": str(5_000 + 250 * i), "currency": "USD"},
+                    "itemWebUrl": f"https://example.com/ebay/{ref.id}/{i}",
+                    "seller": {"username": f"seller_{i}", "feedbackPercentage": "99.5"},
+                }
+                for i in range(LISTINGS_PER_RESPONSE)
+            ]
+        })
+        store.save("chrono24", {"query": query, "limit": 25}, [
+            {
+                "id": f"c24_{ref.id}_{i}",
+                "title": f"{query} box and papers",
+                "price": {"value": 5_500 + 250 * i, "currency": "USD"},
+                "url": f"https://example.com/chrono24/{ref.id}/{i}",
+            }
+            for i in range(LISTINGS_PER_RESPONSE)
+        ])
+    session.close()
+
+
+def run_workers(n_workers: int, env: dict) -> float:
+    from models import get_session
+    from services.scan_queue import enqueue_scan
+
+    session = get_session()
+    enqueue_scan(session)
+    session.close()
+
+    start = time.perf_counter()
+    workers = [
+        subprocess.Popen(
+            [sys.executable, "-m", "services.scan_queue", "work", "--worker-id", f"bench-{i}"],
+            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+        )
+        for i in range(n_workers)
+    ]
+    for worker in workers:
+        _, stderr = worker.communicate()
+        if worker.returncode != 0:
+            raise RuntimeError(f"Scan worker failed:\n{stderr}")
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark scan throughput by worker count.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--latency-ms", type=float, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'scan.db')}",
+            DEBUG="false",
+            CASSETTE_MODE="replay",
+            CASSETTE_DIR=os.path.join(tmp, "cassettes"),
+            REPLAY_LATENCY_MS=str(args.latency_ms),
+            REPLAY_ERROR_RATE="0",
+        )
+        # Point this process at the same throwaway database before models is imported
+        os.environ.update(env)
+        from seed_data import seed_database
+
+        seed_database()
+        write_cassettes(env["CASSETTE_DIR"])
+
+        # Speedup relative to the first run, scaled to one worker
+        single = None
+        print(f"{'workers':>8} {'seconds':>10} {'speedup':>8}")
+        for n_workers in args.workers:
+            seconds = run_workers(n_workers, env)
+            single = single or seconds * n_workers
+            print(f"{n_workers:>8} {seconds:>10.2f} {single / seconds:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Startup cost of a dashboard worker: how long `import app` takes, where the
+time goes (`python -X importtime`, grouped by top-level package), and
+whether the import stays free of database work and deferred heavy modules.
+
+Each run is a fresh interpreter pointed at a database file that doesn't
+exist yet; if importing the app creates it, something ran a query.
+
+Usage:
+    python -m benchmarks.startup                  # check against the budget
+    python -m benchmarks.startup --budget 2.0 --runs 5 --top 20
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+
+IMPORT_BUDGET = 2.0         # Seconds for `import app` (median of runs)
+DEFAULT_RUNS = 3
+
+# Imported on first use, never at worker startup (dash itself loads
+# plotly.graph_objects, so it isn't listed)
+DEFERRED_MODULES = ("pandas", "plotly.express", "pyarrow", "chrono24", "pytest")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_PROBE = (
+    "import sys; import app; "
+    "print(','.join(m for m in sys.argv[1:] if m in sys.modules))"
+)
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int]]:
+    """(module, self_us, cumulative_us) for each line of -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def run_once() -> dict:
+    """Import the app in a fresh interpreter and collect its import profile."""
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "startup.db")
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{db_path}", DEBUG="false")
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", _PROBE, *DEFERRED_MODULES],
+            cwd=ROOT,
+            env=env,
+            capture_output=True,
+            text=True
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(f"import app failed:\n{completed.stderr}")
+        touched_db = os.path.exists(db_path)
+
+    rows = parse_importtime(completed.stderr)
+    total_us = next(cumulative for name, _, cumulative in rows if name == "app")
+
+    by_package = defaultdict(int)
+    for name, self_us, _ in rows:
+        by_package[name.split(".")[0]] += self_us
+
+    loaded = completed.stdout.strip().splitlines()[-1] if completed.stdout.strip() else ""
+    return {
+        "seconds": total_us / 1e6,
+        "by_package": dict(by_package),
+        "deferred_loaded": [m for m in loaded.split(",") if m],
+        "touched_db": touched_db,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure dashboard import time.")
+    parser.add_argument("--budget", type=float, default=IMPORT_BUDGET, help="Max seconds for `import app`")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS)
+    parser.add_argument("--top", type=int, default=15, help="Packages to show in the breakdown")
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+    seconds = statistics.median(run["seconds"] for run in runs)
+    # Breakdown from the median run
+    profile = sorted(runs, key=lambda run: run["seconds"])[len(runs) // 2]
+
+    print(f"import app: {seconds:.3f}s median of {args.runs} (budget {args.budget:.3f}s)")
+    print(f"  {'package':<30} {'self ms':>10} {'share':>7}")
+    total_us = sum(profile["by_package"].values())
+    for package, self_us in sorted(profile["by_package"].items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {package:<30} {self_us / 1000:>10.1f} {self_us / total_us:>6.1%}")
+
+    failures = []
+    if seconds > args.budget:
+        failures.append(f"import took {seconds:.3f}s (budget {args.budget:.3f}s)")
+    if any(run["touched_db"] for run in runs):
+        failures.append("importing app touched the database")
+    deferred = sorted({m for run in runs for m in run["deferred_loaded"]})
+    if deferred:
+        failures.append(f"deferred modules imported at startup: {', '.join(deferred)}")
+
+    if failures:
+        print("\nStartup check failed:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+"""
+Benchmark suite for the ingest, analysis and dashboard query paths.
+
+Each data size runs in its own process against a fresh SQLite database
+populated by mock_data.generate_synthetic_data(). Timings are compared with
+benchmarks/baselines.json and the run fails if any is slower than the
+baseline by more than the threshold.
+
+Usage:
+    python -m benchmarks.suite                      # small + medium, compare to baselines
+    python -m benchmarks.suite --sizes large        # 10k references / 1M listings
+    python -m benchmarks.suite --update-baselines   # record new baselines
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SIZES = {
+    "small": {"references": 100, "listings": 10_000},
+    "medium": {"references": 1_000, "listings": 100_000},
+    "large": {"references": 10_000, "listings": 1_000_000},
+}
+
+BASELINES_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+DEFAULT_THRESHOLD = 1.5     # Fail if more than 50% slower than baseline
+QUERY_REPEATS = 5
+SAVE_BATCH = 2_000          # Listings passed through _save_listings
+
+
+def _timed(fn, *args, **kwargs) -> float:
+    start = time.perf_counter()
+    fn(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def run_size(size: str) -> dict[str, float]:
+    """Run every benchmark for one data size. Must run in a fresh process."""
+    import random
+
+    from models import get_session, Listing, WatchReference
+    from seed_data import seed_database
+    from mock_data import generate_synthetic_data
+
+    results = {}
+    spec = SIZES[size]
+
+    results["seed_database"] = _timed(seed_database)
+    results["generate_synthetic_data"] = _timed(
+        generate_synthetic_data, spec["references"], spec["listings"]
+    )
+
+    from services import ArbitrageEngine, Scanner
+    from app import get_opportunities, get_stats
+
+    # Half re-priced existing listings, half new ones, grouped by reference
+    rng = random.Random(7)
+    session = get_session()
+    existing = session.query(Listing).order_by(Listing.id).limit(SAVE_BATCH // 2).all()
+    ref_ids = [ref_id for (ref_id,) in session.query(WatchReference.id).limit(20)]
+    batches = {}
+    for listing in existing:
+        batches.setdefault(listing.watch_reference_id, []).append({
+            "platform": listing.platform,
+            "external_id": listing.external_id,
+            "price": listing.price * 0.98,
+            "price_usd": listing.price_usd * 0.98,
+            "listing_url": listing.listing_url,
+        })
+    for i in range(SAVE_BATCH - len(existing)):
+        price = rng.uniform(3_000, 50_000)
+        batches.setdefault(rng.choice(ref_ids), []).append({
+            "platform": rng.choice(["ebay", "chrono24"]),
+            "external_id": f"bench_{i}",
+            "price": price,
+            "price_usd": price,
+            "box_papers_status": "full_set",
+            "listing_url": f"https://example.com/bench/{i}",
+        })
+    session.close()
+
+    scanner = Scanner()
+    start = time.perf_counter()
+    for reference_id, listings in batches.items():
+        scanner._save_listings(listings, reference_id)
+    results["Scanner._save_listings"] = time.perf_counter() - start
+    scanner.session.close()
+
+    session = get_session()
+    results["ArbitrageEngine.analyze_all"] = _timed(ArbitrageEngine(session).analyze_all)
+    session.close()
+
+    results["get_opportunities"] = statistics.median(_timed(get_opportunities) for _ in range(QUERY_REPEATS))
+    results["get_stats"] = statistics.median(_timed(get_stats) for _ in range(QUERY_REPEATS))
+
+    return results
+
+
+def run_in_subprocess(size: str) -> dict[str, float]:
+    """Run one data size in a fresh process against a temporary SQLite database; returns its timings."""
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}", DEBUG="false")
+        completed = subprocess.run(
+            [sys.executable, "-m", "benchmarks.suite", "--worker", size],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            env=env,
+            capture_output=True,
+            text=True
+        )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Benchmark '{size}' failed:\n{completed.stderr}")
+    # Last line of stdout is the JSON result; everything before is progress output
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def load_baselines() -> dict:
+    if not os.path.exists(BASELINES_PATH):
+        return {}
+    with open(BASELINES_PATH) as f:
+        return json.load(f)
+
+
+def compare(size: str, results: dict[str, float], baselines: dict, threshold: float) -> list[str]:
+    """Print a results table and return the names of regressed benchmarks."""
+    regressions = []
+    baseline = baselines.get(size, {})
+
+    print(f"\n[{size}] {SIZES[size]['references']:,} references, {SIZES[size]['listings']:,} listings")
+    print(f"  {'benchmark':<30} {'seconds':>10} {'baseline':>10} {'ratio':>7}")
+    for name, seconds in results.items():
+        if name in baseline:
+            ratio = seconds / baseline[name] if baseline[name] else float("inf")
+            flag = "  REGRESSION" if ratio > threshold else ""
+            if flag:
+                regressions.append(f"{size}/{name}")
+            print(f"  {name:<30} {seconds:>10.4f} {baseline[name]:>10.4f} {ratio:>6.2f}x{flag}")
+        else:
+            print(f"  {name:<30} {seconds:>10.4f} {'-':>10} {'-':>7}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the benchmark suite.")
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=["small", "medium"])
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Max allowed ratio to baseline before failing")
+    parser.add_argument("--update-baselines", action="store_true")
+    parser.add_argument("--worker", choices=list(SIZES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_size(args.worker)))
+        return
+
+    baselines = load_baselines()
+    regressions = []
+    for size in args.sizes:
+        results = run_in_subprocess(size)
+        regressions.extend(compare(size, results, baselines, args.threshold))
+        if args.update_baselines:
+            baselines[size] = {name: round(seconds, 4) for name, seconds in results.items()}
+
+    if args.update_baselines:
+        with open(BASELINES_PATH, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nBaselines written to {BASELINES_PATH}")
+    elif regressions:
+        print(f"\nRegressions (> {args.threshold:.2f}x baseline): {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
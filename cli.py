@@ -0,0 +1,267 @@
+"""
+Headless command line for scan workers and cron jobs.
+
+Depends only on models, services and api, never on the dashboard (Dash,
+Plotly, Bootstrap components), so a worker starts in a fraction of a web
+worker's time and memory.
+
+stdout carries JSON lines only, one object per line with an "event" field:
+"progress" while working, then "done" with the results, or "error". What
+the services print goes to stderr. The exit status is 0 on success and 1
+on failure; with --strict, a scan that logged platform errors also fails.
+
+Usage:
+    python -m cli scan [--references 1 2 3] [--strict]
+    python -m cli analyze [--references 1 2 3]
+    python -m cli rollup [--archive]
+    python -m cli prices [--limit 300]
+    python -m cli export listings --format ndjson --output listings.ndjson [--active-only]
+    python -m cli bench [--sizes small] [--threshold 1.5]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import traceback
+from contextlib import redirect_stdout
+from datetime import datetime
+
+from models import init_db, get_session
+from config import Config
+
+# Captured before redirect_stdout points sys.stdout at stderr
+_stdout = sys.stdout
+
+
+class CommandFailed(Exception):
+    """A command ran to the end but its outcome counts as a failure."""
+
+    def __init__(self, message: str, result: dict):
+        super().__init__(message)
+        self.result = result
+
+
+def emit(event: str, **fields):
+    """Write one JSON line to stdout."""
+    line = {"event": event, "at": datetime.utcnow().isoformat(timespec="seconds"), **fields}
+    _stdout.write(json.dumps(line, default=str) + "\n")
+    _stdout.flush()
+
+
+def scan(args) -> dict:
+    """Scan and analyze as a pipeline, then compact retired opportunities."""
+    from services.alerts import alert_dispatcher
+    from services.arbitrage import ArbitrageEngine
+    from services.pipeline import ScanPipeline
+
+    stats = ScanPipeline().run(
+        reference_ids=args.references,
+        on_progress=lambda progress: emit("progress", command="scan", **progress)
+    )
+
+    session = get_session()
+    try:
+        compacted = ArbitrageEngine(session).compact()
+    finally:
+        session.close()
+
+    # Deliver pending watch rule alerts before the process exits
+    alert_dispatcher.flush()
+
+    result = {
+        "references": stats["references_scanned"],
+        "ebay_listings": stats["ebay_listings"],
+        "chrono24_listings": stats["chrono24_listings"],
+        "expired_listings": stats["expired_listings"],
+        "opportunities": len(stats["opportunities"]),
+        "first_opportunity_seconds": stats["first_opportunity_seconds"],
+        "compacted_opportunities": compacted,
+        "errors": stats["errors"],
+    }
+    if args.strict and stats["errors"]:
+        raise CommandFailed(f"Scan finished with {len(stats['errors'])} errors", result)
+    return result
+
+
+def analyze(args) -> dict:
+    """Re-analyze stored listings without scanning."""
+    from services.arbitrage import ArbitrageEngine
+
+    session = get_session()
+    try:
+        engine = ArbitrageEngine(session)
+        if args.references:
+            opportunities = engine.analyze_references(args.references)
+        else:
+            opportunities = engine.analyze_all()
+        return {"opportunities": len(opportunities)}
+    finally:
+        session.close()
+
+
+def rollup(args) -> dict:
+    """
+    Periodic housekeeping between scans: verify top opportunities and expire
+    stale listings, re-analyze the references that changed, compact retired
+    opportunities and, with --archive, move old inactive rows to Parquet.
+    """
+    from services.arbitrage import ArbitrageEngine
+    from services.scanner import Scanner
+
+    scanner = Scanner()
+    try:
+        sweep = scanner.sweep_stale_listings()
+    finally:
+        scanner.session.close()
+    emit("progress", command="rollup", step="sweep", expired=sweep["expired"], errors=len(sweep["errors"]))
+
+    session = get_session()
+    try:
+        engine = ArbitrageEngine(session)
+        if sweep["reference_ids"]:
+            engine.analyze_references(sweep["reference_ids"])
+        emit("progress", command="rollup", step="analyze", references=len(sweep["reference_ids"]))
+
+        compacted = engine.compact()
+        emit("progress", command="rollup", step="compact", removed=compacted)
+
+        archived = None
+        if args.archive:
+            # pandas and pyarrow load only when archiving
+            from services.archive import archive_inactive
+            archived = archive_inactive(session)
+            emit("progress", command="rollup", step="archive", archived=archived)
+    finally:
+        session.close()
+
+    return {
+        "expired_listings": sweep["expired"],
+        "reanalyzed_references": len(sweep["reference_ids"]),
+        "compacted_opportunities": compacted,
+        "archived": archived,
+        "errors": sweep["errors"],
+    }
+
+
+def prices(args) -> dict:
+    """Refresh due WatchCharts market prices and re-analyze the references that got one."""
+    from services.arbitrage import ArbitrageEngine
+    from services.market_data import refresh_market_prices
+
+    session = get_session()
+    try:
+        stats = refresh_market_prices(
+            session, args.limit, on_progress=lambda progress: emit("progress", command="prices", **progress)
+        )
+        opportunities = ArbitrageEngine(session).analyze_references(stats["reference_ids"]) if stats["reference_ids"] else []
+    finally:
+        session.close()
+
+    result = {key: value for key, value in stats.items() if key != "reference_ids"}
+    result["opportunities"] = len(opportunities)
+    if stats["errors"] and not stats["refreshed"]:
+        raise CommandFailed("No market prices refreshed", result)
+    return result
+
+
+def export(args) -> dict:
+    """Stream a table to a file; it only replaces the target once complete."""
+    from services.export import export_rows
+
+    written, chunks = 0, 0
+    tmp_path = f"{args.output}.tmp"
+    with open(tmp_path, "wb") as f:
+        for chunk in export_rows(args.table, args.format, active_only=args.active_only):
+            f.write(chunk)
+            written += len(chunk)
+            chunks += 1
+            if chunks % 100 == 0:
+                emit("progress", command="export", bytes=written)
+    os.replace(tmp_path, args.output)
+    return {"table": args.table, "format": args.format, "output": args.output, "bytes": written}
+
+
+def bench(args) -> dict:
+    """Run the benchmark suite against the baselines; fails on regressions."""
+    from benchmarks import suite
+
+    baselines = suite.load_baselines()
+    results, regressions = {}, []
+    for size in args.sizes:
+        results[size] = suite.run_in_subprocess(size)
+        regressions += suite.compare(size, results[size], baselines, args.threshold)
+        emit("progress", command="bench", size=size, results=results[size])
+
+    if regressions:
+        raise CommandFailed(f"Benchmark regressions: {', '.join(regressions)}", {"results": results})
+    return {"results": results}
+
+
+COMMANDS = {
+    "scan": scan,
+    "analyze": analyze,
+    "rollup": rollup,
+    "prices": prices,
+    "export": export,
+    "bench": bench,
+}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    from benchmarks.suite import DEFAULT_THRESHOLD, SIZES
+    from services.export import EXPORT_FORMATS, EXPORT_TABLES
+
+    parser = argparse.ArgumentParser(prog="python -m cli", description="Headless watch arbitrage worker.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    scan_parser = commands.add_parser("scan", help="Scan platforms and analyze as results arrive")
+    scan_parser.add_argument("--references", type=int, nargs="+", help="Reference IDs (default: all)")
+    scan_parser.add_argument("--strict", action="store_true", help="Fail if any platform request failed")
+
+    analyze_parser = commands.add_parser("analyze", help="Re-analyze stored listings")
+    analyze_parser.add_argument("--references", type=int, nargs="+", help="Reference IDs (default: all)")
+
+    rollup_parser = commands.add_parser("rollup", help="Expire stale listings and compact old rows")
+    rollup_parser.add_argument("--archive", action="store_true", help="Also archive old inactive rows")
+
+    prices_parser = commands.add_parser("prices", help="Refresh WatchCharts market prices that are due")
+    prices_parser.add_argument("--limit", type=int, default=Config.MARKET_PRICE_REFRESH_LIMIT)
+
+    export_parser = commands.add_parser("export", help="Export a table to a file")
+    export_parser.add_argument("table", choices=list(EXPORT_TABLES))
+    export_parser.add_argument("--format", choices=list(EXPORT_FORMATS), default="ndjson")
+    export_parser.add_argument("--output", required=True, help="File to write (stdout carries progress)")
+    export_parser.add_argument("--active-only", action="store_true")
+
+    bench_parser = commands.add_parser("bench", help="Run the benchmark suite")
+    bench_parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=["small"])
+    bench_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                              help="Max allowed ratio to baseline before failing")
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    started = time.perf_counter()
+    emit("start", command=args.command)
+
+    with redirect_stdout(sys.stderr):
+        try:
+            init_db()
+            result = COMMANDS[args.command](args)
+        except CommandFailed as e:
+            emit("error", command=args.command, error=str(e), **e.result)
+            return 1
+        except Exception as e:
+            traceback.print_exc()
+            emit("error", command=args.command, error=str(e))
+            return 1
+
+    emit("done", command=args.command, seconds=round(time.perf_counter() - started, 3), **result)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -15,20 +15,34 @@ class Config:
 
     # WatchCharts API
     WATCHCHARTS_API_KEY = os.getenv("WATCHCHARTS_API_KEY", "")
-    WATCHCHARTS_API_BASE = "https://api.watchcharts.com/v3"
+    WATCHCHARTS_API_BASE = os.getenv("WATCHCHARTS_API_BASE", "https://api.watchcharts.com/v3")
 
     # FlareSolverr (for Chrono24)
     FLARESOLVERR_URL = os.getenv("FLARESOLVERR_URL", "http://localhost:8191/v1")
 
+    # Record/replay of marketplace responses (see api/cassette.py)
+    CASSETTE_MODE = os.getenv("CASSETTE_MODE", "off")  # "off", "record" or "replay"
+    CASSETTE_DIR = os.getenv("CASSETTE_DIR", "cassettes")
+    REPLAY_LATENCY_MS = float(os.getenv("REPLAY_LATENCY_MS", "0"))
+    REPLAY_ERROR_RATE = float(os.getenv("REPLAY_ERROR_RATE", "0"))
+    REPLAY_SEED = int(os.getenv("REPLAY_SEED", "0"))
+
     # App settings
     DEBUG = os.getenv("DEBUG", "True").lower() == "true"
+
+    # SQL statement tracking per request/job (see querycount.py)
+    QUERY_TRACKING = os.getenv("QUERY_TRACKING", str(DEBUG)).lower() == "true"
+    QUERY_BUDGET = int(os.getenv("QUERY_BUDGET", "50"))
+    QUERY_MAX_REPEATS = int(os.getenv("QUERY_MAX_REPEATS", "10"))
     SCAN_INTERVAL_HOURS = int(os.getenv("SCAN_INTERVAL_HOURS", "6"))
 
     # Price settings
     MIN_PRICE_USD = 3000
     DEFAULT_SHIPPING_COST = 75
+    MARKET_TRIM_FRACTION = 0.2      # Trim 20% from each end when estimating market price
 
-    # Platform fees (as decimals)
+    # Platform fees (as decimals). This is the platform registry: any platform
+    # listed here can be the sell side of a cross-platform opportunity.
     FEES = {
         "ebay": 0.13,        # ~13% final value fee
         "chrono24": 0.065,   # ~6.5% buyer premium
@@ -39,3 +53,83 @@ class Config:
     MIN_PROFIT_THRESHOLD = 100      # Minimum $ profit to flag
     MIN_ROI_THRESHOLD = 0.02        # Minimum 2% ROI to flag
     MIN_DISCOUNT_THRESHOLD = 0.05   # Minimum 5% below market to flag
+    MIN_CROSS_PLATFORM_SPREAD = 0.10  # Cheapest must be 10% under the other platform's average
+
+    # Confidence scoring (see ArbitrageEngine._calculate_confidence)
+    CONFIDENCE_FULL_COMPS = 20          # Comps for the full "number of comps" score
+    CONFIDENCE_MAX_DISPERSION = 0.25    # IQR / mean at which price stability scores zero
+
+    # Duplicate listing detection (see services/dedupe.py)
+    DEDUPE_PERMUTATIONS = 64            # MinHash signature length
+    DEDUPE_LSH_BANDS = 16               # 16 bands of 4 rows: ~90% recall at title similarity 0.6
+    DEDUPE_MIN_SIMILARITY = 0.6         # Title shingle Jaccard similarity for a duplicate
+    DEDUPE_PRICE_TOLERANCE = 0.05       # Duplicates are priced within 5% of each other
+    DEDUPE_IMAGE_HASH = os.getenv("DEDUPE_IMAGE_HASH", "false").lower() == "true"  # Needs Pillow
+    DEDUPE_MAX_IMAGE_DISTANCE = 6       # Max differing bits of 64-bit image dHashes
+
+    # Explorer typeahead (see services/search.py)
+    CATALOG_INDEX_CHECK_SECONDS = 5     # How often searches check whether the catalog changed
+
+    # Live updates (see services/events.py). Every open /events stream holds
+    # a gunicorn thread, so keep this below the threads in gunicorn.conf.py
+    EVENT_MAX_STREAMS = int(os.getenv("EVENT_MAX_STREAMS", "4"))  # Per worker process
+    EVENT_STREAM_SECONDS = 300          # Streams close after this and the browser reconnects
+
+    # Retired opportunities stay in the database this long before compaction
+    # moves them to the archive (see ArbitrageEngine.compact)
+    OPPORTUNITY_RETENTION_DAYS = int(os.getenv("OPPORTUNITY_RETENTION_DAYS", "30"))
+
+    # Cold storage for inactive rows (see services/archive.py)
+    ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+    ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "90"))
+    ARCHIVE_BATCH_SIZE = 5000
+
+    # Catalog import batch size (see services/catalog.py)
+    CATALOG_BATCH_SIZE = 500
+
+    # Bulk listing loads (see services/bulk.py)
+    BULK_BATCH_SIZE = 10_000        # Rows per COPY/executemany batch, each committed
+
+    # Scan work queue (see services/scan_queue.py)
+    SCAN_BATCH_SIZE = 5             # References claimed per lease
+    SCAN_LEASE_SECONDS = 120        # Leases not renewed within this are re-queued
+    SCAN_MAX_ATTEMPTS = 3           # Failed tasks are retried this many times in total
+
+    # Listing liveness (see Scanner.sweep_stale_listings)
+    STALE_LISTING_HOURS = int(os.getenv("STALE_LISTING_HOURS", "24"))  # Unseen this long -> inactive
+    VERIFY_TOP_N = int(os.getenv("VERIFY_TOP_N", "100"))  # Top opportunities re-checked after a scan
+
+    # Card image proxy and thumbnail cache (see services/images.py)
+    IMAGE_CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", "image_cache")
+    IMAGE_CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+    IMAGE_THUMB_SIZE = 240              # Longest side in pixels (2x the 120px card image)
+    IMAGE_MAX_SOURCE_BYTES = 10 * 1024 * 1024
+    IMAGE_FETCH_TIMEOUT = 10            # Seconds
+    IMAGE_MAX_AGE = 365 * 24 * 3600     # Cache-Control max-age for thumbnails
+    # Only images on these hosts (or their subdomains) are proxied
+    IMAGE_PROXY_HOSTS = os.getenv(
+        "IMAGE_PROXY_HOSTS", "ebayimg.com,chrono24.com,picsum.photos"
+    ).split(",")
+
+    # Streaming scan -> analysis pipeline (see services/pipeline.py)
+    PIPELINE_QUEUE_SIZE = 50        # Scanned references waiting for analysis before the scan blocks
+    PIPELINE_ANALYZE_BATCH = 20     # Most references analyzed per sync
+
+    # Request budgets per platform, shared by all scan workers (requests/second)
+    PLATFORM_RATE_LIMITS = {
+        "ebay": 5.0,
+        "chrono24": 1.0,
+        "watchcharts": 1.0,
+    }
+
+    # WatchCharts market prices (see services/market_data.py)
+    MARKET_PRICE_TTL_HOURS = int(os.getenv("MARKET_PRICE_TTL_HOURS", "24"))  # Older prices are refreshed
+    MARKET_PRICE_REFRESH_LIMIT = int(os.getenv("MARKET_PRICE_REFRESH_LIMIT", "300"))  # References per run
+    MARKET_PRICE_BATCH_SIZE = 50        # Lookups written (and committed) together
+    WATCHCHARTS_TIMEOUT = 10            # Seconds
+
+    # Watch rule alerts (see services/alerts.py)
+    ALERT_FILE = os.getenv("ALERT_FILE", "alerts.ndjson")
+    ALERT_WEBHOOK_URL = os.getenv("ALERT_WEBHOOK_URL")
+    ALERT_QUEUE_SIZE = 1000         # Undelivered alerts beyond this are dropped
+    WEBHOOK_TIMEOUT = 5             # Seconds
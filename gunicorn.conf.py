@@ -0,0 +1,28 @@
+"""
+Gunicorn settings, loaded automatically from the working directory.
+
+The database schema and seed catalog are prepared once in the master
+process before any worker forks, so workers boot without touching the
+database and never race each other to seed.
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8050')}"
+worker_class = "gthread"
+threads = 8  # Open /events streams take up to Config.EVENT_MAX_STREAMS of these
+
+
+def on_starting(server):
+    from models import engine, init_db
+    from seed_data import seed_if_empty
+
+    init_db()
+    seed_if_empty()
+
+    # Workers fork from here with the Explorer's catalog index already built
+    from services.search import catalog_index
+    catalog_index.ensure_loaded()
+
+    # Don't hand the master's pooled connections to forked workers
+    engine.dispose()
@@ -0,0 +1,199 @@
+"""
+In-process metrics with Prometheus text exposition (served at /metrics).
+
+Deliberately dependency-free: counters, gauges and histograms with labels,
+plus the metric definitions used across the scanner, engine and dashboard.
+
+The registry lives in each process's memory. /metrics reports the worker
+that serves it, so scans run elsewhere (cli.py, services/pipeline.py, scan
+queue workers) don't show up in its counters; scrape each gunicorn worker,
+or rely on watch_last_scan_age_seconds, which comes from the database.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labels: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(name, "") for name in self.label_names)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, key)} {value}")
+        return lines
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total, observed = self._values.get(key, ([0] * len(self.buckets), 0.0, 0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value, observed + 1)
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, observed) in sorted(self._values.items()):
+                for bound, count in list(zip(self.buckets, counts)) + [("+Inf", observed)]:
+                    labels = _format_labels(self.label_names, key, f'le="{bound}"')
+                    lines.append(f"{self.name}_bucket{labels} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {observed}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric: _Metric):
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+# Marketplace HTTP
+HTTP_LATENCY = Histogram(
+    "watch_http_request_seconds", "Marketplace request latency.", labels=("platform",)
+)
+HTTP_ERRORS = Counter(
+    "watch_http_errors_total", "Marketplace requests that raised an error.", labels=("platform",)
+)
+
+# Scanner
+LISTINGS_INGESTED = Counter(
+    "watch_listings_ingested_total", "Listings saved or updated by the scanner.", labels=("platform",)
+)
+LISTING_PRICE_CHANGES = Counter(
+    "watch_listing_price_changes_total", "Price changes seen on existing listings.", labels=("platform", "direction")
+)
+INGEST_RATE = Gauge(
+    "watch_listings_ingested_per_second", "Listings ingested per second during the last full scan."
+)
+SAVE_COMMIT = Histogram(
+    "watch_save_listings_commit_seconds", "Time spent committing in Scanner._save_listings."
+)
+LAST_SCAN_AGE = Gauge(
+    "watch_last_scan_age_seconds", "Seconds since the last full scan completed (in any process)."
+)
+
+# Watch rule alerts
+ALERTS_SENT = Counter(
+    "watch_alerts_sent_total", "Watch rule alerts delivered.", labels=("notifier",)
+)
+ALERTS_DROPPED = Counter(
+    "watch_alerts_dropped_total", "Watch rule alerts dropped (queue full or delivery failed).", labels=("notifier",)
+)
+ALERT_LATENCY = Histogram(
+    "watch_alert_delivery_seconds", "Time from a matching listing being committed to its alert being delivered.",
+    labels=("notifier",)
+)
+
+# Card image proxy
+IMAGE_REQUESTS = Counter(
+    "watch_image_proxy_requests_total", "Image proxy requests by outcome (hit, miss, error).", labels=("result",)
+)
+IMAGE_CACHE_EVICTIONS = Counter(
+    "watch_image_cache_evictions_total", "Thumbnails evicted from the disk cache."
+)
+
+# Arbitrage engine
+ANALYZE_PHASE = Histogram(
+    "watch_analyze_phase_seconds", "ArbitrageEngine.analyze_all time per phase.", labels=("phase",)
+)
+
+# Dashboard and database
+CALLBACK_LATENCY = Histogram(
+    "watch_dash_callback_seconds", "Dash callback latency.", labels=("callback",)
+)
+CATALOG_SEARCH = Histogram(
+    "watch_catalog_search_seconds", "Explorer typeahead lookup time in the catalog index.",
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05)
+)
+DB_POOL_WAIT = Histogram(
+    "watch_db_pool_checkout_seconds", "Time waiting to check a connection out of the pool.",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30)
+)
+
+
+def instrument_pool(pool):
+    """Time every pool checkout into DB_POOL_WAIT."""
+    do_get = pool._do_get
+
+    def timed_do_get():
+        start = time.perf_counter()
+        try:
+            return do_get()
+        finally:
+            DB_POOL_WAIT.observe(time.perf_counter() - start)
+
+    pool._do_get = timed_do_get
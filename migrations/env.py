@@ -0,0 +1,32 @@
+"""
+Alembic environment. Migrations run on the app's engine (models.engine), or
+on the connection models.init_db() passes in config.attributes.
+"""
+
+from alembic import context
+
+from models import Base, engine
+from config import Config
+
+
+def run_migrations(connection):
+    context.configure(
+        connection=connection,
+        target_metadata=Base.metadata,
+        # SQLite can't ALTER constraints; batch operations recreate the table
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    context.configure(url=Config.DATABASE_URL, target_metadata=Base.metadata, literal_binds=True)
+    with context.begin_transaction():
+        context.run_migrations()
+elif context.config.attributes.get("connection") is not None:
+    run_migrations(context.config.attributes["connection"])
+else:
+    with engine.connect() as connection:
+        run_migrations(connection)
+        connection.commit()
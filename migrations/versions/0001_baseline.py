@@ -0,0 +1,105 @@
+"""Baseline: the schema before migrations
+
+Databases created before migrations existed have this schema; init_db()
+stamps them with this revision and upgrades them from here.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "brands",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("name", sa.String(100), nullable=False, unique=True),
+        sa.Column("slug", sa.String(100), nullable=False, unique=True),
+    )
+    op.create_table(
+        "watch_references",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("brand_id", sa.Integer, sa.ForeignKey("brands.id"), nullable=False),
+        sa.Column("reference_number", sa.String(100), nullable=False),
+        sa.Column("model_name", sa.String(200)),
+        sa.Column("collection", sa.String(100)),
+        sa.Column("case_size_mm", sa.Integer),
+        sa.Column("movement", sa.String(100)),
+        sa.Column("image_url", sa.String(500)),
+        sa.Column("watchcharts_uuid", sa.String(100)),
+    )
+    op.create_index("ix_watch_references_reference_number", "watch_references", ["reference_number"])
+    op.create_table(
+        "listings",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("watch_reference_id", sa.Integer, sa.ForeignKey("watch_references.id"), nullable=False),
+        sa.Column("platform", sa.String(20), nullable=False),
+        sa.Column("external_id", sa.String(100)),
+        sa.Column("price", sa.Float, nullable=False),
+        sa.Column("currency", sa.String(10)),
+        sa.Column("price_usd", sa.Float, nullable=False),
+        sa.Column("box_papers_status", sa.String(20)),
+        sa.Column("condition", sa.String(200)),
+        sa.Column("seller_name", sa.String(200)),
+        sa.Column("seller_rating", sa.Float),
+        sa.Column("listing_url", sa.String(500), nullable=False),
+        sa.Column("image_url", sa.String(500)),
+        sa.Column("location", sa.String(200)),
+        sa.Column("is_active", sa.Boolean),
+        sa.Column("scraped_at", sa.DateTime),
+        sa.Column("created_at", sa.DateTime),
+    )
+    op.create_table(
+        "market_prices",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("watch_reference_id", sa.Integer, sa.ForeignKey("watch_references.id"), nullable=False),
+        sa.Column("box_papers_status", sa.String(20), nullable=False),
+        sa.Column("market_price_usd", sa.Float, nullable=False),
+        sa.Column("dealer_price_usd", sa.Float),
+        sa.Column("source", sa.String(50)),
+        sa.Column("recorded_at", sa.DateTime),
+    )
+    op.create_table(
+        "price_history",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("watch_reference_id", sa.Integer, sa.ForeignKey("watch_references.id"), nullable=False),
+        sa.Column("date", sa.DateTime, nullable=False),
+        sa.Column("market_price_usd", sa.Float),
+        sa.Column("avg_listing_price", sa.Float),
+        sa.Column("num_listings", sa.Integer),
+        sa.Column("source", sa.String(50)),
+    )
+    op.create_table(
+        "arbitrage_opportunities",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("listing_id", sa.Integer, sa.ForeignKey("listings.id"), nullable=False),
+        sa.Column("watch_reference_id", sa.Integer, sa.ForeignKey("watch_references.id"), nullable=False),
+        sa.Column("opportunity_type", sa.String(20), nullable=False),
+        sa.Column("buy_price", sa.Float, nullable=False),
+        sa.Column("buy_platform", sa.String(20), nullable=False),
+        sa.Column("box_papers_status", sa.String(20)),
+        sa.Column("estimated_sell_price", sa.Float),
+        sa.Column("sell_platform", sa.String(20)),
+        sa.Column("fair_market_value", sa.Float),
+        sa.Column("discount_to_market_pct", sa.Float),
+        sa.Column("platform_fee_estimate", sa.Float),
+        sa.Column("shipping_estimate", sa.Float),
+        sa.Column("estimated_profit", sa.Float),
+        sa.Column("roi_percent", sa.Float),
+        sa.Column("confidence_score", sa.Integer),
+        sa.Column("found_at", sa.DateTime),
+        sa.Column("is_active", sa.Boolean),
+    )
+
+
+def downgrade():
+    for table in ("arbitrage_opportunities", "price_history", "market_prices", "listings", "watch_references", "brands"):
+        op.drop_table(table)
@@ -0,0 +1,30 @@
+"""Generation counters for dashboard refreshes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases that ran the app before migrations may already have the table
+    if sa.inspect(op.get_bind()).has_table("generations"):
+        return
+    op.create_table(
+        "generations",
+        sa.Column("name", sa.String(50), primary_key=True),
+        sa.Column("value", sa.Integer, nullable=False),
+        sa.Column("updated_at", sa.DateTime),
+    )
+
+
+def downgrade():
+    op.drop_table("generations")
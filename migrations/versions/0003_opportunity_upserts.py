@@ -0,0 +1,43 @@
+"""Opportunity upserts: updated_at, retired_at and the natural key index
+
+Existing opportunities get updated_at = found_at. retired_at stays NULL;
+compaction and archiving fall back to found_at for those rows.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    columns = {column["name"] for column in inspector.get_columns("arbitrage_opportunities")}
+    indexes = {index["name"] for index in inspector.get_indexes("arbitrage_opportunities")}
+
+    with op.batch_alter_table("arbitrage_opportunities") as batch:
+        if "updated_at" not in columns:
+            batch.add_column(sa.Column("updated_at", sa.DateTime))
+        if "retired_at" not in columns:
+            batch.add_column(sa.Column("retired_at", sa.DateTime))
+        if "ix_arbitrage_opportunities_is_active" not in indexes:
+            batch.create_index("ix_arbitrage_opportunities_is_active", ["is_active"])
+        if "ix_opportunity_natural_key" not in indexes:
+            batch.create_index("ix_opportunity_natural_key", ["listing_id", "opportunity_type", "sell_platform"])
+
+    op.execute("UPDATE arbitrage_opportunities SET updated_at = found_at WHERE updated_at IS NULL")
+
+
+def downgrade():
+    with op.batch_alter_table("arbitrage_opportunities") as batch:
+        batch.drop_index("ix_opportunity_natural_key")
+        batch.drop_index("ix_arbitrage_opportunities_is_active")
+        batch.drop_column("retired_at")
+        batch.drop_column("updated_at")
@@ -0,0 +1,62 @@
+"""Unique (brand_id, reference_number) for catalog upserts
+
+References repeated within a brand are merged into the oldest row first:
+rows pointing at the others are repointed to it (or, for the per-reference
+scan_tasks and comp_stats, deleted and rebuilt later) and the others are
+deleted.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+REPOINTED = ("listings", "market_prices", "price_history", "arbitrage_opportunities", "watch_rules")
+DELETED = ("scan_tasks", "comp_stats")
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if any(
+        constraint["name"] == "uq_watch_reference_brand_number"
+        for constraint in inspector.get_unique_constraints("watch_references")
+    ):
+        return
+
+    merged = bind.execute(sa.text(
+        "SELECT r.id, k.keep_id FROM watch_references r JOIN ("
+        "  SELECT brand_id, reference_number, MIN(id) AS keep_id FROM watch_references"
+        "  GROUP BY brand_id, reference_number HAVING COUNT(*) > 1"
+        ") k ON r.brand_id = k.brand_id AND r.reference_number = k.reference_number "
+        "WHERE r.id <> k.keep_id"
+    )).all()
+    if merged:
+        tables = set(inspector.get_table_names())
+        pairs = [{"old_id": old_id, "keep_id": keep_id} for old_id, keep_id in merged]
+        for table in REPOINTED:
+            if table in tables:
+                bind.execute(
+                    sa.text(f"UPDATE {table} SET watch_reference_id = :keep_id WHERE watch_reference_id = :old_id"),
+                    pairs
+                )
+        for table in DELETED:
+            if table in tables:
+                bind.execute(sa.text(f"DELETE FROM {table} WHERE watch_reference_id = :old_id"), pairs)
+        bind.execute(sa.text("DELETE FROM watch_references WHERE id = :old_id"), pairs)
+        print(f"Merged {len(merged)} duplicate watch references")
+
+    with op.batch_alter_table("watch_references") as batch:
+        batch.create_unique_constraint("uq_watch_reference_brand_number", ["brand_id", "reference_number"])
+
+
+def downgrade():
+    with op.batch_alter_table("watch_references") as batch:
+        batch.drop_constraint("uq_watch_reference_brand_number", type_="unique")
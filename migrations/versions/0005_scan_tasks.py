@@ -0,0 +1,36 @@
+"""Scan work queue
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table("scan_tasks"):
+        return
+    op.create_table(
+        "scan_tasks",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("watch_reference_id", sa.Integer, sa.ForeignKey("watch_references.id"), nullable=False, unique=True),
+        sa.Column("status", sa.String(20), nullable=False),
+        sa.Column("lease_owner", sa.String(100)),
+        sa.Column("lease_expires_at", sa.DateTime),
+        sa.Column("attempts", sa.Integer, nullable=False),
+        sa.Column("last_error", sa.String(500)),
+        sa.Column("enqueued_at", sa.DateTime),
+        sa.Column("finished_at", sa.DateTime),
+    )
+    op.create_index("ix_scan_task_claim", "scan_tasks", ["status", "lease_expires_at"])
+
+
+def downgrade():
+    op.drop_table("scan_tasks")
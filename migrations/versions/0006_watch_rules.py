@@ -0,0 +1,38 @@
+"""Watch rules evaluated at ingest
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table("watch_rules"):
+        return
+    op.create_table(
+        "watch_rules",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("name", sa.String(200), nullable=False),
+        sa.Column("brand_id", sa.Integer, sa.ForeignKey("brands.id")),
+        sa.Column("watch_reference_id", sa.Integer, sa.ForeignKey("watch_references.id")),
+        sa.Column("box_papers_status", sa.String(20)),
+        sa.Column("platform", sa.String(20)),
+        sa.Column("max_price_usd", sa.Float),
+        sa.Column("min_roi_percent", sa.Float),
+        sa.Column("notifier", sa.String(20), nullable=False),
+        sa.Column("target", sa.String(500)),
+        sa.Column("is_active", sa.Boolean),
+        sa.Column("created_at", sa.DateTime),
+    )
+
+
+def downgrade():
+    op.drop_table("watch_rules")
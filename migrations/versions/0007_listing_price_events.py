@@ -0,0 +1,37 @@
+"""Listing price events and the (platform, external_id) lookup index
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if "ix_listing_platform_external_id" not in {index["name"] for index in inspector.get_indexes("listings")}:
+        op.create_index("ix_listing_platform_external_id", "listings", ["platform", "external_id"])
+
+    if inspector.has_table("listing_price_events"):
+        return
+    op.create_table(
+        "listing_price_events",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("listing_id", sa.Integer, sa.ForeignKey("listings.id"), nullable=False),
+        sa.Column("old_price_usd", sa.Float, nullable=False),
+        sa.Column("new_price_usd", sa.Float, nullable=False),
+        sa.Column("changed_at", sa.DateTime),
+    )
+    op.create_index("ix_listing_price_event_listing", "listing_price_events", ["listing_id", "changed_at"])
+
+
+def downgrade():
+    op.drop_table("listing_price_events")
+    op.drop_index("ix_listing_platform_external_id", table_name="listings")
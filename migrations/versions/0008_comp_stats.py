@@ -0,0 +1,40 @@
+"""Per-tier comp statistics
+
+The table starts empty; init_db() fills it from active listings after
+upgrading past this revision (services.comps.rebuild_comp_stats).
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if sa.inspect(op.get_bind()).has_table("comp_stats"):
+        return
+    op.create_table(
+        "comp_stats",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("watch_reference_id", sa.Integer, sa.ForeignKey("watch_references.id"), nullable=False),
+        sa.Column("box_papers_status", sa.String(20), nullable=False),
+        sa.Column("platform", sa.String(20), nullable=False),
+        sa.Column("comp_count", sa.Integer, nullable=False),
+        sa.Column("mean_price_usd", sa.Float),
+        sa.Column("variance", sa.Float),
+        sa.Column("iqr_usd", sa.Float),
+        sa.Column("sketch", sa.Text),
+        sa.Column("updated_at", sa.DateTime),
+        sa.UniqueConstraint("watch_reference_id", "box_papers_status", "platform", name="uq_comp_stat_key"),
+    )
+
+
+def downgrade():
+    op.drop_table("comp_stats")
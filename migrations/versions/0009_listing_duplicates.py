@@ -0,0 +1,49 @@
+"""Duplicate listing detection: listing titles, duplicate links and LSH buckets
+
+Listings stored before this revision have no title or fingerprint; run
+`python -m services.dedupe backfill` after upgrading to index them.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0009"
+down_revision = "0008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    columns = {column["name"] for column in inspector.get_columns("listings")}
+    if "duplicate_of_id" not in columns:
+        with op.batch_alter_table("listings") as batch:
+            if "title" not in columns:
+                batch.add_column(sa.Column("title", sa.String(500)))
+            batch.add_column(sa.Column("duplicate_of_id", sa.Integer))
+            batch.create_foreign_key("listings_duplicate_of_id_fkey", "listings", ["duplicate_of_id"], ["id"])
+            batch.create_index("ix_listings_duplicate_of_id", ["duplicate_of_id"])
+
+    if inspector.has_table("listing_lsh_buckets"):
+        return
+    op.create_table(
+        "listing_lsh_buckets",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("listing_id", sa.Integer, sa.ForeignKey("listings.id"), nullable=False),
+        sa.Column("bucket", sa.Integer, nullable=False),
+    )
+    op.create_index("ix_listing_lsh_buckets_listing_id", "listing_lsh_buckets", ["listing_id"])
+    op.create_index("ix_listing_lsh_buckets_bucket", "listing_lsh_buckets", ["bucket"])
+
+
+def downgrade():
+    op.drop_table("listing_lsh_buckets")
+    with op.batch_alter_table("listings") as batch:
+        batch.drop_index("ix_listings_duplicate_of_id")
+        batch.drop_constraint("listings_duplicate_of_id_fkey", type_="foreignkey")
+        batch.drop_column("duplicate_of_id")
+        batch.drop_column("title")
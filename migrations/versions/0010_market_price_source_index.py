@@ -0,0 +1,24 @@
+"""Index market prices by (reference, source) for the WatchCharts refresh
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0010"
+down_revision = "0009"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    indexes = {index["name"] for index in sa.inspect(op.get_bind()).get_indexes("market_prices")}
+    if "ix_market_price_reference_source" not in indexes:
+        op.create_index("ix_market_price_reference_source", "market_prices", ["watch_reference_id", "source"])
+
+
+def downgrade():
+    op.drop_index("ix_market_price_reference_source", table_name="market_prices")
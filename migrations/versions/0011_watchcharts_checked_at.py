@@ -0,0 +1,26 @@
+"""Record when a reference's WatchCharts price was last looked up
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0011"
+down_revision = "0010"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    columns = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("watch_references")}
+    if "watchcharts_checked_at" not in columns:
+        with op.batch_alter_table("watch_references") as batch:
+            batch.add_column(sa.Column("watchcharts_checked_at", sa.DateTime))
+
+
+def downgrade():
+    with op.batch_alter_table("watch_references") as batch:
+        batch.drop_column("watchcharts_checked_at")
@@ -0,0 +1,66 @@
+"""Unique (platform, external_id) on listings for bulk upserts
+
+Earlier code could store a platform listing more than once (mock data
+drew external IDs at random). Repeats are merged into the newest row
+first: price events and duplicate links move to it, and so do the others'
+opportunities, retired, so their history reaches the archive through the
+usual compaction (the next analysis keeps or reactivates one row per
+natural key). Their LSH buckets are deleted; the dedupe backfill
+recreates the kept row's. The constraint replaces the plain lookup index.
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-19
+"""
+
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0012"
+down_revision = "0011"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if any(
+        constraint["name"] == "uq_listing_platform_external_id"
+        for constraint in inspector.get_unique_constraints("listings")
+    ):
+        return
+
+    merged = bind.execute(sa.text(
+        "SELECT l.id, k.keep_id FROM listings l JOIN ("
+        "  SELECT platform, external_id, MAX(id) AS keep_id FROM listings WHERE external_id IS NOT NULL"
+        "  GROUP BY platform, external_id HAVING COUNT(*) > 1"
+        ") k ON l.platform = k.platform AND l.external_id = k.external_id "
+        "WHERE l.id <> k.keep_id"
+    )).all()
+    if merged:
+        now = datetime.utcnow()
+        pairs = [{"old_id": old_id, "keep_id": keep_id, "now": now} for old_id, keep_id in merged]
+        bind.execute(sa.text("UPDATE listing_price_events SET listing_id = :keep_id WHERE listing_id = :old_id"), pairs)
+        bind.execute(sa.text("UPDATE listings SET duplicate_of_id = :keep_id WHERE duplicate_of_id = :old_id"), pairs)
+        bind.execute(sa.text("UPDATE listings SET duplicate_of_id = NULL WHERE duplicate_of_id = id"))
+        bind.execute(sa.text(
+            "UPDATE arbitrage_opportunities SET listing_id = :keep_id, is_active = :inactive, "
+            "retired_at = COALESCE(retired_at, :now), updated_at = :now WHERE listing_id = :old_id"
+        ), [{**pair, "inactive": False} for pair in pairs])
+        bind.execute(sa.text("DELETE FROM listing_lsh_buckets WHERE listing_id = :old_id"), pairs)
+        bind.execute(sa.text("DELETE FROM listings WHERE id = :old_id"), pairs)
+        print(f"Merged {len(merged)} repeated listings")
+
+    with op.batch_alter_table("listings") as batch:
+        if "ix_listing_platform_external_id" in {index["name"] for index in inspector.get_indexes("listings")}:
+            batch.drop_index("ix_listing_platform_external_id")
+        batch.create_unique_constraint("uq_listing_platform_external_id", ["platform", "external_id"])
+
+
+def downgrade():
+    with op.batch_alter_table("listings") as batch:
+        batch.drop_constraint("uq_listing_platform_external_id", type_="unique")
+        batch.create_index("ix_listing_platform_external_id", ["platform", "external_id"])
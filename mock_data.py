@@ -1,12 +1,26 @@
 """
 Generate mock listings and arbitrage opportunities for testing.
 Run this after seed_data.py to populate the dashboard.
+
+generate_synthetic_data() builds much larger, randomized data sets
+(e.g. 10k references and 1M listings) for benchmarks:
+
+    python mock_data.py --synthetic --references 10000 --listings 1000000
 """
 
+import argparse
+import math
 import random
 from datetime import datetime, timedelta
 
-from models import init_db, get_session, Brand, WatchReference, Listing, ArbitrageOpportunity, MarketPrice
+from sqlalchemy import insert
+
+from models import (
+    init_db, get_session, bump_generation, Brand, WatchReference, Listing, ListingLSHBucket,
+    ListingPriceEvent, ArbitrageOpportunity, MarketPrice, PriceHistory, CompStat, ScanTask, WatchRule
+)
+from services.bulk import load_listings
+from services.comps import rebuild_comp_stats, replace_comp_stats
 
 # Mock listing data - realistic prices for popular references
 MOCK_LISTINGS = [
@@ -86,11 +100,13 @@ def generate_mock_data():
     try:
         # Clear existing listings and opportunities
         session.query(ArbitrageOpportunity).delete()
+        session.query(ListingPriceEvent).delete()
+        session.query(ListingLSHBucket).delete()
         session.query(Listing).delete()
         session.query(MarketPrice).delete()
         session.commit()
 
-        total_listings = 0
+        rows = []
 
         for watch_data in MOCK_LISTINGS:
             ref_num = watch_data["ref"]
@@ -115,28 +131,30 @@ def generate_mock_data():
             session.add(mp)
 
             # Add listings
-            for listing_data in watch_data["listings"]:
-                listing = Listing(
-                    watch_reference_id=ref.id,
-                    platform=listing_data["platform"],
-                    external_id=f"mock_{ref_num}_{listing_data['platform']}_{random.randint(1000,9999)}",
-                    price=listing_data["price"],
-                    currency="USD",
-                    price_usd=listing_data["price"],
-                    box_papers_status=listing_data["bp"],
-                    condition="Pre-owned, Excellent",
-                    seller_name=listing_data["seller"],
-                    seller_rating=listing_data["rating"],
-                    listing_url=f"https://example.com/listing/{random.randint(10000,99999)}",
-                    image_url=f"https://picsum.photos/seed/{ref_num}/300/300",
-                    location="United States",
-                    is_active=True,
-                    scraped_at=datetime.utcnow() - timedelta(hours=random.randint(1, 12))
-                )
-                session.add(listing)
-                total_listings += 1
+            for number, listing_data in enumerate(watch_data["listings"]):
+                rows.append({
+                    "watch_reference_id": ref.id,
+                    "platform": listing_data["platform"],
+                    "external_id": f"mock_{ref_num}_{listing_data['platform']}_{number}",
+                    "price": listing_data["price"],
+                    "currency": "USD",
+                    "price_usd": listing_data["price"],
+                    "box_papers_status": listing_data["bp"],
+                    "condition": "Pre-owned, Excellent",
+                    "seller_name": listing_data["seller"],
+                    "seller_rating": listing_data["rating"],
+                    "listing_url": f"https://example.com/listing/{random.randint(10000,99999)}",
+                    "image_url": f"https://picsum.photos/seed/{ref_num}/300/300",
+                    "location": "United States",
+                    "is_active": True,
+                    "scraped_at": datetime.utcnow() - timedelta(hours=random.randint(1, 12))
+                })
 
+        total_listings = load_listings(session, rows)
+        bump_generation(session, "listings")
+        bump_generation(session, "market_prices")
         session.commit()
+        rebuild_comp_stats(session)
         print(f"Created {total_listings} mock listings")
 
         # Now detect arbitrage opportunities
@@ -155,13 +173,179 @@ def generate_mock_data():
         session.close()
 
 
+# Synthetic data shape: share of listings in each B&P tier and on each
+# platform, and how each shifts the price relative to market
+SYNTHETIC_BP_MIX = {
+    "full_set": (0.45, 1.00),
+    "papers_only": (0.15, 0.93),
+    "box_only": (0.10, 0.88),
+    "none": (0.15, 0.82),
+    "unknown": (0.15, 0.90),
+}
+SYNTHETIC_PLATFORM_SPLIT = {
+    "ebay": (0.55, 0.96),
+    "chrono24": (0.45, 1.03),
+}
+SYNTHETIC_OUTLIER_RATE = 0.01   # Junk listings ($1 placeholders, typos, etc.)
+SYNTHETIC_PRICE_SPREAD = 0.07   # Log-normal sigma around the tier price
+
+
+def _weighted_choices(rng: random.Random, mix: dict, n: int) -> list:
+    keys = list(mix)
+    return rng.choices(keys, weights=[mix[k][0] for k in keys], k=n)
+
+
+def generate_synthetic_data(
+    n_references: int = 10_000,
+    n_listings: int = 1_000_000,
+    seed: int = 42,
+    batch_size: int = 10_000,
+    market_price_share: float = 0.5
+):
+    """
+    Generate a large synthetic catalog and listing set with bulk inserts
+    (listings go through services.bulk, so Postgres loads them with COPY).
+
+    References are spread across the existing brands (run seed_data.py first).
+    Listing counts per reference follow a Zipf-like curve, so a few popular
+    references carry most listings, as on the real platforms. Existing
+    listings, opportunities and market prices are replaced.
+    """
+    init_db()
+    rng = random.Random(seed)
+    session = get_session()
+
+    try:
+        session.query(ArbitrageOpportunity).delete()
+        session.query(ListingPriceEvent).delete()
+        session.query(ListingLSHBucket).delete()
+        session.query(Listing).delete()
+        session.query(MarketPrice).delete()
+
+        # Rows pointing at the old synthetic references go first (Postgres enforces the foreign keys)
+        synthetic = session.query(WatchReference.id).filter(WatchReference.reference_number.like("SYN-%"))
+        for model in (CompStat, PriceHistory, ScanTask, WatchRule):
+            session.query(model).filter(model.watch_reference_id.in_(synthetic.scalar_subquery())).delete(
+                synchronize_session=False
+            )
+        deleted = session.query(WatchReference).filter(WatchReference.reference_number.like("SYN-%")).delete(
+            synchronize_session=False
+        )
+        # Let caches built from the catalog (typeahead, watch rule index) refresh
+        if deleted:
+            bump_generation(session, "catalog")
+        session.commit()
+
+        brands = session.query(Brand).all()
+        if not brands:
+            raise RuntimeError("No brands found - run seed_data.py first")
+
+        # Synthetic references, each with a log-uniform market price ($3k-$250k)
+        session.execute(insert(WatchReference), [
+            {
+                "brand_id": brands[i % len(brands)].id,
+                "reference_number": f"SYN-{i:06d}",
+                "model_name": f"Synthetic Model {i}",
+                "collection": f"Collection {i % 50}",
+                "case_size_mm": rng.choice([36, 39, 40, 41, 42, 44]),
+                "movement": "Automatic",
+            }
+            for i in range(n_references)
+        ])
+        bump_generation(session, "catalog")
+        session.commit()
+
+        references = [
+            ref_id for (ref_id,) in session.query(WatchReference.id).filter(
+                WatchReference.reference_number.like("SYN-%")
+            ).order_by(WatchReference.id)
+        ]
+        market = {ref_id: math.exp(rng.uniform(math.log(3_000), math.log(250_000))) for ref_id in references}
+
+        session.execute(insert(MarketPrice), [
+            {"watch_reference_id": ref_id, "box_papers_status": "full_set",
+             "market_price_usd": round(market[ref_id], 2), "source": "synthetic"}
+            for ref_id in references if rng.random() < market_price_share
+        ])
+
+        # Popular references get most of the listings
+        weights = [1 / (rank + 1) ** 0.8 for rank in range(len(references))]
+        now = datetime.utcnow()
+        prices_by_key = {}  # Comp statistics come from these, not from reading the listings back
+
+        for start in range(0, n_listings, batch_size):
+            count = min(batch_size, n_listings - start)
+            ref_ids = rng.choices(references, weights=weights, k=count)
+            tiers = _weighted_choices(rng, SYNTHETIC_BP_MIX, count)
+            platforms = _weighted_choices(rng, SYNTHETIC_PLATFORM_SPLIT, count)
+
+            rows = []
+            for offset, (ref_id, tier, platform) in enumerate(zip(ref_ids, tiers, platforms)):
+                if rng.random() < SYNTHETIC_OUTLIER_RATE:
+                    price = rng.choice([1.0, 99.0, market[ref_id] * 10])
+                else:
+                    price = (
+                        market[ref_id]
+                        * SYNTHETIC_BP_MIX[tier][1]
+                        * SYNTHETIC_PLATFORM_SPLIT[platform][1]
+                        * rng.lognormvariate(0, SYNTHETIC_PRICE_SPREAD)
+                    )
+                price = round(price, 2)
+                prices_by_key.setdefault((ref_id, tier, platform), []).append(price)
+                listing_number = start + offset
+                rows.append({
+                    "watch_reference_id": ref_id,
+                    "platform": platform,
+                    "external_id": f"syn_{platform}_{listing_number}",
+                    "price": price,
+                    "currency": "USD",
+                    "price_usd": price,
+                    "box_papers_status": tier,
+                    "condition": "Pre-owned",
+                    "seller_name": f"seller_{rng.randrange(5_000)}",
+                    "seller_rating": round(rng.uniform(90, 100), 1),
+                    "listing_url": f"https://example.com/listing/{listing_number}",
+                    "image_url": None,
+                    "location": "United States",
+                    "is_active": True,
+                    "scraped_at": now - timedelta(minutes=rng.randrange(12 * 60)),
+                    "created_at": now,
+                })
+
+            load_listings(session, rows, batch_size)
+
+        bump_generation(session, "listings")
+        bump_generation(session, "market_prices")
+        session.commit()
+        replace_comp_stats(session, prices_by_key)
+        print(f"Created {n_references} synthetic references and {n_listings} listings")
+
+    except Exception as e:
+        session.rollback()
+        print(f"Error: {e}")
+        raise
+    finally:
+        session.close()
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate mock or synthetic listings.")
+    parser.add_argument("--synthetic", action="store_true", help="Generate a large randomized data set")
+    parser.add_argument("--references", type=int, default=10_000)
+    parser.add_argument("--listings", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
     # First run seed_data to ensure brands/references exist
     from seed_data import seed_database
     print("Seeding watch catalog...")
     seed_database()
 
-    print("\nGenerating mock listings...")
-    generate_mock_data()
+    if args.synthetic:
+        print("\nGenerating synthetic listings...")
+        generate_synthetic_data(args.references, args.listings, seed=args.seed)
+    else:
+        print("\nGenerating mock listings...")
+        generate_mock_data()
 
     print("\nDone! Run 'python app.py' to start the dashboard.")
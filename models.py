@@ -1,10 +1,12 @@
+import os
 from datetime import datetime
-from sqlalchemy import create_engine, Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Enum
+from sqlalchemy import create_engine, event, inspect, text, Column, Integer, String, Float, Boolean, DateTime, Text, ForeignKey, Enum, Index, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, sessionmaker
 import enum
 
 from config import Config
+from metrics import instrument_pool
 
 Base = declarative_base()
 
@@ -34,6 +36,9 @@ class Brand(Base):
 
 class WatchReference(Base):
     __tablename__ = "watch_references"
+    __table_args__ = (
+        UniqueConstraint("brand_id", "reference_number", name="uq_watch_reference_brand_number"),
+    )
 
     id = Column(Integer, primary_key=True)
     brand_id = Column(Integer, ForeignKey("brands.id"), nullable=False)
@@ -44,6 +49,7 @@ class WatchReference(Base):
     movement = Column(String(100))
     image_url = Column(String(500))
     watchcharts_uuid = Column(String(100))
+    watchcharts_checked_at = Column(DateTime)  # Last WatchCharts price lookup, with or without a price
 
     brand = relationship("Brand", back_populates="watches")
     listings = relationship("Listing", back_populates="watch_reference")
@@ -68,15 +74,72 @@ class Listing(Base):
     listing_url = Column(String(500), nullable=False)
     image_url = Column(String(500))
     location = Column(String(200))
+    title = Column(String(500))
+    duplicate_of_id = Column(Integer, ForeignKey("listings.id"), index=True)  # Same watch listed elsewhere
     is_active = Column(Boolean, default=True)
-    scraped_at = Column(DateTime, default=datetime.utcnow)
+    scraped_at = Column(DateTime, default=datetime.utcnow)  # Last time a scan saw the listing
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        # Upsert key of services/bulk.py
+        UniqueConstraint("platform", "external_id", name="uq_listing_platform_external_id"),
+    )
+
     watch_reference = relationship("WatchReference", back_populates="listings")
+    price_events = relationship("ListingPriceEvent", back_populates="listing")
+
+
+class ListingLSHBucket(Base):
+    """One LSH band bucket of a listing's title MinHash (see services/dedupe.py)."""
+    __tablename__ = "listing_lsh_buckets"
+
+    id = Column(Integer, primary_key=True)
+    listing_id = Column(Integer, ForeignKey("listings.id"), nullable=False, index=True)
+    bucket = Column(Integer, nullable=False, index=True)  # Hash of (band, band values)
+
+
+class ListingPriceEvent(Base):
+    """A price change on an existing listing, appended by the scanner."""
+    __tablename__ = "listing_price_events"
+
+    id = Column(Integer, primary_key=True)
+    listing_id = Column(Integer, ForeignKey("listings.id"), nullable=False)
+    old_price_usd = Column(Float, nullable=False)
+    new_price_usd = Column(Float, nullable=False)
+    changed_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_listing_price_event_listing", "listing_id", "changed_at"),
+    )
+
+    listing = relationship("Listing", back_populates="price_events")
+
+
+class CompStat(Base):
+    """Running price statistics of active listings per (reference, tier, platform); see services/comps.py."""
+    __tablename__ = "comp_stats"
+    __table_args__ = (
+        UniqueConstraint("watch_reference_id", "box_papers_status", "platform", name="uq_comp_stat_key"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    watch_reference_id = Column(Integer, ForeignKey("watch_references.id"), nullable=False)
+    box_papers_status = Column(String(20), nullable=False)
+    platform = Column(String(20), nullable=False)
+    comp_count = Column(Integer, nullable=False, default=0)
+    mean_price_usd = Column(Float)
+    variance = Column(Float)  # Sample variance of price_usd
+    iqr_usd = Column(Float)  # Interquartile range, from the sketch
+    sketch = Column(Text)  # QuantileSketch buckets as JSON
+    updated_at = Column(DateTime, default=datetime.utcnow)
 
 
 class MarketPrice(Base):
     __tablename__ = "market_prices"
+    __table_args__ = (
+        # The WatchCharts refresh finds each reference's latest price by source
+        Index("ix_market_price_reference_source", "watch_reference_id", "source"),
+    )
 
     id = Column(Integer, primary_key=True)
     watch_reference_id = Column(Integer, ForeignKey("watch_references.id"), nullable=False)
@@ -123,19 +186,162 @@ class ArbitrageOpportunity(Base):
     roi_percent = Column(Float)
     confidence_score = Column(Integer)  # 0-100
     found_at = Column(DateTime, default=datetime.utcnow)
-    is_active = Column(Boolean, default=True)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+    retired_at = Column(DateTime)
+    is_active = Column(Boolean, default=True, index=True)
+
+    # Natural key: (listing_id, opportunity_type, sell_platform). Not unique
+    # because sell_platform is NULL for "undervalued" opportunities.
+    __table_args__ = (
+        Index("ix_opportunity_natural_key", "listing_id", "opportunity_type", "sell_platform"),
+    )
 
     listing = relationship("Listing")
     watch_reference = relationship("WatchReference")
 
 
+class Generation(Base):
+    __tablename__ = "generations"
+
+    name = Column(String(50), primary_key=True)  # e.g. "scan"
+    value = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+class WatchRule(Base):
+    """Saved search evaluated against listings as they're ingested (see services/alerts.py)."""
+    __tablename__ = "watch_rules"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(200), nullable=False)
+    brand_id = Column(Integer, ForeignKey("brands.id"))  # Any reference of this brand
+    watch_reference_id = Column(Integer, ForeignKey("watch_references.id"))  # One reference
+    box_papers_status = Column(String(20))  # None matches every tier
+    platform = Column(String(20))  # None matches every platform
+    max_price_usd = Column(Float)
+    min_roi_percent = Column(Float)  # Against the market estimate for the listing's tier
+    notifier = Column(String(20), nullable=False, default="file")  # "file" or "webhook"
+    target = Column(String(500))  # File path or webhook URL (None for the configured default)
+    is_active = Column(Boolean, default=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    brand = relationship("Brand")
+    watch_reference = relationship("WatchReference")
+
+
+class ScanTask(Base):
+    """One reference's slot in the scan work queue (see services/scan_queue.py)."""
+    __tablename__ = "scan_tasks"
+
+    id = Column(Integer, primary_key=True)
+    watch_reference_id = Column(Integer, ForeignKey("watch_references.id"), nullable=False, unique=True)
+    status = Column(String(20), nullable=False, default="pending")  # pending, leased, done, failed
+    lease_owner = Column(String(100))  # Worker ID holding the lease
+    lease_expires_at = Column(DateTime)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(String(500))
+    enqueued_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime)
+
+    __table_args__ = (
+        Index("ix_scan_task_claim", "status", "lease_expires_at"),
+    )
+
+    watch_reference = relationship("WatchReference")
+
+
 # Database setup
 engine = create_engine(Config.DATABASE_URL, echo=Config.DEBUG)
+instrument_pool(engine.pool)
+
+if engine.dialect.name == "sqlite":
+    @event.listens_for(engine, "connect")
+    def _enable_wal(dbapi_connection, connection_record):
+        """WAL lets readers (dashboards, exports) run alongside a scan's writes."""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.close()
+
+
+# Latest migration in migrations/versions; init_db() brings databases up to it
+SCHEMA_REVISION = "0012"
+# Databases created before migrations existed have this revision's schema
+BASELINE_REVISION = "0001"
 
 
 def init_db():
-    """Create all tables."""
-    Base.metadata.create_all(engine)
+    """
+    Create the schema, or upgrade an existing database to SCHEMA_REVISION.
+
+    A new database gets every table from the models and is stamped with the
+    latest migration. A database created before migrations existed is
+    stamped with the baseline and upgraded from there.
+    """
+    with engine.begin() as connection:
+        tables = inspect(connection).get_table_names()
+        current = BASELINE_REVISION
+        if "alembic_version" in tables:
+            current = connection.execute(text("SELECT version_num FROM alembic_version")).scalar()
+            if current == SCHEMA_REVISION:
+                return
+
+        if not tables:
+            # Stamped by hand, as Alembic would: importing it takes longer than creating the schema
+            Base.metadata.create_all(connection)
+            connection.execute(text(
+                "CREATE TABLE alembic_version (version_num VARCHAR(32) NOT NULL, "
+                "CONSTRAINT alembic_version_pkc PRIMARY KEY (version_num))"
+            ))
+            connection.execute(text("INSERT INTO alembic_version (version_num) VALUES (:revision)"),
+                               {"revision": SCHEMA_REVISION})
+            return
+
+        # Alembic is only imported when there's something to do
+        from alembic import command
+        from alembic.config import Config as AlembicConfig
+
+        alembic_config = AlembicConfig(os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini"))
+        alembic_config.attributes["connection"] = connection
+        if "alembic_version" not in tables:
+            command.stamp(alembic_config, BASELINE_REVISION)
+        print("Upgrading database schema...")
+        command.upgrade(alembic_config, "head")
+
+    # Derived data the migrations can't compute in SQL
+    if current < "0008":
+        from services.comps import rebuild_comp_stats
+        session = get_session()
+        try:
+            print(f"Built {rebuild_comp_stats(session)} comp statistics")
+        finally:
+            session.close()
+
+
+def get_generation(session, name: str = "scan") -> int:
+    """Get the current value of a generation counter (0 if never bumped)."""
+    value = session.query(Generation.value).filter(Generation.name == name).scalar()
+    return value or 0
+
+
+def get_generations(session, *names: str) -> tuple[int, ...]:
+    """Get several generation counters in one query, in the order named."""
+    values = dict(session.query(Generation.name, Generation.value).filter(Generation.name.in_(names)))
+    return tuple(values.get(name) or 0 for name in names)
+
+
+def bump_generation(session, name: str = "scan") -> int:
+    """
+    Increment a generation counter and return the new value.
+    The caller is responsible for committing.
+    """
+    updated = session.query(Generation).filter(Generation.name == name).update(
+        {"value": Generation.value + 1, "updated_at": datetime.utcnow()},
+        synchronize_session=False
+    )
+    if not updated:
+        session.add(Generation(name=name, value=1, updated_at=datetime.utcnow()))
+        session.flush()
+    return get_generation(session, name)
 
 
 def get_session():
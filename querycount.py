@@ -0,0 +1,148 @@
+"""
+SQL statement counting and N+1 detection for development and tests.
+
+Statements executed inside a track_queries() block are counted and grouped
+by shape (whitespace collapsed, literals and IN-lists folded). When the block
+ends, exceeding the statement budget or repeating one shape too often emits
+a QueryBudgetWarning, or raises QueryBudgetExceeded in strict mode.
+
+    with track_queries("analyze_all", max_queries=20, max_repeats=3):
+        engine.analyze_all()
+
+With QUERY_TRACKING enabled the dashboard wraps every request in a block.
+Tests can use the `query_budget` fixture by adding
+`pytest_plugins = ["querycount"]` to their conftest.py.
+"""
+
+import contextvars
+import functools
+import re
+import sys
+import warnings
+from collections import Counter
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from sqlalchemy import event
+
+from models import engine
+from config import Config
+
+
+class QueryBudgetWarning(UserWarning):
+    """A unit of work ran more (or more repetitive) SQL than its budget."""
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Strict-mode version of QueryBudgetWarning."""
+
+
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """Normalize a statement so repeats with different parameters group together."""
+    shape = _STRING.sub("?", statement)
+    shape = _NUMBER.sub("?", shape)
+    shape = _IN_LIST.sub("(?...)", shape)
+    return _WHITESPACE.sub(" ", shape).strip()
+
+
+class QueryLog:
+    """Statements executed during one unit of work (a request, a job, a test)."""
+
+    def __init__(self, name: str, max_queries: Optional[int], max_repeats: Optional[int]):
+        self.name = name
+        self.max_queries = max_queries
+        self.max_repeats = max_repeats
+        self.shapes = Counter()
+
+    @property
+    def count(self) -> int:
+        return sum(self.shapes.values())
+
+    def record(self, statement: str):
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated(self) -> list[tuple[str, int]]:
+        """Shapes executed more than max_repeats times, most frequent first."""
+        if self.max_repeats is None:
+            return []
+        return [(shape, n) for shape, n in self.shapes.most_common() if n > self.max_repeats]
+
+    def problems(self) -> list[str]:
+        problems = []
+        if self.max_queries is not None and self.count > self.max_queries:
+            problems.append(f"{self.count} statements (budget {self.max_queries})")
+        for shape, n in self.repeated():
+            problems.append(f"{n}x (max {self.max_repeats}): {shape[:200]}")
+        return problems
+
+    def report(self) -> str:
+        lines = [f"{self.name}: {self.count} statements, {len(self.shapes)} distinct"]
+        for shape, n in self.shapes.most_common(10):
+            lines.append(f"  {n:>5}x  {shape[:160]}")
+        return "\n".join(lines)
+
+
+_current_log = contextvars.ContextVar("query_log", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    log = _current_log.get()
+    if log is not None:
+        log.record(statement)
+
+
+event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+
+
+@contextmanager
+def track_queries(
+    name: str = "unit of work",
+    max_queries: Optional[int] = Config.QUERY_BUDGET,
+    max_repeats: Optional[int] = Config.QUERY_MAX_REPEATS,
+    strict: bool = False
+) -> Iterator[QueryLog]:
+    """
+    Count statements executed in this block (on this thread/context).
+
+    Args:
+        name: Label for warnings and reports
+        max_queries: Statement budget for the block (None for no limit)
+        max_repeats: Max executions of one statement shape (None for no limit)
+        strict: Raise QueryBudgetExceeded instead of warning
+    """
+    log = QueryLog(name, max_queries, max_repeats)
+    token = _current_log.set(log)
+    try:
+        yield log
+    finally:
+        _current_log.reset(token)
+
+    problems = log.problems()
+    if problems:
+        message = f"{name} exceeded its query budget:\n  " + "\n  ".join(problems)
+        if strict:
+            raise QueryBudgetExceeded(message)
+        warnings.warn(message, QueryBudgetWarning, stacklevel=3)
+
+
+# Only define the fixture when loaded as a pytest plugin (keeps pytest out
+# of the dashboard's imports)
+if "pytest" in sys.modules:
+    import pytest
+
+    @pytest.fixture
+    def query_budget():
+        """
+        Strict track_queries() for asserting budgets on key code paths:
+
+            def test_feed_query_budget(query_budget):
+                with query_budget("get_opportunities", max_queries=2, max_repeats=1):
+                    get_opportunities()
+        """
+        return functools.partial(track_queries, strict=True)
@@ -1,9 +1,10 @@
 """
 Seed the database with popular watch references.
-Run this once after setting up the database.
+Safe to re-run: references are upserted, never deleted (see services/catalog.py).
 """
 
-from models import init_db, get_session, Brand, WatchReference
+from models import init_db, get_session, Brand
+from services.catalog import import_catalog
 
 # Popular references for each brand (5-10 per brand)
 SEED_DATA = {
@@ -120,42 +121,32 @@ SEED_DATA = {
 }
 
 
+def seed_records():
+    """SEED_DATA as catalog records for services.catalog.import_catalog()."""
+    for brand_name, data in SEED_DATA.items():
+        for watch in data["watches"]:
+            yield {
+                "brand": brand_name,
+                "brand_slug": data["slug"],
+                "reference_number": watch["ref"],
+                "model_name": watch["model"],
+                "collection": watch.get("collection"),
+                "case_size_mm": watch.get("size"),
+                "movement": "Automatic",
+            }
+
+
 def seed_database():
-    """Seed brands and watch references."""
+    """Add the seed brands and watch references (existing rows are kept and updated)."""
     init_db()
     session = get_session()
 
     try:
-        # Clear existing data
-        session.query(WatchReference).delete()
-        session.query(Brand).delete()
-        session.commit()
-
-        total_watches = 0
-
-        for brand_name, data in SEED_DATA.items():
-            # Create brand
-            brand = Brand(name=brand_name, slug=data["slug"])
-            session.add(brand)
-            session.flush()  # Get the brand ID
-
-            # Create watch references
-            for watch in data["watches"]:
-                ref = WatchReference(
-                    brand_id=brand.id,
-                    reference_number=watch["ref"],
-                    model_name=watch["model"],
-                    collection=watch.get("collection"),
-                    case_size_mm=watch.get("size"),
-                    movement="Automatic"
-                )
-                session.add(ref)
-                total_watches += 1
-
-            print(f"Added {brand_name}: {len(data['watches'])} watches")
-
-        session.commit()
-        print(f"\nTotal: {total_watches} watches across {len(SEED_DATA)} brands")
+        stats = import_catalog(session, seed_records())
+        print(
+            f"Seeded {len(SEED_DATA)} brands: {stats['added']} watches added, "
+            f"{stats['updated']} updated, {stats['unchanged']} unchanged"
+        )
 
     except Exception as e:
         session.rollback()
@@ -165,5 +156,17 @@ def seed_database():
         session.close()
 
 
+def seed_if_empty():
+    """Seed the database if no brands exist."""
+    session = get_session()
+    brand_count = session.query(Brand).count()
+    session.close()
+
+    if brand_count == 0:
+        print("Database empty - seeding watch catalog...")
+        seed_database()
+        print("Seeding complete!")
+
+
 if __name__ == "__main__":
     seed_database()
@@ -1,4 +1,13 @@
-from .arbitrage import ArbitrageEngine
-from .scanner import Scanner
-
 __all__ = ["ArbitrageEngine", "Scanner"]
+
+
+def __getattr__(name):
+    # Imported on first use so `python -m services.<module>` doesn't load the
+    # scanner (and the modules it imports) before running the script
+    if name == "ArbitrageEngine":
+        from .arbitrage import ArbitrageEngine
+        return ArbitrageEngine
+    if name == "Scanner":
+        from .scanner import Scanner
+        return Scanner
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
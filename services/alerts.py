@@ -0,0 +1,336 @@
+"""
+Saved-search alerts evaluated at ingest time.
+
+Active WatchRules are compiled into an index keyed by (watch_reference_id,
+box_papers_status); brand rules are expanded to every reference of the
+brand. Scanner._save_listings looks each new or price-dropped listing up
+in the index, and matches are handed to a background dispatcher, so alerts
+go out seconds after a listing is saved rather than after the scan and
+analysis finish.
+
+Notifiers are pluggable (register_notifier); "file" appends NDJSON and
+"webhook" POSTs JSON. For local testing, run a stand-in webhook receiver:
+
+    python -m services.alerts serve-webhook --port 8765
+    ALERT_WEBHOOK_URL=http://localhost:8765/ python -m services.alerts add \\
+        --name "126710BLRO full set under 18k" --reference 126710BLRO --tier full_set \\
+        --max-price 18000 --notifier webhook
+    python -m services.alerts add --name "Any Patek over 15% ROI" --brand "Patek Philippe" --min-roi 15
+"""
+
+import argparse
+import json
+import queue
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Callable, Optional
+
+import requests
+from sqlalchemy.orm import Session
+
+from models import (
+    init_db, get_session, get_generations, bump_generation, Brand, MarketPrice, WatchReference, WatchRule
+)
+from services.market import market_estimator
+from config import Config
+from metrics import ALERT_LATENCY, ALERTS_DROPPED, ALERTS_SENT
+
+
+class CompiledRule:
+    """The parts of a WatchRule needed to test a listing, detached from any session."""
+
+    __slots__ = ("id", "name", "platform", "max_price_usd", "min_roi_percent", "notifier", "target")
+
+    def __init__(self, rule: WatchRule):
+        self.id = rule.id
+        self.name = rule.name
+        self.platform = rule.platform
+        self.max_price_usd = rule.max_price_usd
+        self.min_roi_percent = rule.min_roi_percent
+        self.notifier = rule.notifier
+        self.target = rule.target
+
+    def matches(self, platform: str, price_usd: float, market_price: Optional[float]) -> Optional[dict]:
+        """Return the figures behind a match (price, market price, ROI), or None."""
+        if self.platform and platform != self.platform:
+            return None
+        if self.max_price_usd is not None and price_usd > self.max_price_usd:
+            return None
+
+        figures = {"price_usd": price_usd}
+        if self.min_roi_percent is not None:
+            if not market_price or price_usd <= 0:
+                return None
+            # Same profit model as ArbitrageEngine._create_opportunity (resell on the same platform)
+            fees = market_price * Config.FEES.get(platform, 0.10)
+            profit = market_price - price_usd - fees - Config.DEFAULT_SHIPPING_COST
+            roi = profit / price_usd * 100
+            if roi < self.min_roi_percent:
+                return None
+            figures.update(market_price_usd=round(market_price, 2), roi_percent=round(roi, 1))
+        return figures
+
+
+class RuleIndex:
+    """Active rules keyed by (reference, tier), rebuilt when rules, the catalog or market prices change."""
+
+    def __init__(self):
+        self._rules = {}
+        self._market_prices = {}
+        self._generations = None
+        self.needs_estimates = False
+        self._lock = threading.Lock()
+
+    def ensure_loaded(self, session: Session):
+        generations = get_generations(session, "rules", "catalog", "market_prices")
+        if generations == self._generations:
+            return
+
+        index = {}
+        rules = session.query(WatchRule).filter(WatchRule.is_active == True).all()
+        brand_refs = {}
+        brand_ids = {rule.brand_id for rule in rules if rule.brand_id and not rule.watch_reference_id}
+        if brand_ids:
+            for ref_id, brand_id in session.query(WatchReference.id, WatchReference.brand_id).filter(
+                WatchReference.brand_id.in_(brand_ids)
+            ):
+                brand_refs.setdefault(brand_id, []).append(ref_id)
+
+        for rule in rules:
+            if rule.watch_reference_id:
+                reference_ids = [rule.watch_reference_id]
+            elif rule.brand_id:
+                reference_ids = brand_refs.get(rule.brand_id, [])
+            else:
+                reference_ids = [None]  # Every reference
+
+            compiled = CompiledRule(rule)
+            for reference_id in reference_ids:
+                index.setdefault((reference_id, rule.box_papers_status), []).append(compiled)
+
+        # ROI rules value listings as ArbitrageEngine does: MarketPrice rows
+        # (latest wins), loaded here in one query, before the listing estimate
+        needs_estimates = any(rule.min_roi_percent is not None for rule in rules)
+        market_prices = {}
+        if needs_estimates:
+            for reference_id, bp_status, price in session.query(
+                MarketPrice.watch_reference_id, MarketPrice.box_papers_status, MarketPrice.market_price_usd
+            ).order_by(MarketPrice.id):
+                market_prices.setdefault(reference_id, {})[bp_status] = price
+
+        with self._lock:
+            self._rules = index
+            self._market_prices = market_prices
+            self._generations = generations
+            self.needs_estimates = needs_estimates
+
+    def __bool__(self) -> bool:
+        return bool(self._rules)
+
+    def market_price(self, reference_id: int, tier: str) -> Optional[float]:
+        """
+        A listing's market price as ArbitrageEngine values undervalued
+        listings: the reference's MarketPrice rows if it has any, else the
+        estimate from listings; the tier's price, else the "unknown" one.
+        """
+        by_tier = self._market_prices.get(reference_id) or market_estimator.estimates(reference_id)
+        return by_tier.get(tier) or by_tier.get("unknown")
+
+    def match(self, reference_id: int, tier: str, platform: str, price_usd: float) -> list[tuple[CompiledRule, dict]]:
+        """Rules a listing satisfies, with the figures behind each match."""
+        rules = self._rules
+        market_price = self.market_price(reference_id, tier) if self.needs_estimates else None
+        matches = []
+        for key in ((reference_id, tier), (reference_id, None), (None, tier), (None, None)):
+            for rule in rules.get(key, ()):
+                figures = rule.matches(platform, price_usd, market_price)
+                if figures is not None:
+                    matches.append((rule, figures))
+        return matches
+
+
+class FileNotifier:
+    """Appends alerts to a newline-delimited JSON file."""
+
+    def __init__(self, target: Optional[str] = None):
+        self.path = target or Config.ALERT_FILE
+        self._lock = threading.Lock()
+
+    def send(self, alert: dict):
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(alert, default=str) + "\n")
+
+
+class WebhookNotifier:
+    """POSTs each alert as JSON to a URL."""
+
+    def __init__(self, target: Optional[str] = None):
+        self.url = target or Config.ALERT_WEBHOOK_URL
+        if not self.url:
+            raise ValueError("Webhook rules need a target URL or ALERT_WEBHOOK_URL")
+
+    def send(self, alert: dict):
+        response = requests.post(self.url, json=alert, timeout=Config.WEBHOOK_TIMEOUT)
+        response.raise_for_status()
+
+
+NOTIFIERS: dict[str, Callable[[Optional[str]], object]] = {
+    "file": FileNotifier,
+    "webhook": WebhookNotifier,
+}
+
+
+def register_notifier(name: str, factory: Callable[[Optional[str]], object]):
+    """Make a notifier available to rules as WatchRule.notifier == name."""
+    NOTIFIERS[name] = factory
+
+
+class AlertDispatcher:
+    """Delivers alerts from a bounded queue on a background thread, off the ingest path."""
+
+    def __init__(self, max_queue: int = Config.ALERT_QUEUE_SIZE):
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._notifiers = {}
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def send(self, rule: CompiledRule, alert: dict):
+        self._start()
+        try:
+            self._queue.put_nowait((rule, alert, time.perf_counter()))
+        except queue.Full:
+            ALERTS_DROPPED.inc(notifier=rule.notifier)
+
+    def flush(self, timeout: float = 10.0):
+        """Wait (up to timeout) until every queued alert has been handled."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="alert-dispatcher", daemon=True)
+                self._thread.start()
+
+    def _notifier(self, rule: CompiledRule):
+        key = (rule.notifier, rule.target)
+        if key not in self._notifiers:
+            self._notifiers[key] = NOTIFIERS[rule.notifier](rule.target)
+        return self._notifiers[key]
+
+    def _run(self):
+        while True:
+            rule, alert, queued_at = self._queue.get()
+            try:
+                self._notifier(rule).send(alert)
+                ALERTS_SENT.inc(notifier=rule.notifier)
+                ALERT_LATENCY.observe(time.perf_counter() - queued_at, notifier=rule.notifier)
+            except Exception as e:
+                ALERTS_DROPPED.inc(notifier=rule.notifier)
+                print(f"Alert delivery failed for rule {rule.id} ({rule.name}): {e}")
+            finally:
+                self._queue.task_done()
+
+
+def build_alert(rule: CompiledRule, reference_id: int, listing_data: dict, figures: dict) -> dict:
+    return {
+        "rule_id": rule.id,
+        "rule": rule.name,
+        "watch_reference_id": reference_id,
+        "platform": listing_data["platform"],
+        "external_id": listing_data.get("external_id"),
+        "box_papers_status": listing_data.get("box_papers_status", "unknown"),
+        "listing_url": listing_data.get("listing_url"),
+        "matched_at": datetime.utcnow().isoformat(),
+        **figures,
+    }
+
+
+def add_rule(session: Session, **fields) -> WatchRule:
+    """Create a rule; ingest picks it up on its next batch."""
+    rule = WatchRule(**fields)
+    session.add(rule)
+    bump_generation(session, "rules")
+    session.commit()
+    return rule
+
+
+# Singleton instances
+rule_index = RuleIndex()
+alert_dispatcher = AlertDispatcher()
+
+
+class _WebhookStandIn(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        print(f"[webhook] {body.decode()}", flush=True)
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_webhook(port: int):
+    """Local stand-in for a webhook receiver that prints each alert."""
+    print(f"Webhook stand-in listening on http://localhost:{port}/")
+    HTTPServer(("", port), _WebhookStandIn).serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage watch rule alerts.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="Add a watch rule")
+    add.add_argument("--name", required=True)
+    add.add_argument("--brand", help="Brand name (any reference of the brand)")
+    add.add_argument("--reference", help="Reference number")
+    add.add_argument("--tier", choices=["full_set", "papers_only", "box_only", "none", "unknown"])
+    add.add_argument("--platform")
+    add.add_argument("--max-price", type=float)
+    add.add_argument("--min-roi", type=float, help="Minimum ROI in percent")
+    add.add_argument("--notifier", choices=sorted(NOTIFIERS), default="file")
+    add.add_argument("--target", help="File path or webhook URL")
+
+    commands.add_parser("list", help="List watch rules")
+    serve = commands.add_parser("serve-webhook", help="Run a local webhook receiver")
+    serve.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    if args.command == "serve-webhook":
+        serve_webhook(args.port)
+    else:
+        init_db()
+        session = get_session()
+        try:
+            if args.command == "add":
+                fields = {
+                    "name": args.name, "box_papers_status": args.tier, "platform": args.platform,
+                    "max_price_usd": args.max_price, "min_roi_percent": args.min_roi,
+                    "notifier": args.notifier, "target": args.target,
+                }
+                if args.reference:
+                    query = session.query(WatchReference).filter(WatchReference.reference_number == args.reference)
+                    if args.brand:
+                        query = query.join(Brand).filter(Brand.name == args.brand)
+                    ref = query.first()
+                    if not ref:
+                        parser.error(f"Reference {args.reference} not found")
+                    fields["watch_reference_id"] = ref.id
+                elif args.brand:
+                    brand = session.query(Brand).filter(Brand.name == args.brand).first()
+                    if not brand:
+                        parser.error(f"Brand {args.brand} not found")
+                    fields["brand_id"] = brand.id
+
+                rule = add_rule(session, **fields)
+                print(f"Added rule {rule.id}: {rule.name}")
+            else:
+                for rule in session.query(WatchRule).order_by(WatchRule.id):
+                    state = "active" if rule.is_active else "inactive"
+                    print(f"{rule.id:>4}  {rule.name}  [{rule.notifier} {state}]")
+        finally:
+            session.close()
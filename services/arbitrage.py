@@ -7,8 +7,12 @@ from datetime import datetime
 from typing import Optional
 from sqlalchemy.orm import Session
 
-from models import Listing, MarketPrice, ArbitrageOpportunity, WatchReference
+from models import Listing, MarketPrice, ArbitrageOpportunity, WatchReference, bump_generation
+from services.events import event_broker
+from services.comps import pooled_comp_stats
+from services.market import market_estimator
 from config import Config
+from metrics import ANALYZE_PHASE
 
 
 class ArbitrageEngine:
@@ -16,106 +20,245 @@ class ArbitrageEngine:
 
     def __init__(self, session: Session):
         self.session = session
+        self._market_prices = None
+        self._comp_stats = None
+
+    # Fields recomputed on every run and copied onto the stored row
+    SYNCED_FIELDS = (
+        "watch_reference_id", "buy_price", "buy_platform", "box_papers_status",
+        "estimated_sell_price", "fair_market_value", "discount_to_market_pct",
+        "platform_fee_estimate", "shipping_estimate", "estimated_profit",
+        "roi_percent", "confidence_score"
+    )
 
     def analyze_all(self) -> list[ArbitrageOpportunity]:
         """
-        Analyze all active listings and generate arbitrage opportunities.
-        Returns newly created opportunities.
+        Analyze all active listings and sync arbitrage opportunities.
+        Returns the opportunities active after this run.
+        """
+        return self._analyze(reference_ids=None)
+
+    def analyze_references(self, reference_ids: list[int]) -> list[ArbitrageOpportunity]:
+        """
+        Analyze and sync opportunities for some references only, leaving
+        other references' opportunities untouched. Returns the active
+        opportunities for these references.
         """
-        # Clear old opportunities
-        self.session.query(ArbitrageOpportunity).filter(
-            ArbitrageOpportunity.is_active == True
-        ).update({"is_active": False})
+        return self._analyze(reference_ids=list(reference_ids))
 
+    def _analyze(self, reference_ids: Optional[list[int]]) -> list[ArbitrageOpportunity]:
         opportunities = []
 
-        # Get all active listings grouped by reference
-        references = self.session.query(WatchReference).all()
+        # Fallback market prices come from the streaming estimator
+        with ANALYZE_PHASE.time(phase="estimator"):
+            market_estimator.ensure_loaded(self.session)
+
+        # Load references, active listings and market prices in bulk
+        with ANALYZE_PHASE.time(phase="load"):
+            references = self.session.query(WatchReference)
+            listings = self.session.query(Listing).filter(Listing.is_active == True)
+            if reference_ids is not None:
+                references = references.filter(WatchReference.id.in_(reference_ids))
+                listings = listings.filter(Listing.watch_reference_id.in_(reference_ids))
+            if self._market_prices is None or reference_ids is None:
+                self._load_market_prices()
+            self._load_comp_stats(reference_ids)
+
+            listings = listings.all()
+            active_ids = {listing.id for listing in listings}
+
+            # A duplicate stands in for its listing only once that one is gone
+            listings_by_ref = {}
+            for listing in listings:
+                if listing.duplicate_of_id not in active_ids:
+                    listings_by_ref.setdefault(listing.watch_reference_id, []).append(listing)
+
+        with ANALYZE_PHASE.time(phase="detect"):
+            for ref in references:
+                active_listings = listings_by_ref.get(ref.id)
+                if not active_listings:
+                    continue
+
+                # Check for cross-platform arbitrage
+                cross_platform_opps = self._find_cross_platform_arbitrage(ref, active_listings)
+                opportunities.extend(cross_platform_opps)
+
+                # Check for undervalued listings
+                undervalued_opps = self._find_undervalued_listings(ref, active_listings)
+                opportunities.extend(undervalued_opps)
+
+        with ANALYZE_PHASE.time(phase="sync"):
+            return self._sync_opportunities(opportunities, reference_ids)
+
+    def _sync_opportunities(
+        self,
+        candidates: list[ArbitrageOpportunity],
+        reference_ids: Optional[list[int]] = None
+    ) -> list[ArbitrageOpportunity]:
+        """
+        Reconcile freshly computed opportunities with stored ones.
 
-        for ref in references:
-            active_listings = self.session.query(Listing).filter(
-                Listing.watch_reference_id == ref.id,
-                Listing.is_active == True
+        Opportunities are identified by (listing_id, opportunity_type, sell_platform).
+        Existing rows are updated in place (keeping their ID), new ones are
+        inserted and active rows that no longer qualify are retired. With
+        reference_ids, only those references' stored rows are considered.
+        """
+        now = datetime.utcnow()
+        by_key = {self._natural_key(opp): opp for opp in candidates}
+
+        # Active rows, plus retired rows for the same listings so an
+        # opportunity that comes back keeps its ID
+        if reference_ids is None:
+            stored = self.session.query(ArbitrageOpportunity).filter(
+                ArbitrageOpportunity.is_active == True
             ).all()
-
-            if not active_listings:
+        else:
+            stored = []
+            for i in range(0, len(reference_ids), 500):
+                stored.extend(self.session.query(ArbitrageOpportunity).filter(
+                    ArbitrageOpportunity.is_active == True,
+                    ArbitrageOpportunity.watch_reference_id.in_(reference_ids[i:i + 500])
+                ))
+        listing_ids = list({opp.listing_id for opp in candidates})
+        for i in range(0, len(listing_ids), 500):
+            stored.extend(self.session.query(ArbitrageOpportunity).filter(
+                ArbitrageOpportunity.is_active == False,
+                ArbitrageOpportunity.listing_id.in_(listing_ids[i:i + 500])
+            ))
+
+        added, updated, retired = [], [], []
+        active = []
+
+        # Newest row wins if older runs left several rows per key
+        existing = {}
+        for opp in sorted(stored, key=lambda o: o.id):
+            key = self._natural_key(opp)
+            if key in existing and existing[key].is_active:
+                self._retire(existing[key], now)
+                retired.append(existing[key])
+            existing[key] = opp
+
+        for key, row in existing.items():
+            if key not in by_key and row.is_active:
+                self._retire(row, now)
+                retired.append(row)
+
+        for key, candidate in by_key.items():
+            row = existing.get(key)
+            if row is None:
+                candidate.found_at = now
+                candidate.updated_at = now
+                self.session.add(candidate)
+                added.append(candidate)
+                active.append(candidate)
                 continue
 
-            # Check for cross-platform arbitrage
-            cross_platform_opps = self._find_cross_platform_arbitrage(ref, active_listings)
-            opportunities.extend(cross_platform_opps)
+            changed = any(
+                getattr(row, field) != getattr(candidate, field) for field in self.SYNCED_FIELDS
+            )
+            for field in self.SYNCED_FIELDS:
+                setattr(row, field, getattr(candidate, field))
+
+            if not row.is_active:
+                row.is_active = True
+                row.retired_at = None
+                row.updated_at = now
+                added.append(row)
+            elif changed:
+                row.updated_at = now
+                updated.append(row)
+            active.append(row)
+
+        if not (added or updated or retired):
+            self.session.commit()
+            return active
+
+        # Let dashboards know the feed changed
+        generation = bump_generation(self.session)
+        self.session.commit()
 
-            # Check for undervalued listings
-            undervalued_opps = self._find_undervalued_listings(ref, active_listings)
-            opportunities.extend(undervalued_opps)
+        event_broker.publish("opportunities", {
+            "generation": generation,
+            "added": [opp.id for opp in added],
+            "updated": [opp.id for opp in updated],
+            "retired": [opp.id for opp in retired]
+        })
 
-        # Save all opportunities
-        for opp in opportunities:
-            self.session.add(opp)
+        return active
 
-        self.session.commit()
-        return opportunities
+    def compact(self, retention_days: int = Config.OPPORTUNITY_RETENTION_DAYS) -> int:
+        """
+        Move opportunities retired more than `retention_days` ago out of the
+        hot table into the Parquet archive (services/archive.py), so their
+        history is kept. Returns rows removed from the table.
+        """
+        # pandas/pyarrow are only loaded when compacting
+        from services.archive import archive_retired_opportunities
+
+        return archive_retired_opportunities(self.session, days=retention_days)
+
+    @staticmethod
+    def _natural_key(opp: ArbitrageOpportunity) -> tuple:
+        return (opp.listing_id, opp.opportunity_type, opp.sell_platform)
+
+    @staticmethod
+    def _retire(opp: ArbitrageOpportunity, now: datetime):
+        opp.is_active = False
+        opp.retired_at = now
+        opp.updated_at = now
 
     def _find_cross_platform_arbitrage(
         self,
         ref: WatchReference,
         listings: list[Listing]
     ) -> list[ArbitrageOpportunity]:
-        """Find price differences between platforms for the same watch."""
+        """
+        Find price differences between platforms for the same watch.
+
+        Within each B&P tier, one pass per platform finds its cheapest listing
+        and average price, then every (buy platform, sell platform) pair is
+        checked in O(1): O(P^2 + n) per tier. Any platform with an entry in Config.FEES
+        can be a sell side, so adding a source needs no changes here.
+        """
         opportunities = []
 
-        # Group by B&P status
+        # Group by B&P status, then platform
         by_bp_status = {}
         for listing in listings:
-            bp = listing.box_papers_status
-            if bp not in by_bp_status:
-                by_bp_status[bp] = []
-            by_bp_status[bp].append(listing)
+            by_platform = by_bp_status.setdefault(listing.box_papers_status, {})
+            by_platform.setdefault(listing.platform, []).append(listing)
 
         # Compare within each B&P tier
-        for bp_status, bp_listings in by_bp_status.items():
-            if len(bp_listings) < 2:
-                continue
-
-            # Separate by platform
-            ebay_listings = [l for l in bp_listings if l.platform == "ebay"]
-            chrono_listings = [l for l in bp_listings if l.platform == "chrono24"]
-
-            if not ebay_listings or not chrono_listings:
+        for bp_status, by_platform in by_bp_status.items():
+            if len(by_platform) < 2:
                 continue
 
-            # Find the cheapest on each platform
-            cheapest_ebay = min(ebay_listings, key=lambda x: x.price_usd)
-            cheapest_chrono = min(chrono_listings, key=lambda x: x.price_usd)
-
-            avg_ebay = sum(l.price_usd for l in ebay_listings) / len(ebay_listings)
-            avg_chrono = sum(l.price_usd for l in chrono_listings) / len(chrono_listings)
-
-            # Check if eBay is cheaper (sell on Chrono24)
-            if cheapest_ebay.price_usd < avg_chrono * 0.9:
-                opp = self._create_opportunity(
-                    listing=cheapest_ebay,
-                    ref=ref,
-                    opportunity_type="cross_platform",
-                    estimated_sell_price=avg_chrono,
-                    sell_platform="chrono24",
-                    fair_market_value=avg_chrono
-                )
-                if opp:
-                    opportunities.append(opp)
-
-            # Check if Chrono24 is cheaper (sell on eBay)
-            if cheapest_chrono.price_usd < avg_ebay * 0.9:
-                opp = self._create_opportunity(
-                    listing=cheapest_chrono,
-                    ref=ref,
-                    opportunity_type="cross_platform",
-                    estimated_sell_price=avg_ebay,
-                    sell_platform="ebay",
-                    fair_market_value=avg_ebay
-                )
-                if opp:
-                    opportunities.append(opp)
+            # Cheapest listing and average price on each platform
+            books = {}
+            for platform, platform_listings in by_platform.items():
+                cheapest = min(platform_listings, key=lambda x: x.price_usd)
+                avg_price = sum(l.price_usd for l in platform_listings) / len(platform_listings)
+                books[platform] = (cheapest, avg_price)
+
+            for buy_platform, (cheapest, _) in books.items():
+                for sell_platform, (_, avg_sell) in books.items():
+                    if sell_platform == buy_platform or sell_platform not in Config.FEES:
+                        continue
+
+                    # Buy the cheapest here if it's well under the going rate there
+                    if cheapest.price_usd >= avg_sell * (1 - Config.MIN_CROSS_PLATFORM_SPREAD):
+                        continue
+
+                    opp = self._create_opportunity(
+                        listing=cheapest,
+                        ref=ref,
+                        opportunity_type="cross_platform",
+                        estimated_sell_price=avg_sell,
+                        sell_platform=sell_platform,
+                        fair_market_value=avg_sell
+                    )
+                    if opp:
+                        opportunities.append(opp)
 
         return opportunities
 
@@ -128,15 +271,13 @@ class ArbitrageEngine:
         opportunities = []
 
         # Get market prices by B&P status
-        market_prices = self.session.query(MarketPrice).filter(
-            MarketPrice.watch_reference_id == ref.id
-        ).all()
-
-        market_by_bp = {mp.box_papers_status: mp.market_price_usd for mp in market_prices}
+        if self._market_prices is None:
+            self._load_market_prices()
+        market_by_bp = dict(self._market_prices.get(ref.id, {}))
 
-        # If no market prices, calculate from listings
+        # If no market prices, estimate from listings
         if not market_by_bp:
-            market_by_bp = self._calculate_market_prices(listings)
+            market_by_bp = self._calculate_market_prices(ref)
 
         for listing in listings:
             bp_status = listing.box_papers_status
@@ -161,16 +302,21 @@ class ArbitrageEngine:
 
         return opportunities
 
-    def _calculate_market_prices(self, listings: list[Listing]) -> dict[str, float]:
-        """Calculate market price from listing averages when no external data."""
-        by_bp = {}
-        for listing in listings:
-            bp = listing.box_papers_status
-            if bp not in by_bp:
-                by_bp[bp] = []
-            by_bp[bp].append(listing.price_usd)
+    def _load_market_prices(self):
+        """Load market prices for every reference in one query (latest row wins)."""
+        self._market_prices = {}
+        rows = self.session.query(
+            MarketPrice.watch_reference_id, MarketPrice.box_papers_status, MarketPrice.market_price_usd
+        ).order_by(MarketPrice.id)
+        for reference_id, bp_status, price in rows:
+            self._market_prices.setdefault(reference_id, {})[bp_status] = price
 
-        return {bp: sum(prices) / len(prices) for bp, prices in by_bp.items() if prices}
+    def _calculate_market_prices(self, ref: WatchReference) -> dict[str, float]:
+        """
+        Estimate market price per B&P tier from active listings when no external data.
+        Uses a trimmed mean so a single $1 or $999,999 listing can't skew it.
+        """
+        return market_estimator.estimates(ref.id)
 
     def _create_opportunity(
         self,
@@ -226,11 +372,43 @@ class ArbitrageEngine:
             is_active=True
         )
 
+    def _load_comp_stats(self, reference_ids: Optional[list[int]] = None):
+        """Pooled comp statistics for confidence scoring (all references, or merged in for some)."""
+        comp_stats = pooled_comp_stats(self.session, reference_ids)
+        if reference_ids is None or self._comp_stats is None:
+            self._comp_stats = comp_stats
+        else:
+            self._comp_stats.update(comp_stats)
+
     def _calculate_confidence(self, listing: Listing, ref: WatchReference) -> int:
-        """Calculate confidence score (0-100) for an opportunity."""
-        score = 50  # Base score
+        """
+        Calculate confidence score (0-100) for an opportunity, weighted as in
+        the plan: comps 30, price stability 25, listing age 15, seller rating
+        15, B&P match 15.
+        """
+        if self._comp_stats is None:
+            self._load_comp_stats()
+        comps = self._comp_stats.get((ref.id, listing.box_papers_status))
+        score = 0.0
+
+        # Number of comps, excluding the listing itself
+        comp_count = comps["count"] - 1 if comps else 0
+        score += 30 * min(comp_count, Config.CONFIDENCE_FULL_COMPS) / Config.CONFIDENCE_FULL_COMPS
+
+        # Price stability: IQR relative to the mean (robust to the odd outlier)
+        if comps and comp_count >= 2 and comps["mean"] > 0:
+            dispersion = comps["iqr"] / comps["mean"]
+            score += 25 * max(0.0, 1 - dispersion / Config.CONFIDENCE_MAX_DISPERSION)
+
+        # Listing age
+        if listing.created_at:
+            age_days = (datetime.utcnow() - listing.created_at).days
+            if age_days <= 7:
+                score += 15
+            elif age_days <= 30:
+                score += 8
 
-        # Seller rating bonus
+        # Seller rating
         if listing.seller_rating:
             if listing.seller_rating >= 99:
                 score += 15
@@ -239,14 +417,8 @@ class ArbitrageEngine:
             elif listing.seller_rating >= 90:
                 score += 5
 
-        # B&P status clarity
+        # B&P match: a known tier with comps in that same tier
         if listing.box_papers_status != "unknown":
-            score += 10
-
-        # Platform reliability
-        if listing.platform == "ebay":
-            score += 5  # eBay has buyer protection
+            score += 15 if comp_count else 8
 
-        # Listing freshness (would need more data)
-        # For now, just cap at 100
-        return min(score, 100)
+        return min(round(score), 100)
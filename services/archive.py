@@ -0,0 +1,220 @@
+"""
+Cold-storage archival of inactive listings (with their price events) and retired opportunities.
+
+Rows that have been inactive longer than Config.ARCHIVE_AFTER_DAYS are written
+to date-partitioned, compressed Parquet files and then deleted from the hot
+tables in bounded batches. Retired opportunities usually go sooner: the
+compaction after each scan archives them after OPPORTUNITY_RETENTION_DAYS.
+Files are laid out as:
+
+    {ARCHIVE_DIR}/{table}/date=YYYY-MM-DD/part-{first_id}-{last_id}.parquet
+
+Use load_history() to query archived and live rows together.
+"""
+
+import argparse
+import os
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+import pandas as pd
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from models import engine, get_session, bump_generation, Listing, ListingLSHBucket, ListingPriceEvent, ArbitrageOpportunity
+from services.comps import rebuild_comp_stats
+from config import Config
+
+
+def _listing_date():
+    return Listing.scraped_at
+
+
+def _price_event_date():
+    return ListingPriceEvent.changed_at
+
+
+def _opportunity_date():
+    return func.coalesce(ArbitrageOpportunity.retired_at, ArbitrageOpportunity.found_at)
+
+
+# Archived tables: model and the timestamp used to age and partition rows
+ARCHIVED_TABLES = {
+    "arbitrage_opportunities": (ArbitrageOpportunity, _opportunity_date),
+    "listing_price_events": (ListingPriceEvent, _price_event_date),
+    "listings": (Listing, _listing_date),
+}
+
+
+def archive_inactive(
+    session: Session,
+    days: int = Config.ARCHIVE_AFTER_DAYS,
+    batch_size: int = Config.ARCHIVE_BATCH_SIZE,
+    archive_dir: str = Config.ARCHIVE_DIR
+) -> dict[str, int]:
+    """
+    Move rows inactive for more than `days` days into Parquet partitions.
+    Returns the number of rows archived per table.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=days)
+
+    listing_filter = [
+        Listing.is_active == False,
+        Listing.scraped_at < cutoff,
+        ~select(ArbitrageOpportunity.id).where(
+            ArbitrageOpportunity.listing_id == Listing.id
+        ).exists()
+    ]
+
+    # Price events go with their listing
+    price_event_filter = [
+        ListingPriceEvent.listing_id.in_(select(Listing.id).where(*listing_filter))
+    ]
+
+    # Duplicate fingerprints are only kept for live listings, and listings
+    # duplicating an archived one count on their own from now on
+    archivable = select(Listing.id).where(*listing_filter)
+    session.query(ListingLSHBucket).filter(
+        ListingLSHBucket.listing_id.in_(archivable)
+    ).delete(synchronize_session=False)
+    relinked = session.query(Listing).filter(
+        Listing.duplicate_of_id.in_(archivable)
+    ).update({"duplicate_of_id": None}, synchronize_session=False)
+    session.commit()
+    if relinked:
+        rebuild_comp_stats(session)
+        bump_generation(session, "listings")
+        session.commit()
+
+    return {
+        # Opportunities go first so the listings they point at become archivable
+        "arbitrage_opportunities": archive_retired_opportunities(session, days, batch_size, archive_dir),
+        "listing_price_events": _archive_table(
+            session, "listing_price_events", price_event_filter, batch_size, archive_dir
+        ),
+        "listings": _archive_table(session, "listings", listing_filter, batch_size, archive_dir),
+    }
+
+
+def archive_retired_opportunities(
+    session: Session,
+    days: int = Config.ARCHIVE_AFTER_DAYS,
+    batch_size: int = Config.ARCHIVE_BATCH_SIZE,
+    archive_dir: str = Config.ARCHIVE_DIR
+) -> int:
+    """
+    Move opportunities retired more than `days` days ago into Parquet
+    partitions (ArbitrageEngine.compact() uses this). Returns rows archived.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    return _archive_table(session, "arbitrage_opportunities", [
+        ArbitrageOpportunity.is_active == False,
+        _opportunity_date() < cutoff
+    ], batch_size, archive_dir)
+
+
+def _archive_table(session: Session, table: str, filters: list, batch_size: int, archive_dir: str) -> int:
+    """Archive matching rows one batch (and one short transaction) at a time."""
+    model, date_column = ARCHIVED_TABLES[table]
+    columns = [c.name for c in model.__table__.columns]
+    archived = 0
+
+    while True:
+        rows = session.execute(
+            select(model.__table__, date_column().label("_archive_date"))
+            .where(*filters)
+            .order_by(model.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+
+        frame = pd.DataFrame.from_records(rows, columns=columns + ["_archive_date"])
+        partition_dates = pd.to_datetime(frame.pop("_archive_date")).dt.date
+
+        for partition_date, part in frame.groupby(partition_dates):
+            _write_partition(part, table, partition_date, archive_dir)
+
+        # Files are on disk before the rows go; a crash in between only
+        # leaves duplicates, which load_history() drops by ID
+        ids = frame["id"].tolist()
+        session.query(model).filter(model.id.in_(ids)).delete(synchronize_session=False)
+        session.commit()
+        archived += len(ids)
+
+    return archived
+
+
+def _write_partition(frame: pd.DataFrame, table: str, partition_date: date, archive_dir: str):
+    directory = os.path.join(archive_dir, table, f"date={partition_date.isoformat()}")
+    os.makedirs(directory, exist_ok=True)
+
+    path = os.path.join(directory, f"part-{frame['id'].min()}-{frame['id'].max()}.parquet")
+    tmp_path = f"{path}.tmp"
+    frame.to_parquet(tmp_path, index=False, compression="zstd")
+    os.replace(tmp_path, path)
+
+
+def load_history(
+    table: str,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    include_hot: bool = True,
+    archive_dir: str = Config.ARCHIVE_DIR
+) -> pd.DataFrame:
+    """
+    Load rows of `table` dated between `start` and `end` (inclusive) from the
+    archive, unioned with rows still in the database.
+
+    Only archive partitions inside the date range are read.
+    """
+    model, date_column = ARCHIVED_TABLES[table]
+    frames = []
+
+    table_dir = os.path.join(archive_dir, table)
+    if os.path.isdir(table_dir):
+        for partition in sorted(os.listdir(table_dir)):
+            if not partition.startswith("date="):
+                continue
+            partition_date = date.fromisoformat(partition[len("date="):])
+            if (start and partition_date < start) or (end and partition_date > end):
+                continue
+
+            partition_dir = os.path.join(table_dir, partition)
+            for name in sorted(os.listdir(partition_dir)):
+                if name.endswith(".parquet"):
+                    frames.append(pd.read_parquet(os.path.join(partition_dir, name)))
+
+    if include_hot:
+        query = select(model.__table__)
+        if start:
+            query = query.where(date_column() >= datetime.combine(start, datetime.min.time()))
+        if end:
+            query = query.where(date_column() < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+        with engine.connect() as connection:
+            frames.append(pd.read_sql(query, connection))
+
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame(columns=[c.name for c in model.__table__.columns])
+
+    history = pd.concat(frames, ignore_index=True)
+    # Live rows come last, so they win over any stale archived copy
+    return history.drop_duplicates(subset="id", keep="last").sort_values("id", ignore_index=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive inactive rows to Parquet.")
+    parser.add_argument("--days", type=int, default=Config.ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--batch-size", type=int, default=Config.ARCHIVE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    session = get_session()
+    try:
+        counts = archive_inactive(session, days=args.days, batch_size=args.batch_size)
+        print(
+            f"Archived {counts['listings']} listings ({counts['listing_price_events']} price events) "
+            f"and {counts['arbitrage_opportunities']} opportunities"
+        )
+    finally:
+        session.close()
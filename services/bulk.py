@@ -0,0 +1,175 @@
+"""
+Bulk listing loader for imports, mock/synthetic data and backfills.
+
+Listings are upserted by (platform, external_id), in batches of
+BULK_BATCH_SIZE rows, each committed on its own. A listing that's already
+stored keeps its ID, reference and created_at. Its price, seller and other
+columns are replaced by the loaded row. The load is dialect-aware:
+  - PostgreSQL: each batch is COPYed into a temporary staging table and
+    merged into listings with one INSERT ... SELECT ... ON CONFLICT, so a
+    batch costs three statements however many rows it has.
+  - SQLite: one executemany INSERT ... ON CONFLICT per batch.
+  - Other dialects: a plain executemany INSERT per batch (no upsert).
+
+Rows are dicts of Listing columns. watch_reference_id, platform, price,
+price_usd and listing_url are required; the others default as on the model.
+Within a batch, the last row for a (platform, external_id) wins. Rows
+without an external_id are always inserted.
+
+The loader bypasses the scanner, so it doesn't record price events, check
+watch rules or look for duplicates. Callers rebuild comp statistics (or
+pass the prices they loaded to services.comps.replace_comp_stats) and bump
+the "listings" generation when they're done (see mock_data.py). Run
+`python -m services.dedupe backfill` to fingerprint loaded listings.
+
+    python -m services.bulk listings.ndjson [--batch-size 10000]
+"""
+
+import argparse
+import io
+import json
+from datetime import datetime
+from typing import Iterable, Iterator
+
+from sqlalchemy import insert, text
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from models import init_db, get_session, bump_generation, Listing
+from services.comps import rebuild_comp_stats
+from config import Config
+
+# Loaded columns, in COPY order
+COLUMNS = (
+    "watch_reference_id", "platform", "external_id", "price", "currency", "price_usd",
+    "box_papers_status", "condition", "seller_name", "seller_rating", "listing_url",
+    "image_url", "location", "title", "is_active", "scraped_at", "created_at",
+)
+# Kept from the stored row when a loaded listing already exists
+KEEP_ON_CONFLICT = ("watch_reference_id", "created_at")
+DEFAULTS = {"currency": "USD", "box_papers_status": "unknown", "is_active": True}
+
+STAGING_TABLE = "listings_staging"
+# Characters escaped in COPY's text format
+COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def load_listings(session: Session, rows: Iterable[dict], batch_size: int = Config.BULK_BATCH_SIZE) -> int:
+    """Upsert listing rows in committed batches. Returns the number of rows written."""
+    postgres = session.get_bind().dialect.name == "postgresql"
+    written = 0
+    for batch in _batches(rows, batch_size):
+        written += _copy_merge(session, batch) if postgres else _executemany(session, batch)
+        session.commit()
+    return written
+
+
+def _batches(rows: Iterable[dict], batch_size: int) -> Iterator[list[tuple]]:
+    """Complete rows as COPY-ordered tuples, the last of each (platform, external_id) per batch."""
+    now = datetime.utcnow()
+    defaults = {**DEFAULTS, "scraped_at": now, "created_at": now}
+    batch, keyed = [], {}
+    for row in rows:
+        values = tuple(
+            row[column] if row.get(column) is not None else defaults.get(column) for column in COLUMNS
+        )
+        if values[2] is None:
+            batch.append(values)
+        else:
+            keyed[(values[1], values[2])] = values
+        if len(batch) + len(keyed) >= batch_size:
+            yield batch + list(keyed.values())
+            batch, keyed = [], {}
+    if batch or keyed:
+        yield batch + list(keyed.values())
+
+
+def _executemany(session: Session, batch: list[tuple]) -> int:
+    # Statements on the table, not the model: a Core executemany skips the
+    # ORM's per-row bulk insert bookkeeping
+    params = [dict(zip(COLUMNS, values)) for values in batch]
+    if session.get_bind().dialect.name != "sqlite":
+        session.execute(insert(Listing.__table__), params)
+        return len(batch)
+
+    statement = sqlite_insert(Listing.__table__)
+    session.execute(
+        statement.on_conflict_do_update(
+            index_elements=["platform", "external_id"],
+            set_={column: statement.excluded[column] for column in COLUMNS if column not in KEEP_ON_CONFLICT}
+        ),
+        params
+    )
+    return len(batch)
+
+
+def _copy_text(value) -> str:
+    """
+    A value in COPY's text format, as psycopg 3 writes it: NULL is \\N, and
+    backslashes, tabs and line breaks are escaped.
+    """
+    if value is None:
+        return r"\N"
+    if isinstance(value, str):
+        return value.translate(COPY_ESCAPES)
+    return str(value)
+
+
+def _copy_merge(session: Session, batch: list[tuple]) -> int:
+    """COPY a batch into the staging table and merge it into listings in one statement."""
+    columns = ", ".join(COLUMNS)
+    session.execute(text(
+        f"CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} "
+        f"ON COMMIT DELETE ROWS AS SELECT {columns} FROM listings WITH NO DATA"
+    ))
+
+    # psycopg2 takes COPY data as a file; psycopg 3 streams rows
+    cursor = session.connection().connection.driver_connection.cursor()
+    try:
+        if hasattr(cursor, "copy_expert"):
+            buffer = io.StringIO()
+            for values in batch:
+                buffer.write("\t".join(_copy_text(value) for value in values) + "\n")
+            buffer.seek(0)
+            cursor.copy_expert(f"COPY {STAGING_TABLE} ({columns}) FROM STDIN", buffer)
+        else:
+            with cursor.copy(f"COPY {STAGING_TABLE} ({columns}) FROM STDIN") as copy:
+                for values in batch:
+                    copy.write_row(values)
+    finally:
+        cursor.close()
+
+    updates = ", ".join(f"{column} = EXCLUDED.{column}" for column in COLUMNS if column not in KEEP_ON_CONFLICT)
+    result = session.execute(text(
+        f"INSERT INTO listings ({columns}) SELECT {columns} FROM {STAGING_TABLE} "
+        f"ON CONFLICT (platform, external_id) DO UPDATE SET {updates}"
+    ))
+    return result.rowcount
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-load listings from an NDJSON file.")
+    parser.add_argument("path", help="One listing object per line")
+    parser.add_argument("--batch-size", type=int, default=Config.BULK_BATCH_SIZE)
+    args = parser.parse_args()
+
+    def read_rows(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    row = json.loads(line)
+                    for column in ("scraped_at", "created_at"):
+                        if row.get(column):
+                            row[column] = datetime.fromisoformat(row[column])
+                    yield row
+
+    init_db()
+    session = get_session()
+    try:
+        count = load_listings(session, read_rows(args.path), args.batch_size)
+        bump_generation(session, "listings")
+        session.commit()
+        rebuild_comp_stats(session)
+        print(f"Loaded {count} listings")
+    finally:
+        session.close()
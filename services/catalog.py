@@ -0,0 +1,204 @@
+"""
+Bulk import of the watch catalog (brands and references) from CSV or JSON.
+
+Records are streamed from the file and upserted by (brand, reference_number)
+in batches: new references are bulk-inserted and existing ones are updated
+in place when a field changed. Nothing is ever deleted, so re-importing a
+catalog keeps reference IDs, and the listings that point at them, stable.
+
+CSV columns / JSON keys: brand, reference_number, model_name, collection,
+case_size_mm, movement, image_url and optionally brand_slug. JSON files are
+either an array of objects (.json) or one object per line (.ndjson, .jsonl).
+
+    python -m services.catalog catalog.csv [--batch-size 500]
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+from typing import Iterable, Iterator, Optional
+
+from sqlalchemy import insert, update
+from sqlalchemy.orm import Session
+
+from models import init_db, get_session, bump_generation, Brand, WatchReference
+from config import Config
+
+# Reference columns set from the catalog; empty values never overwrite stored ones
+CATALOG_FIELDS = ("model_name", "collection", "case_size_mm", "movement", "image_url")
+
+
+def iter_records(path: str) -> Iterator[dict]:
+    """Stream raw catalog records from a .csv, .json, .ndjson or .jsonl file."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        with open(path, newline="", encoding="utf-8") as f:
+            yield from csv.DictReader(f)
+    elif extension in (".ndjson", ".jsonl"):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    elif extension == ".json":
+        with open(path, encoding="utf-8") as f:
+            yield from json.load(f)
+    else:
+        raise ValueError(f"Unsupported catalog format: {path}")
+
+
+def slugify(name: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+
+
+def _clean(record: dict) -> Optional[dict]:
+    """Normalize one record; None if it has no brand/reference or a malformed field."""
+    brand = str(record.get("brand") or "").strip()
+    reference_number = str(record.get("reference_number") or "").strip()
+    if not brand or not reference_number:
+        return None
+
+    cleaned = {
+        "brand": brand,
+        "brand_slug": str(record.get("brand_slug") or "").strip() or slugify(brand),
+        "reference_number": reference_number,
+    }
+    for field in CATALOG_FIELDS:
+        value = record.get(field)
+        if isinstance(value, str):
+            value = value.strip()
+        if value is None or value == "":
+            continue
+        if field == "case_size_mm":
+            try:
+                value = int(float(value))
+            except ValueError:
+                return None
+        cleaned[field] = value
+    return cleaned
+
+
+class CatalogImporter:
+    """Upserts cleaned catalog records into brands and watch_references in batches."""
+
+    def __init__(self, session: Session, batch_size: int = Config.CATALOG_BATCH_SIZE):
+        self.session = session
+        self.batch_size = batch_size
+        self.stats = {"brands_added": 0, "added": 0, "updated": 0, "unchanged": 0, "skipped": 0}
+
+        # Brands are few; keep them all in memory
+        self.brand_ids = {}
+        self.slugs = set()
+        for brand_id, name, slug in session.query(Brand.id, Brand.name, Brand.slug):
+            self.brand_ids[name] = brand_id
+            self.slugs.add(slug)
+
+    def run(self, records: Iterable[dict]) -> dict[str, int]:
+        batch = {}
+        for record in records:
+            cleaned = _clean(record)
+            if cleaned is None:
+                self.stats["skipped"] += 1
+                continue
+
+            # Repeats of a reference within a batch are merged, later values winning
+            batch.setdefault((cleaned["brand"], cleaned["reference_number"]), {}).update(cleaned)
+            if len(batch) >= self.batch_size:
+                self._upsert(batch)
+                batch = {}
+
+        if batch:
+            self._upsert(batch)
+
+        # Let caches built from the catalog (e.g. the watch rule index) refresh
+        if self.stats["added"] or self.stats["updated"] or self.stats["brands_added"]:
+            bump_generation(self.session, "catalog")
+            self.session.commit()
+        return self.stats
+
+    def _add_brands(self, batch: dict):
+        new_brands = {}
+        for record in batch.values():
+            name = record["brand"]
+            if name in self.brand_ids or name in new_brands:
+                continue
+            slug, suffix = record["brand_slug"], 2
+            while slug in self.slugs:
+                slug, suffix = f"{record['brand_slug']}-{suffix}", suffix + 1
+            self.slugs.add(slug)
+            new_brands[name] = slug
+
+        if not new_brands:
+            return
+        self.session.execute(insert(Brand), [{"name": name, "slug": slug} for name, slug in new_brands.items()])
+        for brand_id, name in self.session.query(Brand.id, Brand.name).filter(Brand.name.in_(new_brands)):
+            self.brand_ids[name] = brand_id
+        self.stats["brands_added"] += len(new_brands)
+
+    def _upsert(self, batch: dict):
+        self._add_brands(batch)
+
+        # One lookup for the whole batch, matched on (brand_id, reference_number)
+        numbers = list({number for _, number in batch})
+        existing = {
+            (row.brand_id, row.reference_number): row
+            for row in self.session.query(
+                WatchReference.id, WatchReference.brand_id, WatchReference.reference_number,
+                *(getattr(WatchReference, field) for field in CATALOG_FIELDS)
+            ).filter(WatchReference.reference_number.in_(numbers))
+        }
+
+        inserts, updates = [], []
+        for (brand, number), record in batch.items():
+            brand_id = self.brand_ids[brand]
+            values = {field: record[field] for field in CATALOG_FIELDS if field in record}
+            row = existing.get((brand_id, number))
+
+            if row is None:
+                inserts.append({"brand_id": brand_id, "reference_number": number, **values})
+            elif any(getattr(row, field) != value for field, value in values.items()):
+                updates.append({"id": row.id, **values})
+            else:
+                self.stats["unchanged"] += 1
+
+        if inserts:
+            self.session.execute(insert(WatchReference), inserts)
+        if updates:
+            self.session.execute(update(WatchReference), updates)
+        self.session.commit()
+
+        self.stats["added"] += len(inserts)
+        self.stats["updated"] += len(updates)
+
+
+def import_catalog(
+    session: Session,
+    records: Iterable[dict],
+    batch_size: int = Config.CATALOG_BATCH_SIZE
+) -> dict[str, int]:
+    """
+    Upsert catalog records by (brand, reference_number). Idempotent and
+    non-destructive. Returns counts of brands_added, added, updated,
+    unchanged and skipped references.
+    """
+    return CatalogImporter(session, batch_size).run(records)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import a watch catalog from CSV or JSON.")
+    parser.add_argument("path", help="Catalog file (.csv, .json, .ndjson or .jsonl)")
+    parser.add_argument("--batch-size", type=int, default=Config.CATALOG_BATCH_SIZE)
+    args = parser.parse_args()
+
+    init_db()
+    session = get_session()
+    try:
+        stats = import_catalog(session, iter_records(args.path), batch_size=args.batch_size)
+        print(
+            f"Catalog import: {stats['added']} added, {stats['updated']} updated, "
+            f"{stats['unchanged']} unchanged, {stats['skipped']} skipped, "
+            f"{stats['brands_added']} new brands"
+        )
+    finally:
+        session.close()
@@ -0,0 +1,252 @@
+"""
+Comp statistics: running price statistics of active listings per
+(reference, B&P tier, platform), kept in comp_stats for confidence scoring.
+Duplicates of other listings (services.dedupe) aren't counted.
+
+The scanner records every listing that becomes active, changes price or
+goes inactive in a CompTracker and flushes it before committing. Flushing
+reads the touched rows in one query and writes them back in bulk: count,
+mean and variance with Welford's update (run in reverse for removals), the
+IQR from a QuantileSketch stored with the row. The touched keys are
+upserted first, so workers adding or updating the same key take turns.
+The engine reads the table in one query, so confidence scoring adds no
+per-listing queries.
+
+Listings written outside the scanner (mock data, bulk loads) aren't
+tracked; those loaders pass their prices to replace_comp_stats, or the
+table can be rebuilt from active listings:
+
+    python -m services.comps rebuild
+"""
+
+import argparse
+import math
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import bindparam, insert, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from models import init_db, get_session, CompStat, Listing
+from services.market import QuantileSketch
+
+
+def _state(row: Optional[CompStat] = None) -> dict:
+    """Welford state (count, mean, sum of squared deviations) plus sketch, from a stored row."""
+    if row is None or not row.comp_count:
+        return {"count": 0, "mean": 0.0, "m2": 0.0, "sketch": QuantileSketch()}
+    return {
+        "count": row.comp_count,
+        "mean": row.mean_price_usd,
+        "m2": (row.variance or 0.0) * (row.comp_count - 1),
+        "sketch": QuantileSketch.from_json(row.sketch),
+    }
+
+
+def _accumulate(state: dict, price: float, sign: int):
+    """Add (sign 1) or remove (sign -1) one price."""
+    if price is None or price <= 0:
+        return
+    count, mean = state["count"], state["mean"]
+
+    if sign > 0:
+        count += 1
+        delta = price - mean
+        mean += delta / count
+        state["m2"] += delta * (price - mean)
+        state["sketch"].add(price)
+    elif count == 1:
+        count, mean, state["m2"] = 0, 0.0, 0.0
+        state["sketch"].remove(price)
+    elif count > 1:
+        previous = mean
+        mean = (count * mean - price) / (count - 1)
+        count -= 1
+        state["m2"] = max(state["m2"] - (price - previous) * (price - mean), 0.0)
+        state["sketch"].remove(price)
+
+    state["count"], state["mean"] = count, mean
+
+
+def _values(state: dict) -> dict:
+    """Column values for a state."""
+    count, sketch = state["count"], state["sketch"]
+    return {
+        "comp_count": count,
+        "mean_price_usd": state["mean"] if count else None,
+        "variance": state["m2"] / (count - 1) if count > 1 else (0.0 if count else None),
+        "iqr_usd": sketch.quantile(0.75) - sketch.quantile(0.25) if count else None,
+        "sketch": sketch.to_json(),
+        "updated_at": datetime.utcnow(),
+    }
+
+
+class CompTracker:
+    """Pending comp statistic changes, written by flush() in the caller's transaction."""
+
+    def __init__(self):
+        self._changes = {}  # (reference_id, tier, platform) -> [(price, +1 or -1)]
+
+    def add(self, reference_id: int, tier: str, platform: str, price: float):
+        self._changes.setdefault((reference_id, tier or "unknown", platform), []).append((price, 1))
+
+    def remove(self, reference_id: int, tier: str, platform: str, price: float):
+        self._changes.setdefault((reference_id, tier or "unknown", platform), []).append((price, -1))
+
+    def update(self, reference_id: int, tier: str, platform: str, old_price: float, new_price: float):
+        self.remove(reference_id, tier, platform, old_price)
+        self.add(reference_id, tier, platform, new_price)
+
+    def flush(self, session: Session):
+        """Apply pending changes to comp_stats. The caller commits."""
+        if not self._changes:
+            return
+        changes, self._changes = self._changes, {}
+
+        # Make sure every key has a row first. Besides creating new keys
+        # without colliding with another worker adding the same one, the
+        # upsert locks the rows (SQLite: the database) before they're read,
+        # so concurrent flushes of a key apply one after the other
+        _upsert_empty(session, list(changes))
+
+        reference_ids = sorted({reference_id for reference_id, _, _ in changes})
+        # Plain rows, written back with bulk statements: no ORM objects to track
+        query = session.query(
+            CompStat.id, CompStat.watch_reference_id, CompStat.box_papers_status, CompStat.platform,
+            CompStat.comp_count, CompStat.mean_price_usd, CompStat.variance, CompStat.sketch
+        )
+        stored = {}
+        for i in range(0, len(reference_ids), 500):
+            for row in query.filter(CompStat.watch_reference_id.in_(reference_ids[i:i + 500])):
+                stored[(row.watch_reference_id, row.box_papers_status, row.platform)] = row
+
+        updates = []
+        for key, prices in changes.items():
+            row = stored[key]
+            state = _state(row)
+            for price, sign in prices:
+                _accumulate(state, price, sign)
+            updates.append({"stat_id": row.id, **_values(state)})
+
+        # A Core executemany: this runs once per saved batch, usually for a
+        # row or two, where the ORM's bulk update costs several times more
+        table = CompStat.__table__
+        session.execute(table.update().where(table.c.id == bindparam("stat_id")), updates)
+
+
+def _upsert_empty(session: Session, keys: list[tuple]):
+    """Insert empty comp_stats rows for the keys; rows that already exist only get updated_at."""
+    rows = [
+        {"watch_reference_id": reference_id, "box_papers_status": tier, "platform": platform,
+         **_values(_state())}
+        for reference_id, tier, platform in keys
+    ]
+    dialect = session.get_bind().dialect.name
+    if dialect not in ("postgresql", "sqlite"):
+        # No upsert: insert the keys that aren't there yet
+        existing = set(session.query(CompStat.watch_reference_id, CompStat.box_papers_status, CompStat.platform)
+                       .filter(CompStat.watch_reference_id.in_({key[0] for key in keys})))
+        rows = [row for key, row in zip(keys, rows) if key not in existing]
+        if rows:
+            session.execute(insert(CompStat.__table__), rows)
+        return
+
+    statement = (postgresql_insert if dialect == "postgresql" else sqlite_insert)(CompStat.__table__)
+    session.execute(
+        statement.on_conflict_do_update(
+            index_elements=["watch_reference_id", "box_papers_status", "platform"],
+            set_={"updated_at": statement.excluded.updated_at}
+        ),
+        rows
+    )
+
+
+def rebuild_comp_stats(session: Session) -> int:
+    """Recompute comp_stats from active listings. Returns the number of rows."""
+    prices_by_key = {}
+    # Plain rows from the connection; the ORM result layer costs more than the grouping
+    for reference_id, tier, platform, price in session.connection().execute(
+        select(Listing.watch_reference_id, Listing.box_papers_status, Listing.platform, Listing.price_usd)
+        .where(Listing.is_active == True, Listing.duplicate_of_id.is_(None), Listing.price_usd > 0)
+    ):
+        prices_by_key.setdefault((reference_id, tier or "unknown", platform), []).append(price)
+    return replace_comp_stats(session, prices_by_key)
+
+
+def replace_comp_stats(session: Session, prices_by_key: dict[tuple, list[float]]) -> int:
+    """
+    Replace comp_stats with the statistics of the given prices, keyed by
+    (reference, tier, platform), and commit. Returns the number of rows.
+    Loaders that already hold every active price call this directly rather
+    than rebuild_comp_stats.
+    """
+    # Whole groups at once rather than _accumulate per price: a two-pass
+    # variance and one bucket count per group
+    rows = []
+    for (reference_id, tier, platform), prices in prices_by_key.items():
+        count = len(prices)
+        mean = math.fsum(prices) / count
+        sketch = QuantileSketch()
+        sketch.add_all(prices)
+        state = {"count": count, "mean": mean, "m2": math.fsum((p - mean) ** 2 for p in prices), "sketch": sketch}
+        rows.append({"watch_reference_id": reference_id, "box_papers_status": tier, "platform": platform,
+                     **_values(state)})
+
+    session.query(CompStat).delete(synchronize_session=False)
+    if rows:
+        session.execute(insert(CompStat.__table__), rows)
+    session.commit()
+    return len(rows)
+
+
+def pooled_comp_stats(session: Session, reference_ids: Optional[list[int]] = None) -> dict[tuple, dict]:
+    """
+    Comp statistics per (reference, tier), pooled across platforms, in one
+    query (per 500 references). Values: count, mean, variance and iqr (the
+    count-weighted mean of the platforms' IQRs).
+    """
+    query = session.query(
+        CompStat.watch_reference_id, CompStat.box_papers_status, CompStat.comp_count,
+        CompStat.mean_price_usd, CompStat.variance, CompStat.iqr_usd
+    ).filter(CompStat.comp_count > 0)
+
+    if reference_ids is None:
+        rows = query.all()
+    else:
+        rows = []
+        for i in range(0, len(reference_ids), 500):
+            rows.extend(query.filter(CompStat.watch_reference_id.in_(reference_ids[i:i + 500])))
+
+    by_key = {}
+    for reference_id, tier, count, mean, variance, iqr in rows:
+        by_key.setdefault((reference_id, tier), []).append((count, mean, variance or 0.0, iqr or 0.0))
+
+    pooled = {}
+    for key, parts in by_key.items():
+        count = sum(n for n, _, _, _ in parts)
+        mean = sum(n * m for n, m, _, _ in parts) / count
+        # Chan et al.: within-platform plus between-platform squared deviations
+        m2 = sum(v * (n - 1) + n * (m - mean) ** 2 for n, m, v, _ in parts)
+        pooled[key] = {
+            "count": count,
+            "mean": mean,
+            "variance": m2 / (count - 1) if count > 1 else 0.0,
+            "iqr": sum(n * iqr for n, _, _, iqr in parts) / count,
+        }
+    return pooled
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Comp statistics.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("rebuild", help="Recompute comp_stats from active listings")
+    args = parser.parse_args()
+
+    init_db()
+    session = get_session()
+    try:
+        print(f"Rebuilt {rebuild_comp_stats(session)} comp statistics")
+    finally:
+        session.close()
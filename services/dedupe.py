@@ -0,0 +1,265 @@
+"""
+Duplicate listing detection.
+
+Dealers often list one watch on both eBay and Chrono24 (or relist it),
+which would otherwise look like a cross-platform spread against itself
+and count twice in comps. New listings are fingerprinted at ingest:
+
+  - Title: lowercased, minus the words every listing of the reference
+    shares (brand, reference number, model, collection) and filler words,
+    cut into character shingles and summarized by a MinHash signature.
+  - Features: reference, B&P tier, price, seller and, optionally
+    (DEDUPE_IMAGE_HASH, needs Pillow), a difference hash of the image.
+
+Candidates come from a locality-sensitive hashing index. The signature is
+split into DEDUPE_LSH_BANDS bands, and each band is hashed to a bucket kept
+in listing_lsh_buckets (indexed), so a batch's candidates take one indexed
+lookup instead of a comparison with every listing. Candidates are
+confirmed on exact shingle similarity and the features, and the new
+listing is linked to the earlier one through Listing.duplicate_of_id.
+
+Duplicates are left out of the market estimate and comp statistics, and
+out of opportunity detection while the listing they duplicate is active.
+When the scanner marks that listing inactive, its earliest active
+duplicate takes its place (Scanner._deactivate).
+
+    python -m services.dedupe backfill    # Fingerprint active listings ingested before this existed
+"""
+
+import argparse
+import functools
+import io
+import random
+import re
+import struct
+import zlib
+from typing import Optional
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from models import init_db, get_session, bump_generation, Brand, Listing, ListingLSHBucket, WatchReference
+from services.images import PIL_AVAILABLE, image_cache
+from config import Config
+
+SHINGLE_SIZE = 4
+MIN_TOKENS = 2  # Titles with fewer distinctive words left aren't indexed
+
+# Words that say nothing about which particular watch is for sale
+FILLER = {
+    "a", "and", "auto", "automatic", "authentic", "for", "genuine", "in", "ladies", "men", "mens",
+    "new", "of", "ref", "reference", "sale", "the", "w", "watch", "watches", "with", "womens",
+}
+
+_PRIME = (1 << 61) - 1
+
+# MinHash permutations h -> (a * h + b) mod p, the same in every process
+_rng = random.Random(Config.DEDUPE_PERMUTATIONS)
+PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(_PRIME)) for _ in range(Config.DEDUPE_PERMUTATIONS)]
+
+
+def _words(text: Optional[str]) -> list[str]:
+    return re.findall(r"[a-z0-9]+", (text or "").lower())
+
+
+def title_tokens(title: Optional[str], shared: set[str]) -> list[str]:
+    """The distinctive words of a title."""
+    return [word for word in _words(title) if word not in shared and word not in FILLER]
+
+
+def shingles(tokens: list[str]) -> set[str]:
+    text = " ".join(tokens)
+    if len(text) <= SHINGLE_SIZE:
+        return {text} if text else set()
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def minhash(shingle_set: set[str]) -> list[int]:
+    hashes = [zlib.crc32(shingle.encode()) for shingle in shingle_set]
+    return [min((a * h + b) % _PRIME for h in hashes) for a, b in PERMUTATIONS]
+
+
+def lsh_buckets(signature: list[int]) -> list[int]:
+    """One bucket per band; the band number is hashed in, so buckets don't collide across bands."""
+    rows = len(signature) // Config.DEDUPE_LSH_BANDS
+    buckets = []
+    for band in range(Config.DEDUPE_LSH_BANDS):
+        values = signature[band * rows:(band + 1) * rows]
+        bucket = zlib.crc32(struct.pack(f">{rows + 1}Q", band, *values))
+        buckets.append(bucket - (1 << 32) if bucket >= 1 << 31 else bucket)  # Fits a signed INTEGER
+    return buckets
+
+
+def jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+@functools.lru_cache(maxsize=4096)
+def image_hash(url: Optional[str]) -> Optional[int]:
+    """64-bit difference hash of a listing image (through the image cache), or None."""
+    if not url or not PIL_AVAILABLE:
+        return None
+    from PIL import Image
+
+    try:
+        data, _, _ = image_cache.get(url)
+        with Image.open(io.BytesIO(data)) as image:
+            pixels = list(image.convert("L").resize((9, 8)).getdata())
+    except Exception:
+        return None
+
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            value = value << 1 | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return value
+
+
+def _seller(name: Optional[str]) -> str:
+    return "".join(_words(name))
+
+
+def is_duplicate(listing: Listing, listing_shingles: set, other: Listing, other_shingles: set) -> bool:
+    """Whether two listings (of any platforms) are the same watch."""
+    if listing.watch_reference_id != other.watch_reference_id:
+        return False
+    if len({listing.box_papers_status, other.box_papers_status} - {"unknown", None}) > 1:
+        return False
+    if abs(listing.price_usd - other.price_usd) > Config.DEDUPE_PRICE_TOLERANCE * max(listing.price_usd, other.price_usd):
+        return False
+
+    # Different sellers on one platform are different watches
+    same_seller = bool(_seller(listing.seller_name)) and _seller(listing.seller_name) == _seller(other.seller_name)
+    if listing.platform == other.platform and not same_seller:
+        return False
+
+    similarity = jaccard(listing_shingles, other_shingles)
+    if similarity >= Config.DEDUPE_MIN_SIMILARITY:
+        return True
+    if similarity < Config.DEDUPE_MIN_SIMILARITY / 2:
+        return False
+    if same_seller:
+        return True
+    if Config.DEDUPE_IMAGE_HASH:
+        a, b = image_hash(listing.image_url), image_hash(other.image_url)
+        return a is not None and b is not None and bin(a ^ b).count("1") <= Config.DEDUPE_MAX_IMAGE_DISTANCE
+    return False
+
+
+def _shared_words(session: Session, reference_ids: set[int]) -> dict[int, set[str]]:
+    """Words every listing title of a reference is expected to contain."""
+    rows = session.query(
+        WatchReference.id, Brand.name, WatchReference.reference_number,
+        WatchReference.model_name, WatchReference.collection
+    ).join(Brand).filter(WatchReference.id.in_(reference_ids))
+    return {reference_id: set(_words(" ".join(filter(None, parts)))) for reference_id, *parts in rows}
+
+
+def link_duplicates(session: Session, listings: list[Listing]) -> set[int]:
+    """
+    Fingerprint and index new (flushed) listings, linking each to an earlier
+    listing of the same watch if there is one. Returns the IDs of the
+    listings marked as duplicates. The caller commits.
+    """
+    listings = sorted((listing for listing in listings if listing.title), key=lambda listing: listing.id)
+    if not listings:
+        return set()
+
+    shared = _shared_words(session, {listing.watch_reference_id for listing in listings})
+    fingerprints = {}
+    for listing in listings:
+        tokens = title_tokens(listing.title, shared.get(listing.watch_reference_id, set()))
+        if len(tokens) >= MIN_TOKENS:
+            shingle_set = shingles(tokens)
+            fingerprints[listing.id] = (shingle_set, lsh_buckets(minhash(shingle_set)))
+    if not fingerprints:
+        return set()
+
+    # Earlier listings sharing a bucket with any of the batch, in one lookup per 500 buckets
+    buckets = sorted({bucket for _, listing_buckets in fingerprints.values() for bucket in listing_buckets})
+    by_bucket = {}
+    for i in range(0, len(buckets), 500):
+        for listing_id, bucket in session.execute(
+            select(ListingLSHBucket.listing_id, ListingLSHBucket.bucket)
+            .where(ListingLSHBucket.bucket.in_(buckets[i:i + 500]))
+        ):
+            by_bucket.setdefault(bucket, set()).add(listing_id)
+
+    candidate_ids = sorted({listing_id for ids in by_bucket.values() for listing_id in ids})
+    candidates = {}
+    for i in range(0, len(candidate_ids), 500):
+        for candidate in session.query(Listing).filter(
+            Listing.id.in_(candidate_ids[i:i + 500]), Listing.is_active == True
+        ):
+            tokens = title_tokens(candidate.title, shared.get(candidate.watch_reference_id, set()))
+            candidates[candidate.id] = (candidate, shingles(tokens))
+
+    duplicates, bucket_rows = set(), []
+    for listing in listings:
+        if listing.id not in fingerprints:
+            continue
+        shingle_set, listing_buckets = fingerprints[listing.id]
+
+        matches = set()
+        for bucket in listing_buckets:
+            matches |= by_bucket.get(bucket, set())
+        for candidate_id in sorted(matches):
+            candidate, candidate_shingles = candidates.get(candidate_id, (None, None))
+            if candidate is not None and is_duplicate(listing, shingle_set, candidate, candidate_shingles):
+                listing.duplicate_of_id = candidate.duplicate_of_id or candidate.id
+                duplicates.add(listing.id)
+                break
+
+        # Later listings in the batch can match this one
+        candidates[listing.id] = (listing, shingle_set)
+        for bucket in listing_buckets:
+            by_bucket.setdefault(bucket, set()).add(listing.id)
+            bucket_rows.append({"listing_id": listing.id, "bucket": bucket})
+
+    if bucket_rows:
+        session.execute(insert(ListingLSHBucket), bucket_rows)
+    return duplicates
+
+
+def backfill(session: Session, batch_size: int = 500) -> dict[str, int]:
+    """Fingerprint active titled listings that aren't indexed yet, oldest first."""
+    from services.comps import rebuild_comp_stats
+
+    indexed = select(ListingLSHBucket.listing_id)
+    stats = {"listings": 0, "duplicates": 0}
+    last_id = 0
+    while True:
+        batch = session.query(Listing).filter(
+            Listing.id > last_id,
+            Listing.is_active == True,
+            Listing.title.isnot(None),
+            Listing.id.not_in(indexed)
+        ).order_by(Listing.id).limit(batch_size).all()
+        if not batch:
+            break
+        stats["duplicates"] += len(link_duplicates(session, batch))
+        stats["listings"] += len(batch)
+        last_id = batch[-1].id
+        session.commit()
+
+    if stats["duplicates"]:
+        # Duplicates leave the market estimate and comps
+        rebuild_comp_stats(session)
+        bump_generation(session, "listings")
+        session.commit()
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Duplicate listing detection.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("backfill", help="Fingerprint active listings that aren't indexed yet")
+    args = parser.parse_args()
+
+    init_db()
+    session = get_session()
+    try:
+        stats = backfill(session)
+        print(f"Fingerprinted {stats['listings']} listings, {stats['duplicates']} duplicates linked")
+    finally:
+        session.close()
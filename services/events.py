@@ -0,0 +1,114 @@
+"""
+In-process event broker for pushing live updates to connected dashboards.
+Events are delivered to the browser as server-sent events (see /events in app.py).
+
+The broker only reaches subscribers in the process that publishes: a scan
+run by the app delivers its opportunity diffs to the dashboards connected
+to the same worker. Dashboards on other gunicorn workers, and every
+dashboard when the scan runs elsewhere (cli.py, the pipeline, the scan
+queue workers), learn of it through the generation poll in stream()
+within one heartbeat, and re-render instead of patching.
+
+Each stream holds a gunicorn thread for as long as it's open, so a worker
+accepts at most EVENT_MAX_STREAMS of them and closes each after
+EVENT_STREAM_SECONDS; the browser reconnects on its own (live_updates.js).
+"""
+
+import json
+import queue
+import threading
+import time
+from typing import Callable, Iterator, Optional
+
+from config import Config
+
+
+class EventBroker:
+    """Fan-out of published events to per-connection queues."""
+
+    def __init__(self, max_queue: int = 100, max_streams: int = Config.EVENT_MAX_STREAMS):
+        self.max_queue = max_queue
+        self.max_streams = max_streams
+        self._subscribers: set[queue.Queue] = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self) -> Optional[queue.Queue]:
+        """Register a new subscriber and return its queue, or None if max_streams are open."""
+        subscription = queue.Queue(maxsize=self.max_queue)
+        with self._lock:
+            if len(self._subscribers) >= self.max_streams:
+                return None
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: queue.Queue):
+        """Remove a subscriber."""
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, event: str, data: dict):
+        """Send an event to every subscriber. Slow subscribers drop the event."""
+        with self._lock:
+            subscribers = list(self._subscribers)
+
+        for subscription in subscribers:
+            try:
+                subscription.put_nowait((event, data))
+            except queue.Full:
+                # The client will catch up through the generation poll
+                pass
+
+    def stream(
+        self,
+        subscription: queue.Queue,
+        heartbeat: float = 15.0,
+        poll: Optional[Callable[[], int]] = None,
+        max_age: float = Config.EVENT_STREAM_SECONDS
+    ) -> Iterator[str]:
+        """
+        Yield server-sent event frames for a subscription until the client
+        disconnects or max_age seconds have passed.
+
+        Args:
+            subscription: Queue returned by subscribe()
+            heartbeat: Seconds between keep-alive frames
+            poll: Optional callable returning the current scan generation. Changes
+                  made by other processes (which can't publish to this broker)
+                  are reported as a "generation" event.
+            max_age: Seconds before the stream ends, freeing its thread
+        """
+        last_generation = poll() if poll else None
+        deadline = time.monotonic() + max_age
+
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                try:
+                    event, data = subscription.get(timeout=min(heartbeat, remaining))
+                except queue.Empty:
+                    if time.monotonic() >= deadline:
+                        return
+                    if poll:
+                        generation = poll()
+                        if generation != last_generation:
+                            last_generation = generation
+                            yield self._format("generation", {"generation": generation})
+                            continue
+                    yield ": keepalive\n\n"
+                    continue
+
+                if "generation" in data:
+                    last_generation = data["generation"]
+                yield self._format(event, data)
+        finally:
+            self.unsubscribe(subscription)
+
+    @staticmethod
+    def _format(event: str, data: dict) -> str:
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+# Singleton instance
+event_broker = EventBroker()
@@ -0,0 +1,148 @@
+"""
+Streaming bulk export of listings and opportunities as CSV, NDJSON or Parquet.
+
+Rows are read in keyset-paginated chunks (id > last_id), each in its own
+short read transaction, so an export of millions of rows uses constant
+memory and never holds a lock that would block a scan's writes.
+"""
+
+import csv
+import io
+import json
+from typing import Iterator
+
+from sqlalchemy import Boolean, DateTime, Float, Integer, select
+
+from models import engine, Listing, ArbitrageOpportunity
+
+
+EXPORT_TABLES = {
+    "listings": Listing,
+    "opportunities": ArbitrageOpportunity,
+}
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+CHUNK_SIZE = 5000
+
+
+def iter_chunks(table: str, active_only: bool = False, chunk_size: int = CHUNK_SIZE) -> Iterator[list[dict]]:
+    """Yield rows of an export table as lists of dicts, `chunk_size` at a time."""
+    columns = EXPORT_TABLES[table].__table__.c
+    last_id = 0
+
+    while True:
+        query = select(columns).where(columns.id > last_id)
+        if active_only:
+            query = query.where(columns.is_active == True)
+        query = query.order_by(columns.id).limit(chunk_size)
+
+        # One short transaction per chunk
+        with engine.connect() as connection:
+            result = connection.execution_options(yield_per=chunk_size).execute(query)
+            chunk = [dict(row._mapping) for partition in result.partitions() for row in partition]
+
+        if not chunk:
+            return
+        last_id = chunk[-1]["id"]
+        yield chunk
+
+
+def export_rows(table: str, fmt: str, active_only: bool = False, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Stream an export table in the given format as a sequence of byte chunks."""
+    chunks = iter_chunks(table, active_only=active_only, chunk_size=chunk_size)
+    if fmt == "csv":
+        return _csv(table, chunks)
+    if fmt == "ndjson":
+        return _ndjson(chunks)
+    if fmt == "parquet":
+        return _parquet(table, chunks)
+    raise ValueError(f"Unknown export format: {fmt}")
+
+
+def _csv(table: str, chunks: Iterator[list[dict]]) -> Iterator[bytes]:
+    names = [c.name for c in EXPORT_TABLES[table].__table__.columns]
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=names)
+    writer.writeheader()
+
+    for chunk in chunks:
+        writer.writerows(chunk)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def _ndjson(chunks: Iterator[list[dict]]) -> Iterator[bytes]:
+    for chunk in chunks:
+        yield "".join(json.dumps(row, default=str) + "\n" for row in chunk).encode()
+
+
+class _StreamSink(io.RawIOBase):
+    """Write-only file that hands back whatever was written since the last drain."""
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+# pyarrow is imported on first Parquet export, not when the dashboard starts
+def _arrow_schema(table: str):
+    import pyarrow as pa
+
+    fields = []
+    for column in EXPORT_TABLES[table].__table__.columns:
+        if isinstance(column.type, Integer):
+            arrow_type = pa.int64()
+        elif isinstance(column.type, Float):
+            arrow_type = pa.float64()
+        elif isinstance(column.type, Boolean):
+            arrow_type = pa.bool_()
+        elif isinstance(column.type, DateTime):
+            arrow_type = pa.timestamp("us")
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(column.name, arrow_type))
+    return pa.schema(fields)
+
+
+def _parquet(table: str, chunks: Iterator[list[dict]]) -> Iterator[bytes]:
+    """One row group per chunk, flushed to the client as soon as it's written."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema(table)
+    sink = _StreamSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+
+    try:
+        for chunk in chunks:
+            writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+
+    yield sink.drain()
@@ -0,0 +1,298 @@
+"""
+Image proxy and thumbnail cache for opportunity cards.
+
+Cards point at /img?url=<listing image> instead of the marketplace. The
+first request for an image fetches it, downscales it to IMAGE_THUMB_SIZE
+(with Pillow, when installed; otherwise the original is cached as is) and
+stores it on disk. Later requests are served from disk with a year-long
+Cache-Control, so each browser also asks at most once per image.
+
+Cache files are named by a hash of the source URL and thumbnail size,
+sharded by its first two hex digits. The cache is bounded by
+IMAGE_CACHE_MAX_BYTES: hits refresh a file's mtime and the least recently
+used files are evicted first.
+
+Only hosts in IMAGE_PROXY_HOSTS (and their subdomains) are fetched, also
+across redirects, so the proxy can't be pointed at arbitrary URLs. For
+local testing, run a stand-in origin that serves generated PNGs and logs
+each request it gets:
+
+    python -m services.images serve-origin --port 8766
+    IMAGE_PROXY_HOSTS=localhost python app.py
+    curl -I "http://localhost:8050/img?url=http://localhost:8766/300x300/rolex.png"
+"""
+
+import argparse
+import hashlib
+import importlib.util
+import io
+import os
+import struct
+import threading
+import zlib
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import quote, urljoin, urlparse
+
+import requests
+
+from config import Config
+from metrics import IMAGE_CACHE_EVICTIONS
+
+# Pillow is optional; without it thumbnails are the original images
+PIL_AVAILABLE = importlib.util.find_spec("PIL") is not None
+
+# Card image when there is none, or it can't be proxied
+PLACEHOLDER = "/assets/placeholder.svg"
+
+MAX_REDIRECTS = 3
+
+# Raster formats passed through (SVG is never proxied: it can carry scripts)
+_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+
+def sniff_type(data: bytes) -> Optional[str]:
+    """MIME type of a supported image from its first bytes, or None."""
+    for signature, mimetype in _SIGNATURES:
+        if data.startswith(signature):
+            return mimetype
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+def host_allowed(url: str) -> bool:
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        return False
+    host = parsed.hostname.lower()
+    return any(
+        host == allowed or host.endswith(f".{allowed}")
+        for allowed in (h.strip().lower() for h in Config.IMAGE_PROXY_HOSTS) if allowed
+    )
+
+
+def proxied_src(url: Optional[str]) -> str:
+    """Card image src for a listing's image URL."""
+    if not url or not host_allowed(url):
+        return PLACEHOLDER
+    return f"/img?url={quote(url, safe='')}"
+
+
+def fetch_image(url: str) -> bytes:
+    """Download an image, following redirects only to allowed hosts."""
+    for _ in range(MAX_REDIRECTS + 1):
+        if not host_allowed(url):
+            raise ValueError(f"Image host not allowed: {url}")
+
+        with requests.get(url, timeout=Config.IMAGE_FETCH_TIMEOUT, stream=True, allow_redirects=False) as response:
+            if response.is_redirect:
+                url = urljoin(url, response.headers["Location"])
+                continue
+            response.raise_for_status()
+
+            data = bytearray()
+            for chunk in response.iter_content(64 * 1024):
+                data += chunk
+                if len(data) > Config.IMAGE_MAX_SOURCE_BYTES:
+                    raise ValueError(f"Image larger than {Config.IMAGE_MAX_SOURCE_BYTES} bytes: {url}")
+
+        if sniff_type(bytes(data)) is None:
+            raise ValueError(f"Not a supported image: {url}")
+        return bytes(data)
+
+    raise ValueError(f"Too many redirects: {url}")
+
+
+def make_thumbnail(data: bytes, size: int) -> bytes:
+    """Downscale to fit in size x size, as JPEG. Returns the original without Pillow."""
+    if not PIL_AVAILABLE:
+        return data
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as image:
+        image.thumbnail((size, size))
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        out = io.BytesIO()
+        image.save(out, "JPEG", quality=80, optimize=True)
+    return out.getvalue()
+
+
+class ImageCache:
+    """Thumbnails on disk, bounded in size with least-recently-used eviction."""
+
+    def __init__(
+        self,
+        directory: str = Config.IMAGE_CACHE_DIR,
+        max_bytes: int = Config.IMAGE_CACHE_MAX_BYTES,
+        size: int = Config.IMAGE_THUMB_SIZE
+    ):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.size = size
+        self._total = None  # Bytes on disk; counted on the first write
+        self._lock = threading.Lock()
+        self._fetching = {}  # key -> [lock, waiters], so concurrent misses fetch once
+
+    def key(self, url: str) -> str:
+        return hashlib.sha256(f"{self.size}:{url}".encode()).hexdigest()
+
+    def get(self, url: str) -> tuple[bytes, str, bool]:
+        """
+        Thumbnail for an image URL, fetching it on a miss.
+        Returns (bytes, cache key, whether it was cached). Raises ValueError
+        for disallowed hosts and non-images, and requests errors from the fetch.
+        """
+        if not host_allowed(url):
+            raise ValueError(f"Image host not allowed: {url}")
+
+        key = self.key(url)
+        data = self._read(key)
+        if data is not None:
+            return data, key, True
+
+        with self._key_lock(key):
+            # Another request may have fetched it while we waited
+            data = self._read(key)
+            if data is not None:
+                return data, key, True
+            data = make_thumbnail(fetch_image(url), self.size)
+            self._write(key, data)
+        return data, key, False
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def _read(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)  # Recently used
+            return data
+        except FileNotFoundError:
+            return None
+
+    def _write(self, key: str, data: bytes):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._total is None:
+                self._total = self._disk_usage()[0]
+            else:
+                self._total += len(data)
+            if self._total > self.max_bytes:
+                self._evict()
+
+    def _disk_usage(self) -> tuple[int, list]:
+        files = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith(".tmp"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        return sum(size for _, size, _ in files), files
+
+    def _evict(self):
+        """Remove least recently used files until the cache is at 90% of its bound."""
+        total, files = self._disk_usage()
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes * 0.9:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            total -= size
+            IMAGE_CACHE_EVICTIONS.inc()
+        self._total = total
+
+    @contextmanager
+    def _key_lock(self, key: str):
+        with self._lock:
+            entry = self._fetching.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._fetching[key]
+
+
+# Singleton instance
+image_cache = ImageCache()
+
+
+def _png(width: int, height: int, rgb: tuple[int, int, int]) -> bytes:
+    """A solid-color PNG, without Pillow."""
+    def chunk(tag: bytes, body: bytes) -> bytes:
+        return struct.pack(">I", len(body)) + tag + body + struct.pack(">I", zlib.crc32(tag + body))
+
+    rows = (b"\x00" + bytes(rgb) * width) * height
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(rows)) + chunk(b"IEND", b"")
+
+
+class _OriginStandIn(BaseHTTPRequestHandler):
+    """Serves /<width>x<height>/<name>.png as a PNG colored by name."""
+
+    def do_GET(self):
+        print(f"[origin] GET {self.path}", flush=True)
+        try:
+            dimensions, name = self.path.strip("/").split("/", 1)
+            width, height = (min(int(n), 2000) for n in dimensions.split("x"))
+        except ValueError:
+            self.send_error(404)
+            return
+
+        body = _png(width, height, tuple(hashlib.md5(name.encode()).digest()[:3]))
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_origin(port: int):
+    """Local stand-in for a marketplace image host."""
+    print(f"Image origin stand-in listening on http://localhost:{port}/")
+    ThreadingHTTPServer(("", port), _OriginStandIn).serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Card image proxy tools.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    origin = commands.add_parser("serve-origin", help="Run a local stand-in image host")
+    origin.add_argument("--port", type=int, default=8766)
+    fetch = commands.add_parser("fetch", help="Fetch an image through the cache")
+    fetch.add_argument("url")
+    args = parser.parse_args()
+
+    if args.command == "serve-origin":
+        serve_origin(args.port)
+    else:
+        data, key, cached = image_cache.get(args.url)
+        print(f"{key}: {len(data)} bytes, {sniff_type(data)}, {'cached' if cached else 'fetched'}")
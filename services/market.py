@@ -0,0 +1,210 @@
+"""
+Streaming market price estimates from active listings.
+Used when no external market data (MarketPrice rows) exists for a reference.
+"""
+
+import json
+import math
+import threading
+from collections import Counter
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from models import Listing, get_generation
+from config import Config
+
+
+class QuantileSketch:
+    """
+    Log-bucketed histogram with bounded relative error (DDSketch-style).
+
+    Adding or removing a value is O(1). Quantiles and trimmed means walk the
+    buckets, whose number depends on the price range, not the listing count.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.005):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets: dict[int, int] = {}
+        self.count = 0
+
+    def _key(self, value: float) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def _value(self, key: int) -> float:
+        # Midpoint of (gamma^(key-1), gamma^key] in relative terms
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def add(self, value: float):
+        if value <= 0:
+            return
+        key = self._key(value)
+        self.buckets[key] = self.buckets.get(key, 0) + 1
+        self.count += 1
+
+    def add_all(self, values: list[float]):
+        """Add many values at once; like add(), non-positive values are skipped."""
+        log_gamma = self._log_gamma
+        keys = Counter(math.ceil(math.log(value) / log_gamma) for value in values if value > 0)
+        for key, count in keys.items():
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        self.count += sum(keys.values())
+
+    def remove(self, value: float):
+        if value <= 0:
+            return
+        key = self._key(value)
+        remaining = self.buckets.get(key, 0) - 1
+        if remaining < 0:
+            return
+        if remaining:
+            self.buckets[key] = remaining
+        else:
+            del self.buckets[key]
+        self.count -= 1
+
+    def to_json(self) -> str:
+        return json.dumps(self.buckets)
+
+    @classmethod
+    def from_json(cls, data: Optional[str]) -> "QuantileSketch":
+        sketch = cls()
+        if data:
+            sketch.buckets = {int(key): count for key, count in json.loads(data).items()}
+            sketch.count = sum(sketch.buckets.values())
+        return sketch
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Approximate q-quantile (0 <= q <= 1)."""
+        if not self.count:
+            return None
+
+        rank = q * (self.count - 1)
+        seen = 0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen > rank:
+                return self._value(key)
+        return self._value(max(self.buckets))
+
+    def trimmed_mean(self, trim: float) -> Optional[float]:
+        """Mean of the values between the `trim` and `1 - trim` quantiles."""
+        if not self.count:
+            return None
+
+        low = trim * self.count
+        high = (1 - trim) * self.count
+        if high <= low:
+            return self.quantile(0.5)
+
+        total = 0.0
+        seen = 0
+        for key in sorted(self.buckets):
+            bucket_count = self.buckets[key]
+            # Portion of this bucket that falls inside [low, high]
+            weight = min(seen + bucket_count, high) - max(seen, low)
+            if weight > 0:
+                total += weight * self._value(key)
+            seen += bucket_count
+            if seen >= high:
+                break
+
+        return total / (high - low)
+
+
+class MarketEstimator:
+    """
+    Outlier-resistant market price per (reference, B&P tier).
+
+    Kept up to date incrementally by the scanner as listings arrive, change
+    price or go inactive (once the scanner's transaction commits), and
+    loaded from the database in one query whenever another process has
+    changed listings since we last looked.
+    """
+
+    def __init__(self, trim: float = Config.MARKET_TRIM_FRACTION):
+        self.trim = trim
+        self._sketches: dict[int, dict[str, QuantileSketch]] = {}
+        self._cache: dict[tuple[int, str], Optional[float]] = {}
+        self._generation = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._generation is not None
+
+    def ensure_loaded(self, session: Session):
+        """(Re)build from active listings if listings changed outside this process."""
+        generation = get_generation(session, "listings")
+        if generation == self._generation:
+            return
+
+        rows = session.query(
+            Listing.watch_reference_id, Listing.box_papers_status, Listing.price_usd
+        ).filter(Listing.is_active == True, Listing.duplicate_of_id.is_(None))
+
+        with self._lock:
+            self._sketches = {}
+            self._cache = {}
+            for reference_id, tier, price in rows:
+                self._sketch(reference_id, tier).add(price)
+            self._generation = generation
+
+    def advance(self, previous: int, generation: int):
+        """
+        Record that listings moved from generation `previous` to `generation`
+        through this estimator's own updates. If we weren't in sync with
+        `previous`, someone else changed listings and we reload next time.
+        """
+        with self._lock:
+            if self._generation == previous:
+                self._generation = generation
+            else:
+                self._generation = None
+
+    def add(self, reference_id: int, tier: str, price: float):
+        if not self.is_loaded:
+            return
+        with self._lock:
+            self._sketch(reference_id, tier).add(price)
+            self._cache.pop((reference_id, tier), None)
+
+    def remove(self, reference_id: int, tier: str, price: float):
+        if not self.is_loaded:
+            return
+        with self._lock:
+            self._sketch(reference_id, tier).remove(price)
+            self._cache.pop((reference_id, tier), None)
+
+    def update(self, reference_id: int, old_tier: str, old_price: float, new_tier: str, new_price: float):
+        self.remove(reference_id, old_tier, old_price)
+        self.add(reference_id, new_tier, new_price)
+
+    def estimate(self, reference_id: int, tier: str) -> Optional[float]:
+        """Trimmed-mean market price for a reference and tier, if any listings exist."""
+        key = (reference_id, tier)
+        with self._lock:
+            if key not in self._cache:
+                sketch = self._sketches.get(reference_id, {}).get(tier)
+                self._cache[key] = sketch.trimmed_mean(self.trim) if sketch else None
+            return self._cache[key]
+
+    def estimates(self, reference_id: int) -> dict[str, float]:
+        """Market price for every B&P tier of a reference."""
+        results = {}
+        for tier in list(self._sketches.get(reference_id, {})):
+            price = self.estimate(reference_id, tier)
+            if price:
+                results[tier] = price
+        return results
+
+    def _sketch(self, reference_id: int, tier: str) -> QuantileSketch:
+        tiers = self._sketches.setdefault(reference_id, {})
+        if tier not in tiers:
+            tiers[tier] = QuantileSketch()
+        return tiers[tier]
+
+
+# Singleton instance
+market_estimator = MarketEstimator()
@@ -0,0 +1,196 @@
+"""
+Market price refresh from WatchCharts.
+
+refresh_market_prices() picks the references whose WatchCharts price is
+missing or older than MARKET_PRICE_TTL_HOURS. References with the most
+active listings go first, since their prices drive the most
+opportunities, up to MARKET_PRICE_REFRESH_LIMIT per run.
+
+At the 1 request/second budget a reference takes one second. The first
+time it takes two: its UUID is resolved once and stored in
+WatchReference.watchcharts_uuid. References WatchCharts doesn't list are
+stored with an empty UUID and skipped after that; clear the column to
+retry them.
+
+Every lookup that gets an answer stamps WatchReference.watchcharts_checked_at,
+so a reference WatchCharts has no USD price for isn't due again until the
+TTL passes. A UUID WatchCharts no longer knows (404) is cleared and
+resolved again on the next lookup.
+
+Prices are written in bulk, per MARKET_PRICE_BATCH_SIZE references, in
+one transaction:
+  - the WatchCharts market_prices row of each reference (full-set tier)
+    is replaced, so the table keeps one current price per reference
+  - price_history gets a row per price
+
+    python -m services.market_data refresh [--limit 300]
+    python -m services.market_data due [--limit 20]     # What the next refresh would fetch
+"""
+
+import argparse
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+import requests
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm import Session
+
+from models import init_db, get_session, bump_generation, Brand, Listing, MarketPrice, PriceHistory, WatchReference
+from api.watchcharts import watchcharts_client
+from config import Config
+
+SOURCE = "watchcharts"
+
+
+def due_references(
+    session: Session,
+    limit: int = Config.MARKET_PRICE_REFRESH_LIMIT,
+    ttl_hours: int = Config.MARKET_PRICE_TTL_HOURS
+) -> list:
+    """
+    References due a refresh, most active listings first, then the oldest
+    (or missing) prices. A reference is due when neither its price nor its
+    last lookup is newer than the TTL. Rows: id, brand, reference_number,
+    watchcharts_uuid, active_listings, recorded_at.
+    """
+    cutoff = datetime.utcnow() - timedelta(hours=ttl_hours)
+    latest = select(
+        MarketPrice.watch_reference_id, func.max(MarketPrice.recorded_at).label("recorded_at")
+    ).where(MarketPrice.source == SOURCE).group_by(MarketPrice.watch_reference_id).subquery()
+    active = select(
+        Listing.watch_reference_id, func.count(Listing.id).label("active_listings")
+    ).where(Listing.is_active == True).group_by(Listing.watch_reference_id).subquery()
+    active_listings = func.coalesce(active.c.active_listings, 0)
+
+    return session.query(
+        WatchReference.id,
+        Brand.name.label("brand"),
+        WatchReference.reference_number,
+        WatchReference.watchcharts_uuid,
+        active_listings.label("active_listings"),
+        latest.c.recorded_at
+    ).join(Brand).outerjoin(
+        latest, latest.c.watch_reference_id == WatchReference.id
+    ).outerjoin(
+        active, active.c.watch_reference_id == WatchReference.id
+    ).filter(
+        (latest.c.recorded_at.is_(None)) | (latest.c.recorded_at < cutoff),
+        (WatchReference.watchcharts_checked_at.is_(None)) | (WatchReference.watchcharts_checked_at < cutoff),
+        # An empty UUID marks references WatchCharts doesn't list
+        (WatchReference.watchcharts_uuid.is_(None)) | (WatchReference.watchcharts_uuid != "")
+    ).order_by(
+        active_listings.desc(), latest.c.recorded_at.isnot(None), latest.c.recorded_at, WatchReference.id
+    ).limit(limit).all()
+
+
+def refresh_market_prices(
+    session: Session,
+    limit: int = Config.MARKET_PRICE_REFRESH_LIMIT,
+    client=watchcharts_client,
+    on_progress: Optional[Callable[[dict], None]] = None
+) -> dict:
+    """
+    Fetch prices for up to `limit` due references. Returns counts, the
+    refreshed reference IDs (to re-analyze) and errors. A 429 from
+    WatchCharts ends the run early; the rest stay due for the next one.
+    """
+    stats = {"checked": 0, "refreshed": 0, "resolved": 0, "unlisted": 0, "reference_ids": [], "errors": []}
+    if not client.is_available():
+        stats["errors"].append("WatchCharts API key not configured")
+        return stats
+
+    checked, prices = [], []
+    for ref in due_references(session, limit):
+        stats["checked"] += 1
+        uuid = ref.watchcharts_uuid
+        try:
+            if uuid is None:
+                uuid = client.resolve_uuid(ref.brand, ref.reference_number) or ""
+                stats["resolved" if uuid else "unlisted"] += 1
+            price = client.market_price(uuid) if uuid else None
+        except requests.HTTPError as e:
+            status = e.response.status_code if e.response is not None else None
+            stats["errors"].append(f"WatchCharts error for {ref.reference_number}: {str(e)}")
+            if status == 429:
+                break
+            if status == 404 and uuid:
+                # Stale UUID: resolve it again next time
+                checked.append({"id": ref.id, "watchcharts_uuid": None, "watchcharts_checked_at": datetime.utcnow()})
+            continue
+        except Exception as e:
+            stats["errors"].append(f"WatchCharts error for {ref.reference_number}: {str(e)}")
+            continue
+
+        # References without a (USD) price aren't looked up again until the TTL passes
+        checked.append({"id": ref.id, "watchcharts_uuid": uuid, "watchcharts_checked_at": datetime.utcnow()})
+        if price:
+            prices.append((ref.id, price))
+        if len(checked) >= Config.MARKET_PRICE_BATCH_SIZE:
+            _write(session, checked, prices, stats)
+            checked, prices = [], []
+            if on_progress:
+                on_progress({key: value for key, value in stats.items() if key not in ("reference_ids", "errors")})
+
+    _write(session, checked, prices, stats)
+    return stats
+
+
+def _write(session: Session, checked: list[dict], prices: list[tuple], stats: dict):
+    """Store lookups (UUIDs, checked_at) and replace the references' WatchCharts prices, in one transaction."""
+    if checked:
+        session.execute(update(WatchReference), checked)
+    if prices:
+        now = datetime.utcnow()
+        reference_ids = [reference_id for reference_id, _ in prices]
+        session.query(MarketPrice).filter(
+            MarketPrice.source == SOURCE, MarketPrice.watch_reference_id.in_(reference_ids)
+        ).delete(synchronize_session=False)
+        session.execute(insert(MarketPrice), [
+            {
+                "watch_reference_id": reference_id,
+                "box_papers_status": "full_set",
+                "market_price_usd": price["market_price_usd"],
+                "dealer_price_usd": price["dealer_price_usd"],
+                "source": SOURCE,
+                "recorded_at": now,
+            }
+            for reference_id, price in prices
+        ])
+        session.execute(insert(PriceHistory), [
+            {"watch_reference_id": reference_id, "date": now, "market_price_usd": price["market_price_usd"], "source": SOURCE}
+            for reference_id, price in prices
+        ])
+        bump_generation(session, "market_prices")
+        stats["refreshed"] += len(prices)
+        stats["reference_ids"] += reference_ids
+    session.commit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="WatchCharts market prices.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    refresh = commands.add_parser("refresh", help="Fetch prices for references that are due")
+    refresh.add_argument("--limit", type=int, default=Config.MARKET_PRICE_REFRESH_LIMIT)
+    due = commands.add_parser("due", help="List references the next refresh would fetch")
+    due.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    init_db()
+    session = get_session()
+    try:
+        if args.command == "due":
+            for ref in due_references(session, args.limit):
+                print(
+                    f"{ref.id:>6}  {ref.brand} {ref.reference_number}  "
+                    f"{ref.active_listings} active  last {ref.recorded_at or 'never'}"
+                )
+        else:
+            stats = refresh_market_prices(session, args.limit)
+            print(
+                f"Refreshed {stats['refreshed']} of {stats['checked']} references "
+                f"({stats['resolved']} UUIDs resolved, {stats['unlisted']} not on WatchCharts)"
+            )
+            for error in stats["errors"]:
+                print(f"  {error}")
+    finally:
+        session.close()
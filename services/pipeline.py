@@ -0,0 +1,192 @@
+"""
+Streaming scan -> analysis pipeline.
+
+The batch flow (Scanner.scan_all_references, then ArbitrageEngine.analyze_all)
+finds nothing until every reference has been scanned. Here the scanner runs
+on a producer thread and hands each scanned reference to a bounded queue;
+the calling thread analyzes references as they arrive and syncs their
+opportunities straight away, so the first opportunities are committed (and
+pushed to dashboards) a reference or two into the scan.
+
+The queue bound keeps a slow analysis from letting the scan run arbitrarily
+far ahead; references that piled up while an analysis ran are analyzed
+together, up to PIPELINE_ANALYZE_BATCH at a time. After the scan, the
+references whose listings the stale-listing sweep expired are queued again.
+If analysis fails, the scan stops after the reference in progress and the
+error is raised from run().
+
+Usage:
+    python -m services.pipeline [--queue-size 50] [--analyze-batch 20]
+"""
+
+import argparse
+import queue
+import threading
+import time
+from typing import Callable, Optional
+
+from sqlalchemy.orm import joinedload
+
+from models import init_db, get_session, WatchReference, ArbitrageOpportunity
+from services.arbitrage import ArbitrageEngine
+from services.scanner import Scanner
+from config import Config
+from metrics import INGEST_RATE
+
+# Put on the queue by the producer when the scan is over
+_DONE = object()
+
+
+class ScanPipeline:
+    """Scans references on one thread while analyzing finished ones on another."""
+
+    def __init__(
+        self,
+        queue_size: int = Config.PIPELINE_QUEUE_SIZE,
+        analyze_batch: int = Config.PIPELINE_ANALYZE_BATCH
+    ):
+        self.queue_size = queue_size
+        self.analyze_batch = analyze_batch
+
+    def run(
+        self,
+        reference_ids: Optional[list[int]] = None,
+        on_progress: Optional[Callable[[dict], None]] = None
+    ) -> dict:
+        """
+        Scan and analyze references (all of them by default).
+        Returns scan stats plus the active opportunities, how long the first
+        one took to commit and the overall reference throughput. on_progress,
+        if given, is called on this thread after each analyzed batch.
+        """
+        stats = {
+            "references_scanned": 0,
+            "references_analyzed": 0,
+            "ebay_listings": 0,
+            "chrono24_listings": 0,
+            "expired_listings": 0,
+            "errors": [],
+            "opportunities": [],
+            "first_opportunity_seconds": None,
+            "seconds": 0.0,
+        }
+        scanned = queue.Queue(maxsize=self.queue_size)
+        failure = []
+        stop = threading.Event()
+        started = time.perf_counter()
+
+        producer = threading.Thread(
+            target=self._scan, args=(reference_ids, scanned, stats, failure, stop), name="pipeline-scan", daemon=True
+        )
+        producer.start()
+
+        session = get_session()
+        engine = ArbitrageEngine(session)
+        try:
+            done = False
+            while not done:
+                # Block for the next reference, then take whatever else is already waiting
+                batch = []
+                item = scanned.get()
+                while item is not _DONE:
+                    batch.append(item)
+                    if len(batch) >= self.analyze_batch:
+                        break
+                    try:
+                        item = scanned.get_nowait()
+                    except queue.Empty:
+                        break
+                done = item is _DONE
+
+                if not batch:
+                    continue
+                opportunities = engine.analyze_references(batch)
+                stats["references_analyzed"] += len(batch)
+                if opportunities and stats["first_opportunity_seconds"] is None:
+                    stats["first_opportunity_seconds"] = time.perf_counter() - started
+                if on_progress:
+                    on_progress({
+                        "references_scanned": stats["references_scanned"],
+                        "references_analyzed": stats["references_analyzed"],
+                        "listings": stats["ebay_listings"] + stats["chrono24_listings"],
+                        "opportunities": len(opportunities),
+                        "errors": len(stats["errors"]),
+                        "seconds": round(time.perf_counter() - started, 3),
+                    })
+
+            # References can be analyzed twice (scan, then sweep); count the end state
+            active = session.query(ArbitrageOpportunity).filter(ArbitrageOpportunity.is_active == True)
+            if reference_ids is not None:
+                active = active.filter(ArbitrageOpportunity.watch_reference_id.in_(reference_ids))
+            stats["opportunities"] = active.all()
+        finally:
+            # If analysis failed part way, stop the producer after its current
+            # reference and unblock it
+            stop.set()
+            while producer.is_alive():
+                try:
+                    scanned.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            session.close()
+
+        if failure:
+            raise failure[0]
+
+        stats["seconds"] = time.perf_counter() - started
+        return stats
+
+    def _scan(
+        self,
+        reference_ids: Optional[list[int]],
+        scanned: queue.Queue,
+        stats: dict,
+        failure: list,
+        stop: threading.Event
+    ):
+        scanner = Scanner()
+        try:
+            started = time.perf_counter()
+            references = scanner.session.query(WatchReference).options(joinedload(WatchReference.brand))
+            if reference_ids is not None:
+                references = references.filter(WatchReference.id.in_(reference_ids))
+
+            for ref in references.all():
+                if stop.is_set():
+                    return
+                result = scanner.scan_reference(ref)
+                stats["ebay_listings"] += result["ebay"]
+                stats["chrono24_listings"] += result["chrono24"]
+                stats["errors"].extend(result["errors"])
+                stats["references_scanned"] += 1
+                scanned.put(ref.id)
+
+            INGEST_RATE.set(scanner.listings_processed / max(time.perf_counter() - started, 1e-9))
+
+            # Commits generations
+            sweep = scanner.sweep_stale_listings()
+            stats["expired_listings"] = sweep["expired"]
+            stats["errors"].extend(sweep["errors"])
+            for reference_id in sweep["reference_ids"]:
+                scanned.put(reference_id)
+        except Exception as e:
+            failure.append(e)
+        finally:
+            scanner.session.close()
+            scanned.put(_DONE)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scan and analyze references as a pipeline.")
+    parser.add_argument("--queue-size", type=int, default=Config.PIPELINE_QUEUE_SIZE)
+    parser.add_argument("--analyze-batch", type=int, default=Config.PIPELINE_ANALYZE_BATCH)
+    args = parser.parse_args()
+
+    init_db()
+    stats = ScanPipeline(queue_size=args.queue_size, analyze_batch=args.analyze_batch).run()
+    first = stats["first_opportunity_seconds"]
+    print(
+        f"Pipeline: {stats['references_scanned']} references in {stats['seconds']:.1f}s, "
+        f"{len(stats['opportunities'])} active opportunities, "
+        f"first after {'-' if first is None else f'{first:.1f}s'}"
+    )
@@ -0,0 +1,366 @@
+"""
+Database-backed work queue for running scans across many worker processes.
+
+Each watch reference has one row in scan_tasks. Workers on any machine
+that can reach the database claim batches of pending tasks under a lease,
+renew their leases while they work (heartbeat), and mark tasks done or
+failed. A lease that isn't renewed in time (a worker crashed or hung)
+expires and its task becomes claimable again.
+
+Claiming is dialect-aware:
+  - PostgreSQL: SELECT ... FOR UPDATE SKIP LOCKED, so concurrent workers
+    never block on or double-claim the same rows.
+  - SQLite: compare-and-set on the lease columns. The UPDATE re-checks that
+    each row is still claimable, and the worker reads back only the rows
+    stamped with its own (owner, expiry) lease.
+
+Each worker runs at an equal share of the platform request budgets
+(api/ratelimit.py), based on how many workers currently hold leases.
+
+Usage:
+    python -m services.scan_queue enqueue
+    python -m services.scan_queue work [--batch-size 5] [--wait] [--analyze]
+    python -m services.scan_queue status
+"""
+
+import argparse
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import and_, case, func, insert, or_, select, update
+from sqlalchemy.orm import Session, joinedload
+
+from models import init_db, get_session, ScanTask, WatchReference
+from api.ratelimit import rate_limits
+from services.alerts import alert_dispatcher
+from services.scanner import Scanner
+from config import Config
+
+
+def _claimable(now: datetime):
+    return or_(
+        ScanTask.status == "pending",
+        and_(
+            ScanTask.status == "leased",
+            ScanTask.lease_expires_at < now,
+            ScanTask.attempts < Config.SCAN_MAX_ATTEMPTS
+        )
+    )
+
+
+def _fail_exhausted(session: Session, now: datetime):
+    """Fail tasks whose last allowed attempt's lease expired, so they don't stay leased forever."""
+    session.execute(
+        update(ScanTask)
+        .where(
+            ScanTask.status == "leased",
+            ScanTask.lease_expires_at < now,
+            ScanTask.attempts >= Config.SCAN_MAX_ATTEMPTS
+        )
+        .values(status="failed", lease_owner=None, lease_expires_at=None,
+                last_error="lease expired", finished_at=now)
+    )
+
+
+def enqueue_scan(session: Session, reference_ids: Optional[list[int]] = None) -> int:
+    """
+    Queue references for scanning (all of them by default). Finished tasks are
+    reset to pending; tasks currently leased are left to their worker.
+    Returns the number of pending tasks.
+    """
+    now = datetime.utcnow()
+    scope = [] if reference_ids is None else [ScanTask.watch_reference_id.in_(reference_ids)]
+
+    references = session.query(WatchReference.id)
+    if reference_ids is not None:
+        references = references.filter(WatchReference.id.in_(reference_ids))
+    queued = {ref_id for (ref_id,) in session.query(ScanTask.watch_reference_id).filter(*scope)}
+    new_tasks = [
+        {"watch_reference_id": ref_id, "status": "pending", "attempts": 0, "enqueued_at": now}
+        for (ref_id,) in references if ref_id not in queued
+    ]
+    if new_tasks:
+        session.execute(insert(ScanTask), new_tasks)
+
+    session.query(ScanTask).filter(ScanTask.status.in_(("done", "failed")), *scope).update(
+        {"status": "pending", "attempts": 0, "last_error": None, "enqueued_at": now, "finished_at": None},
+        synchronize_session=False
+    )
+    session.commit()
+    return session.query(ScanTask).filter(ScanTask.status == "pending", *scope).count()
+
+
+def claim_tasks(
+    session: Session,
+    worker_id: str,
+    limit: int = Config.SCAN_BATCH_SIZE,
+    lease_seconds: int = Config.SCAN_LEASE_SECONDS
+) -> list[tuple[int, int]]:
+    """
+    Lease up to `limit` claimable tasks. Returns (task_id, reference_id) pairs.
+    Expired leases are claimable again until SCAN_MAX_ATTEMPTS, then failed.
+    """
+    now = datetime.utcnow()
+    _fail_exhausted(session, now)
+    expires = now + timedelta(seconds=lease_seconds)
+    lease = {
+        "status": "leased",
+        "lease_owner": worker_id,
+        "lease_expires_at": expires,
+        "attempts": ScanTask.attempts + 1,
+    }
+    candidates = select(ScanTask.id).where(_claimable(now)).order_by(ScanTask.id).limit(limit)
+
+    if session.get_bind().dialect.name == "postgresql":
+        # Rows another worker is claiming are skipped rather than waited on
+        claimed = session.execute(
+            update(ScanTask)
+            .where(ScanTask.id.in_(candidates.with_for_update(skip_locked=True)))
+            .values(**lease)
+            .returning(ScanTask.id, ScanTask.watch_reference_id)
+        ).all()
+        session.commit()
+        return [(task_id, reference_id) for task_id, reference_id in claimed]
+
+    # Losing every candidate to other workers means the queue moved on; try again
+    while True:
+        candidate_ids = [task_id for (task_id,) in session.execute(candidates)]
+        if not candidate_ids:
+            break
+
+        # Compare-and-set: rows claimed by someone else since the SELECT no longer match
+        session.execute(
+            update(ScanTask).where(ScanTask.id.in_(candidate_ids), _claimable(now)).values(**lease)
+        )
+        claimed = session.execute(
+            select(ScanTask.id, ScanTask.watch_reference_id).where(
+                ScanTask.id.in_(candidate_ids),
+                ScanTask.lease_owner == worker_id,
+                ScanTask.lease_expires_at == expires
+            )
+        ).all()
+        session.commit()
+        if claimed:
+            return [(task_id, reference_id) for task_id, reference_id in claimed]
+
+    session.commit()
+    return []
+
+
+def heartbeat(
+    session: Session,
+    worker_id: str,
+    task_ids: list[int],
+    lease_seconds: int = Config.SCAN_LEASE_SECONDS
+) -> int:
+    """Extend this worker's leases. Returns how many are still held."""
+    renewed = session.execute(
+        update(ScanTask)
+        .where(ScanTask.id.in_(task_ids), ScanTask.lease_owner == worker_id, ScanTask.status == "leased")
+        .values(lease_expires_at=datetime.utcnow() + timedelta(seconds=lease_seconds))
+    ).rowcount
+    session.commit()
+    return renewed
+
+
+def complete_task(session: Session, worker_id: str, task_id: int) -> bool:
+    """Mark a leased task done. False if the lease had expired and been taken over."""
+    updated = session.execute(
+        update(ScanTask)
+        .where(ScanTask.id == task_id, ScanTask.lease_owner == worker_id, ScanTask.status == "leased")
+        .values(status="done", lease_owner=None, lease_expires_at=None,
+                last_error=None, finished_at=datetime.utcnow())
+    ).rowcount
+    session.commit()
+    return bool(updated)
+
+
+def fail_task(session: Session, worker_id: str, task_id: int, error: str) -> bool:
+    """Release a leased task for retry, or mark it failed after SCAN_MAX_ATTEMPTS."""
+    updated = session.execute(
+        update(ScanTask)
+        .where(ScanTask.id == task_id, ScanTask.lease_owner == worker_id, ScanTask.status == "leased")
+        .values(
+            status=case((ScanTask.attempts >= Config.SCAN_MAX_ATTEMPTS, "failed"), else_="pending"),
+            lease_owner=None,
+            lease_expires_at=None,
+            last_error=error[:500],
+            finished_at=datetime.utcnow()
+        )
+    ).rowcount
+    session.commit()
+    return bool(updated)
+
+
+def requeue_expired(session: Session) -> int:
+    """Return tasks with expired leases to the queue (or fail them if out of attempts)."""
+    requeued = session.execute(
+        update(ScanTask)
+        .where(ScanTask.status == "leased", ScanTask.lease_expires_at < datetime.utcnow())
+        .values(
+            status=case((ScanTask.attempts >= Config.SCAN_MAX_ATTEMPTS, "failed"), else_="pending"),
+            lease_owner=None,
+            lease_expires_at=None,
+            last_error="lease expired"
+        )
+    ).rowcount
+    session.commit()
+    return requeued
+
+
+def active_workers(session: Session) -> int:
+    """Number of workers currently holding unexpired leases."""
+    return session.query(func.count(func.distinct(ScanTask.lease_owner))).filter(
+        ScanTask.status == "leased",
+        ScanTask.lease_expires_at >= datetime.utcnow()
+    ).scalar() or 0
+
+
+def queue_status(session: Session) -> dict[str, int]:
+    """Task counts by status, plus the number of active workers."""
+    counts = {"pending": 0, "leased": 0, "done": 0, "failed": 0}
+    for status, count in session.query(ScanTask.status, func.count()).group_by(ScanTask.status):
+        counts[status] = count
+    counts["workers"] = active_workers(session)
+    return counts
+
+
+class ScanWorker:
+    """Claims batches of references from the queue and scans them."""
+
+    def __init__(
+        self,
+        worker_id: Optional[str] = None,
+        batch_size: int = Config.SCAN_BATCH_SIZE,
+        lease_seconds: int = Config.SCAN_LEASE_SECONDS
+    ):
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.scanner = Scanner()
+        self._held = set()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def run(self, wait: bool = False, poll_seconds: float = 5.0) -> dict:
+        """
+        Work until the queue is empty (or forever with wait=True).
+        Returns stats about the tasks this worker processed.
+        """
+        stats = {
+            "references_scanned": 0,
+            "ebay_listings": 0,
+            "chrono24_listings": 0,
+            "failed": 0,
+            "lost_leases": 0,
+        }
+        session = self.scanner.session
+
+        self._stopped.clear()
+        beat = threading.Thread(target=self._heartbeat_loop, daemon=True)
+        beat.start()
+
+        try:
+            while True:
+                tasks = claim_tasks(session, self.worker_id, self.batch_size, self.lease_seconds)
+                if not tasks:
+                    if not wait:
+                        break
+                    time.sleep(poll_seconds)
+                    continue
+
+                rate_limits.set_share(1 / max(active_workers(session), 1))
+                with self._lock:
+                    self._held.update(task_id for task_id, _ in tasks)
+
+                references = {
+                    ref.id: ref for ref in session.query(WatchReference)
+                    .options(joinedload(WatchReference.brand))
+                    .filter(WatchReference.id.in_([reference_id for _, reference_id in tasks]))
+                }
+
+                for task_id, reference_id in tasks:
+                    try:
+                        result = self.scanner.scan_reference(references[reference_id])
+                    except Exception as e:
+                        session.rollback()
+                        result = {"ebay": 0, "chrono24": 0, "errors": [str(e)]}
+
+                    if result["errors"]:
+                        fail_task(session, self.worker_id, task_id, "; ".join(result["errors"]))
+                        stats["failed"] += 1
+                    elif not complete_task(session, self.worker_id, task_id):
+                        stats["lost_leases"] += 1
+
+                    stats["references_scanned"] += 1
+                    stats["ebay_listings"] += result["ebay"]
+                    stats["chrono24_listings"] += result["chrono24"]
+                    with self._lock:
+                        self._held.discard(task_id)
+
+                self.scanner.commit_generations()
+        finally:
+            self._stopped.set()
+            beat.join()
+
+        # Deliver pending watch rule alerts before the process exits
+        alert_dispatcher.flush()
+        return stats
+
+    def _heartbeat_loop(self):
+        """Renew held leases every third of the lease period (own session/thread)."""
+        session = get_session()
+        try:
+            while not self._stopped.wait(self.lease_seconds / 3):
+                with self._lock:
+                    held = list(self._held)
+                if held:
+                    heartbeat(session, self.worker_id, held, self.lease_seconds)
+                    rate_limits.set_share(1 / max(active_workers(session), 1))
+        finally:
+            session.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scan work queue.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("enqueue", help="Queue every reference for scanning")
+    work = commands.add_parser("work", help="Run a scan worker")
+    work.add_argument("--batch-size", type=int, default=Config.SCAN_BATCH_SIZE)
+    work.add_argument("--worker-id")
+    work.add_argument("--wait", action="store_true", help="Keep polling when the queue is empty")
+    work.add_argument("--analyze", action="store_true",
+                      help="Sweep stale listings and run arbitrage detection if this worker drains the queue")
+    commands.add_parser("status", help="Show task counts")
+    commands.add_parser("requeue", help="Re-queue tasks with expired leases")
+    args = parser.parse_args()
+
+    init_db()
+    session = get_session()
+    try:
+        if args.command == "enqueue":
+            print(f"{enqueue_scan(session)} references queued")
+        elif args.command == "status":
+            print(queue_status(session))
+        elif args.command == "requeue":
+            print(f"{requeue_expired(session)} expired leases re-queued")
+        elif args.command == "work":
+            worker = ScanWorker(worker_id=args.worker_id, batch_size=args.batch_size)
+            stats = worker.run(wait=args.wait)
+            print(f"{worker.worker_id}: {stats}")
+
+            status = queue_status(session)
+            if args.analyze and stats["references_scanned"] and not (status["pending"] or status["leased"]):
+                from services.arbitrage import ArbitrageEngine
+
+                sweep = worker.scanner.sweep_stale_listings()
+                opportunities = ArbitrageEngine(session).analyze_all()
+                print(f"Queue drained: {sweep['expired']} listings expired, "
+                      f"{len(opportunities)} active opportunities")
+            worker.scanner.session.close()
+    finally:
+        session.close()
@@ -2,12 +2,21 @@
 Scanner service that fetches listings from all platforms.
 """
 
+import time
 from datetime import datetime
 from typing import Optional
 
-from models import get_session, WatchReference, Listing, Brand
+from sqlalchemy import event, insert, update
+from sqlalchemy.orm import joinedload
+
+from models import get_session, get_generation, bump_generation, WatchReference, Listing, ListingPriceEvent, ArbitrageOpportunity
 from api import ebay_client, chrono24_client
+from services.comps import CompTracker
+from services.dedupe import link_duplicates
+from services.market import market_estimator
+from services.alerts import alert_dispatcher, build_alert, rule_index
 from config import Config
+from metrics import INGEST_RATE, LISTING_PRICE_CHANGES, LISTINGS_INGESTED, SAVE_COMMIT
 
 
 class Scanner:
@@ -15,6 +24,14 @@ class Scanner:
 
     def __init__(self):
         self.session = get_session()
+        self.listings_processed = 0
+        self.comps = CompTracker()
+
+        # Market estimate changes wait for the commit that makes them true,
+        # so a rolled back transaction can't leave phantom prices behind
+        self._market_changes = []
+        event.listen(self.session, "after_commit", self._apply_market_changes)
+        event.listen(self.session, "after_rollback", self._discard_market_changes)
 
     def scan_all_references(self) -> dict:
         """
@@ -27,43 +44,67 @@ class Scanner:
             "chrono24_listings": 0,
             "errors": []
         }
+        started = time.perf_counter()
+        processed_before = self.listings_processed
 
-        references = self.session.query(WatchReference).all()
+        references = self.session.query(WatchReference).options(joinedload(WatchReference.brand)).all()
 
         for ref in references:
-            brand = self.session.query(Brand).get(ref.brand_id)
-            query = f"{brand.name} {ref.reference_number}"
+            result = self.scan_reference(ref)
+            stats["ebay_listings"] += result["ebay"]
+            stats["chrono24_listings"] += result["chrono24"]
+            stats["errors"].extend(result["errors"])
+            stats["references_scanned"] += 1
+
+        # Commits generations
+        sweep = self.sweep_stale_listings()
+        stats["expired_listings"] = sweep["expired"]
+        stats["errors"].extend(sweep["errors"])
+
+        ingested = self.listings_processed - processed_before
+        INGEST_RATE.set(ingested / max(time.perf_counter() - started, 1e-9))
+        return stats
+
+    def scan_reference(self, ref: WatchReference) -> dict:
+        """
+        Search every platform for one reference and save the results.
+        When a platform returned every match, its listings for the reference
+        that weren't among them are marked inactive.
+        Generations are not bumped; callers do that once per batch.
+        """
+        query = f"{ref.brand.name} {ref.reference_number}"
+        result = {"ebay": 0, "chrono24": 0, "errors": []}
 
-            print(f"Scanning: {query}")
+        print(f"Scanning: {query}")
 
-            # Scan eBay
+        # Scan eBay
+        try:
+            ebay_results = ebay_client.search(
+                query=query,
+                min_price=Config.MIN_PRICE_USD,
+                limit=25
+            )
+            result["ebay"] = self._save_listings(ebay_results["listings"], ref.id)
+            if ebay_results["complete"]:
+                self.expire_missing_listings(ref.id, "ebay", ebay_results["listings"])
+        except Exception as e:
+            result["errors"].append(f"eBay error for {query}: {str(e)}")
+
+        # Scan Chrono24 (if available)
+        if chrono24_client.is_available():
             try:
-                ebay_results = ebay_client.search_watches(
+                chrono_results = chrono24_client.search(
                     query=query,
                     min_price=Config.MIN_PRICE_USD,
                     limit=25
                 )
-                saved = self._save_listings(ebay_results, ref.id)
-                stats["ebay_listings"] += saved
+                result["chrono24"] = self._save_listings(chrono_results["listings"], ref.id)
+                if chrono_results["complete"]:
+                    self.expire_missing_listings(ref.id, "chrono24", chrono_results["listings"])
             except Exception as e:
-                stats["errors"].append(f"eBay error for {query}: {str(e)}")
-
-            # Scan Chrono24 (if available)
-            if chrono24_client.is_available():
-                try:
-                    chrono_results = chrono24_client.search_watches(
-                        query=query,
-                        min_price=Config.MIN_PRICE_USD,
-                        limit=25
-                    )
-                    saved = self._save_listings(chrono_results, ref.id)
-                    stats["chrono24_listings"] += saved
-                except Exception as e:
-                    stats["errors"].append(f"Chrono24 error for {query}: {str(e)}")
+                result["errors"].append(f"Chrono24 error for {query}: {str(e)}")
 
-            stats["references_scanned"] += 1
-
-        return stats
+        return result
 
     def scan_single_reference(self, reference_number: str) -> dict:
         """Scan a single reference across all platforms."""
@@ -74,8 +115,7 @@ class Scanner:
         if not ref:
             return {"error": f"Reference {reference_number} not found"}
 
-        brand = self.session.query(Brand).get(ref.brand_id)
-        query = f"{brand.name} {ref.reference_number}"
+        query = f"{ref.brand.name} {ref.reference_number}"
 
         stats = {"ebay": 0, "chrono24": 0, "errors": []}
 
@@ -94,25 +134,108 @@ class Scanner:
             except Exception as e:
                 stats["errors"].append(str(e))
 
+        self.commit_generations()
         return stats
 
+    def _stage_market(self, method: str, *args):
+        """Queue a market_estimator add/remove/update for the next commit."""
+        self._market_changes.append((method, args))
+
+    def _apply_market_changes(self, session):
+        changes, self._market_changes = self._market_changes, []
+        for method, args in changes:
+            getattr(market_estimator, method)(*args)
+
+    def _discard_market_changes(self, session):
+        self._market_changes = []
+
+    def commit_generations(self):
+        """Bump generations so dashboards and caches see the new listings."""
+        previous = get_generation(self.session, "listings")
+        listings_generation = bump_generation(self.session, "listings")
+        bump_generation(self.session)
+        self.session.commit()
+        market_estimator.advance(previous, listings_generation)
+
     def _save_listings(self, listings: list[dict], reference_id: int) -> int:
-        """Save listings to database, avoiding duplicates."""
+        """
+        Save listings to database, avoiding duplicates.
+
+        Existing listings are looked up in one batch. Only those whose price
+        changed (or that had gone inactive) are rewritten, and each price
+        change is appended to listing_price_events; listings seen again
+        unchanged only get a batched scraped_at touch.
+
+        New listings are checked for duplicates of listings elsewhere
+        (services.dedupe); duplicates stay out of the market estimate and
+        comp statistics and don't alert.
+        """
         saved_count = 0
+        alerts = []
+        now = datetime.utcnow()
+        changed, price_events, seen_ids, new_listings = [], [], [], []
+
+        # New and price-dropped listings are checked against watch rules as they're saved
+        rule_index.ensure_loaded(self.session)
+        if rule_index.needs_estimates:
+            market_estimator.ensure_loaded(self.session)
+
+        existing = self._existing_listings(listings)
+        handled = set()
 
         for listing_data in listings:
-            # Check for existing listing by external ID and platform
-            existing = self.session.query(Listing).filter(
-                Listing.external_id == listing_data.get("external_id"),
-                Listing.platform == listing_data.get("platform")
-            ).first()
-
-            if existing:
-                # Update existing listing
-                existing.price = listing_data["price"]
-                existing.price_usd = listing_data["price_usd"]
-                existing.is_active = True
-                existing.scraped_at = datetime.utcnow()
+            key = (listing_data.get("platform"), listing_data.get("external_id"))
+            if key[1] is not None:
+                # A listing repeated within one response is only saved once
+                if key in handled:
+                    continue
+                handled.add(key)
+
+            row = existing.get(key)
+            if row:
+                price_usd = listing_data["price_usd"]
+                price_changed = price_usd != row.price_usd
+                price_dropped = price_usd < row.price_usd
+
+                # Keep the market estimate and comp statistics in step with the price change
+                # (duplicates of other listings aren't counted in either)
+                if row.duplicate_of_id:
+                    pass
+                elif not row.is_active:
+                    self._stage_market("add", row.watch_reference_id, row.box_papers_status, price_usd)
+                    self.comps.add(row.watch_reference_id, row.box_papers_status, row.platform, price_usd)
+                elif price_changed:
+                    self._stage_market(
+                        "update", row.watch_reference_id,
+                        row.box_papers_status, row.price_usd,
+                        row.box_papers_status, price_usd
+                    )
+                    self.comps.update(
+                        row.watch_reference_id, row.box_papers_status, row.platform, row.price_usd, price_usd
+                    )
+
+                if price_changed:
+                    price_events.append({
+                        "listing_id": row.id,
+                        "old_price_usd": row.price_usd,
+                        "new_price_usd": price_usd,
+                        "changed_at": now,
+                    })
+                    LISTING_PRICE_CHANGES.inc(
+                        platform=listing_data["platform"], direction="down" if price_dropped else "up"
+                    )
+
+                if price_changed or listing_data["price"] != row.price or not row.is_active:
+                    changed.append({
+                        "id": row.id,
+                        "price": listing_data["price"],
+                        "price_usd": price_usd,
+                        "is_active": True,
+                        "scraped_at": now,
+                    })
+                else:
+                    seen_ids.append(row.id)
+                tier = row.box_papers_status
             else:
                 # Create new listing
                 listing = Listing(
@@ -123,6 +246,7 @@ class Scanner:
                     currency=listing_data.get("currency", "USD"),
                     price_usd=listing_data["price_usd"],
                     box_papers_status=listing_data.get("box_papers_status", "unknown"),
+                    title=listing_data.get("title"),
                     condition=listing_data.get("condition"),
                     seller_name=listing_data.get("seller_name"),
                     seller_rating=listing_data.get("seller_rating"),
@@ -132,19 +256,198 @@ class Scanner:
                     is_active=True
                 )
                 self.session.add(listing)
+                new_listings.append(listing)
                 saved_count += 1
+                tier, price_dropped = listing.box_papers_status, True
 
-        self.session.commit()
+            if price_dropped and rule_index:
+                for rule, figures in rule_index.match(
+                    reference_id, tier, listing_data["platform"], listing_data["price_usd"]
+                ):
+                    alerts.append((None if row else listing, rule, build_alert(rule, reference_id, listing_data, figures)))
+
+            LISTINGS_INGESTED.inc(platform=listing_data["platform"])
+            self.listings_processed += 1
+
+        duplicates = set()
+        if new_listings:
+            self.session.flush()
+            duplicates = link_duplicates(self.session, new_listings)
+            for listing in new_listings:
+                if listing.id not in duplicates:
+                    self._stage_market("add", reference_id, listing.box_papers_status, listing.price_usd)
+                    self.comps.add(reference_id, listing.box_papers_status, listing.platform, listing.price_usd)
+
+        if changed:
+            self.session.execute(update(Listing), changed)
+        if price_events:
+            self.session.execute(insert(ListingPriceEvent), price_events)
+        for i in range(0, len(seen_ids), 500):
+            self.session.execute(
+                update(Listing).where(Listing.id.in_(seen_ids[i:i + 500])).values(scraped_at=now)
+            )
+        self.comps.flush(self.session)
+
+        with SAVE_COMMIT.time():
+            self.session.commit()
+
+        for listing, rule, alert in alerts:
+            if listing is None or listing.id not in duplicates:
+                alert_dispatcher.send(rule, alert)
         return saved_count
 
-    def mark_stale_listings(self, hours: int = 24):
-        """Mark listings older than X hours as inactive."""
+    def _existing_listings(self, listings: list[dict]) -> dict:
+        """Stored listings matching a batch, keyed by (platform, external_id)."""
+        external_ids = {}
+        for listing_data in listings:
+            if listing_data.get("external_id") is not None:
+                external_ids.setdefault(listing_data["platform"], set()).add(listing_data["external_id"])
+
+        existing = {}
+        for platform, ids in external_ids.items():
+            ids = list(ids)
+            for i in range(0, len(ids), 500):
+                for row in self.session.query(
+                    Listing.id, Listing.external_id, Listing.watch_reference_id, Listing.platform, Listing.price,
+                    Listing.price_usd, Listing.box_papers_status, Listing.is_active, Listing.duplicate_of_id
+                ).filter(Listing.platform == platform, Listing.external_id.in_(ids[i:i + 500])):
+                    existing[(platform, row.external_id)] = row
+        return existing
+
+    def expire_missing_listings(self, reference_id: int, platform: str, listings: list[dict]) -> int:
+        """
+        Mark inactive the reference's active listings on a platform that a
+        complete search result no longer contains. Returns how many expired.
+        """
+        external_ids = [data["external_id"] for data in listings if data.get("external_id") is not None]
+        expired = self._deactivate(self.session.query(Listing).filter(
+            Listing.watch_reference_id == reference_id,
+            Listing.platform == platform,
+            Listing.is_active == True,
+            Listing.external_id.not_in(external_ids)
+        ))
+        self.session.commit()
+        return len(expired)
+
+    def verify_top_opportunities(self, limit: int = Config.VERIFY_TOP_N) -> dict:
+        """
+        Re-check the listings behind the `limit` most profitable active
+        opportunities and mark sold or ended ones inactive. eBay listings
+        are looked up in batches (getItems); Chrono24 has no batch lookup.
+        Skipped when eBay isn't available, since every lookup would come back
+        empty. Returns counts checked and expired and the affected reference IDs.
+        """
+        if not ebay_client.is_available():
+            return {"checked": 0, "expired": 0, "reference_ids": []}
+
+        rows = self.session.query(Listing.id, Listing.external_id).join(
+            ArbitrageOpportunity, ArbitrageOpportunity.listing_id == Listing.id
+        ).filter(
+            ArbitrageOpportunity.is_active == True,
+            Listing.is_active == True,
+            Listing.platform == "ebay",
+            Listing.external_id.isnot(None)
+        ).order_by(ArbitrageOpportunity.estimated_profit.desc()).limit(limit).all()
+
+        listing_ids = {external_id: listing_id for listing_id, external_id in rows}
+        items = ebay_client.get_items(list(listing_ids))
+        gone = [
+            listing_id for external_id, listing_id in listing_ids.items()
+            if external_id not in items or not ebay_client.is_item_available(items[external_id])
+        ]
+
+        reference_ids = []
+        for i in range(0, len(gone), 500):
+            reference_ids += self._deactivate(self.session.query(Listing).filter(Listing.id.in_(gone[i:i + 500])))
+        self.session.commit()
+        return {"checked": len(listing_ids), "expired": len(gone), "reference_ids": sorted(set(reference_ids))}
+
+    def mark_stale_listings(self, hours: int = Config.STALE_LISTING_HOURS) -> list[int]:
+        """
+        Mark listings older than X hours as inactive.
+        Returns the reference ID of each expired listing.
+        """
         cutoff = datetime.utcnow() - timedelta(hours=hours)
-        self.session.query(Listing).filter(
+        reference_ids = self._deactivate(self.session.query(Listing).filter(
             Listing.scraped_at < cutoff,
             Listing.is_active == True
-        ).update({"is_active": False})
+        ))
+        self.commit_generations()
+        return reference_ids
+
+    def sweep_stale_listings(self) -> dict:
+        """
+        After a scan: verify the top opportunities' listings, expire listings
+        unseen for STALE_LISTING_HOURS, commit generations and record the scan
+        as completed (the "scan_completed" generation's updated_at, reported by
+        /metrics). Returns the number expired, the affected reference IDs (to
+        re-analyze) and errors.
+        """
+        errors = []
+        expired, reference_ids = 0, set()
+        try:
+            verified = self.verify_top_opportunities()
+            expired += verified["expired"]
+            reference_ids.update(verified["reference_ids"])
+        except Exception as e:
+            self.session.rollback()
+            errors.append(f"eBay verify error: {str(e)}")
+
+        stale = self.mark_stale_listings()
+        expired += len(stale)
+        reference_ids.update(stale)
+
+        bump_generation(self.session, "scan_completed")
         self.session.commit()
+        return {"expired": expired, "reference_ids": sorted(reference_ids), "errors": errors}
+
+    def _deactivate(self, listings) -> list[int]:
+        """
+        Mark a query's listings inactive, keeping the market estimate and comp
+        statistics in step. Returns the reference ID of each listing.
+        """
+        reference_ids, original_ids = [], []
+        for listing_id, reference_id, bp_status, platform, price_usd, duplicate_of_id in listings.with_entities(
+            Listing.id, Listing.watch_reference_id, Listing.box_papers_status, Listing.platform,
+            Listing.price_usd, Listing.duplicate_of_id
+        ):
+            if not duplicate_of_id:
+                self._stage_market("remove", reference_id, bp_status, price_usd)
+                self.comps.remove(reference_id, bp_status, platform, price_usd)
+                original_ids.append(listing_id)
+            reference_ids.append(reference_id)
+
+        if reference_ids:
+            listings.update({"is_active": False}, synchronize_session=False)
+            self._promote_duplicates(original_ids)
+            self.comps.flush(self.session)
+        return reference_ids
+
+    def _promote_duplicates(self, original_ids: list[int]):
+        """
+        Replace listings that just went inactive as originals: the earliest
+        active duplicate of each becomes the original (and is counted in the
+        market estimate and comp statistics), and the others are relinked to
+        it. The caller commits.
+        """
+        promoted, relinked = {}, []
+        for i in range(0, len(original_ids), 500):
+            for listing_id, original_id, reference_id, bp_status, platform, price_usd in self.session.query(
+                Listing.id, Listing.duplicate_of_id, Listing.watch_reference_id, Listing.box_papers_status,
+                Listing.platform, Listing.price_usd
+            ).filter(
+                Listing.duplicate_of_id.in_(original_ids[i:i + 500]), Listing.is_active == True
+            ).order_by(Listing.id):
+                if original_id in promoted:
+                    relinked.append({"id": listing_id, "duplicate_of_id": promoted[original_id]})
+                    continue
+                promoted[original_id] = listing_id
+                relinked.append({"id": listing_id, "duplicate_of_id": None})
+                self._stage_market("add", reference_id, bp_status, price_usd)
+                self.comps.add(reference_id, bp_status, platform, price_usd)
+
+        if relinked:
+            self.session.execute(update(Listing), relinked)
 
 
 # Add missing import
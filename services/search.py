@@ -0,0 +1,185 @@
+"""
+In-memory typeahead index over the watch catalog.
+
+Each reference gets one search key: brand, model name, collection and
+reference number, lowercased, with spaces and separators removed. So
+"Patek Philippe Nautilus 5711/1A-010" becomes
+"patekphilippenautilus57111a010". A query matches a reference when each
+of its words is a substring of the key. "5711 1a", "57111a" and
+"nautilus 5711" all find the reference above.
+
+Matches come from in-memory postings, read in order: a sorted list of
+reference numbers (prefix matches), every prefix of every word, and every
+1- to 3-character substring (n-gram) of the keys. A query walks the
+shortest posting of its words and checks the others, and stops as soon
+as it has enough results, so the cost doesn't grow with how much of the
+catalog matches. The database isn't touched while searching. The index
+is rebuilt when the catalog generation changes, which is checked at most
+every CATALOG_INDEX_CHECK_SECONDS.
+
+    python -m services.search "5711 1a"
+"""
+
+import argparse
+import re
+import threading
+import time
+from bisect import bisect_left
+
+from sqlalchemy.orm import Session
+
+from models import init_db, get_session, get_generation, Brand, WatchReference
+from config import Config
+
+GRAM_SIZE = 3
+MIN_QUERY_CHARS = 2  # Shorter queries match most of the catalog
+
+
+def _words(text: str) -> list[str]:
+    return re.findall(r"[a-z0-9]+", (text or "").lower())
+
+
+def _grams(text: str) -> set[str]:
+    if len(text) <= GRAM_SIZE:
+        return {text}
+    return {text[i:i + GRAM_SIZE] for i in range(len(text) - GRAM_SIZE + 1)}
+
+
+class CatalogIndex:
+    """N-gram and word-prefix index of references, swapped in whole when rebuilt."""
+
+    def __init__(self):
+        self._index = None
+        self._generation = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._index["entries"]) if self._index else 0
+
+    def build(self, session: Session):
+        """(Re)build from the catalog in one query."""
+        generation = get_generation(session, "catalog")
+        rows = session.query(
+            WatchReference.id, Brand.name, WatchReference.model_name,
+            WatchReference.collection, WatchReference.reference_number
+        ).join(Brand).order_by(Brand.name, WatchReference.model_name, WatchReference.reference_number).all()
+
+        entries, keys, reference_keys = [], [], []
+        grams, prefixes = {}, {}
+        for position, (reference_id, brand, model, collection, reference_number) in enumerate(rows):
+            reference_key = "".join(_words(reference_number))
+            words = _words(f"{brand} {model} {collection or ''} {reference_number}") + [reference_key]
+            key = "".join(words[:-1])
+            entries.append({"id": reference_id, "label": f"{brand} {model} {reference_number}"})
+            keys.append(key)
+            reference_keys.append((reference_key, position))
+
+            for size in range(1, GRAM_SIZE + 1):
+                for i in range(len(key) - size + 1):
+                    grams.setdefault(key[i:i + size], set()).add(position)
+            for word in words:
+                for i in range(1, len(word) + 1):
+                    prefixes.setdefault(word[:i], set()).add(position)
+
+        index = {
+            "entries": entries,
+            "keys": keys,
+            "reference_keys": sorted(reference_keys),
+            # Postings in catalog order, with a set for membership checks
+            "grams": {gram: (sorted(positions), positions) for gram, positions in grams.items()},
+            "prefixes": {prefix: (sorted(positions), positions) for prefix, positions in prefixes.items()},
+        }
+        with self._lock:
+            self._index = index
+            self._generation = generation
+            self._checked_at = time.monotonic()
+
+    def ensure_loaded(self, session_factory=get_session):
+        """Build on first use and rebuild when the catalog changed (checked at most every few seconds)."""
+        if self._index is not None and time.monotonic() - self._checked_at < Config.CATALOG_INDEX_CHECK_SECONDS:
+            return
+
+        session = session_factory()
+        try:
+            if self._index is None or get_generation(session, "catalog") != self._generation:
+                self.build(session)
+            else:
+                self._checked_at = time.monotonic()
+        finally:
+            session.close()
+
+    def search(self, query: str, limit: int = 10) -> list[dict]:
+        """
+        Best matches for a typed query: references whose number starts with
+        it (in reference number order), then those where each query word
+        starts a word, then any containing the query words. Each group is
+        read lazily in catalog order and reading stops at `limit` matches.
+        """
+        index = self._index
+        words = _words(query)
+        compact = "".join(words)
+        if index is None or len(compact) < MIN_QUERY_CHARS:
+            return []
+        words = sorted(set(words), key=len, reverse=True)
+        keys = index["keys"]
+
+        matches = []
+        for positions in (
+            self._reference_prefix(index["reference_keys"], compact),
+            _intersect([index["prefixes"].get(word) for word in words]),
+            # Longer words' n-grams can match out of order; confirm them against the key
+            (
+                position for position in _intersect([index["grams"].get(gram) for word in words for gram in _grams(word)])
+                if all(word in keys[position] for word in words)
+            ),
+        ):
+            for position in positions:
+                if position not in matches:
+                    matches.append(position)
+                    if len(matches) == limit:
+                        return [index["entries"][p] for p in matches]
+        return [index["entries"][p] for p in matches]
+
+    @staticmethod
+    def _reference_prefix(reference_keys: list[tuple], compact: str):
+        for i in range(bisect_left(reference_keys, (compact,)), len(reference_keys)):
+            reference_key, position = reference_keys[i]
+            if not reference_key.startswith(compact):
+                return
+            yield position
+
+
+def _intersect(postings: list):
+    """Positions in every posting, in order, walking the shortest one."""
+    if not postings or any(posting is None for posting in postings):
+        return
+    postings = sorted(postings, key=lambda posting: len(posting[0]))
+    others = [positions for _, positions in postings[1:]]
+    for position in postings[0][0]:
+        if all(position in positions for positions in others):
+            yield position
+
+
+# Singleton instance
+catalog_index = CatalogIndex()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Search the watch catalog.")
+    parser.add_argument("query")
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    init_db()
+    start = time.perf_counter()
+    catalog_index.ensure_loaded()
+    built = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = catalog_index.search(args.query, args.limit)
+    seconds = time.perf_counter() - start
+
+    for entry in results:
+        print(f"{entry['id']:>6}  {entry['label']}")
+    print(f"{len(results)} of {len(catalog_index)} references in {seconds * 1000:.3f} ms (index built in {built:.2f}s)")
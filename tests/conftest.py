@@ -0,0 +1,77 @@
+"""
+Shared test setup: a throwaway SQLite database with the seed catalog and
+mock listings, restored to that state before every test that uses it, and
+the `query_budget` fixture from querycount.py.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+# Point the app at a throwaway database (and no SQL echo or request
+# tracking) before models is imported
+_tmp = tempfile.mkdtemp(prefix="watch-arbitrage-tests-")
+_db_path = os.path.join(_tmp, "test.db")
+_template_path = os.path.join(_tmp, "template.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_path}"
+os.environ["DEBUG"] = "false"
+os.environ["QUERY_TRACKING"] = "false"
+os.environ["CASSETTE_MODE"] = "off"
+os.environ["ALERT_FILE"] = os.path.join(_tmp, "alerts.ndjson")
+os.environ["ARCHIVE_DIR"] = os.path.join(_tmp, "archive")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest_plugins = ["querycount"]
+
+
+@pytest.fixture(scope="session")
+def mock_database():
+    """Seed catalog, mock listings and their opportunities (built once per run)."""
+    from models import init_db
+    from seed_data import seed_database
+    from mock_data import generate_mock_data
+
+    from models import engine
+
+    init_db()
+    seed_database()
+    generate_mock_data()
+
+    # Closing every connection checkpoints the WAL into the main file
+    engine.dispose()
+    shutil.copyfile(_db_path, _template_path)
+
+
+@pytest.fixture
+def database(mock_database):
+    """The mock database as mock_database built it, whatever earlier tests committed."""
+    from models import engine
+    from services.alerts import rule_index
+    from services.market import market_estimator
+    from services.search import catalog_index
+
+    engine.dispose()
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(_db_path + suffix):
+            os.remove(_db_path + suffix)
+    shutil.copyfile(_template_path, _db_path)
+
+    # Generations go back to the template's values too, so forget what the
+    # in-process caches loaded rather than trust a generation that matches
+    market_estimator._generation = None
+    rule_index._generations = None
+    catalog_index._generation = None
+
+
+@pytest.fixture
+def session(database):
+    from models import get_session
+
+    session = get_session()
+    yield session
+    session.rollback()
+    session.close()
@@ -0,0 +1,38 @@
+"""
+ROI rules value a listing as the arbitrage engine does: the reference's
+MarketPrice rows first, the estimate from listings otherwise.
+"""
+
+from models import MarketPrice, WatchReference, WatchRule, bump_generation
+
+
+def test_roi_rules_use_market_prices_before_the_estimate(session):
+    from services.alerts import RuleIndex
+    from services.market import market_estimator
+
+    reference = session.query(WatchReference).filter(WatchReference.reference_number == "126610LN").one()
+    rule = WatchRule(name="Sub under market", watch_reference_id=reference.id, min_roi_percent=20, notifier="file")
+    session.add(rule)
+    bump_generation(session, "rules")
+    session.commit()
+
+    index = RuleIndex()
+    index.ensure_loaded(session)
+    market_estimator.ensure_loaded(session)
+    market_price = index.market_price(reference.id, "full_set")
+    assert market_price == session.query(MarketPrice.market_price_usd).filter(
+        MarketPrice.watch_reference_id == reference.id, MarketPrice.box_papers_status == "full_set"
+    ).order_by(MarketPrice.id.desc()).limit(1).scalar()
+    assert market_price != market_estimator.estimate(reference.id, "full_set")
+
+    # A new market price is picked up on the next load
+    session.add(MarketPrice(
+        watch_reference_id=reference.id, box_papers_status="full_set", market_price_usd=30_000, source="test"
+    ))
+    bump_generation(session, "market_prices")
+    session.commit()
+    index.ensure_loaded(session)
+    [(matched, figures)] = index.match(reference.id, "full_set", "ebay", 20_000)
+    assert matched.id == rule.id
+    assert figures["market_price_usd"] == 30_000
+    assert index.match(reference.id, "full_set", "ebay", 25_000) == []
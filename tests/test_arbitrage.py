@@ -0,0 +1,51 @@
+"""
+Cross-platform detection over more than two platforms: the cheapest listing
+on each platform is checked against every other platform's average, and any
+platform in Config.FEES (only those) can be the sell side, at its own fee.
+"""
+
+import pytest
+
+from config import Config
+from models import Listing, WatchReference
+
+PRICES = {
+    "ebay": [13_000, 10_000],
+    "chrono24": [12_500, 13_500],
+    "watchbox": [14_000, 14_000],
+    "forum": [9_000],  # Not in Config.FEES: a place to buy, not to sell
+}
+
+
+@pytest.fixture
+def fees(monkeypatch):
+    monkeypatch.setitem(Config.FEES, "watchbox", 0.04)
+    return Config.FEES
+
+
+def test_cross_platform_across_registered_platforms(session, fees):
+    from services.arbitrage import ArbitrageEngine
+
+    ref = session.query(WatchReference).filter(WatchReference.reference_number == "126610LN").one()
+    listings = [
+        Listing(id=-(i + 1), watch_reference_id=ref.id, platform=platform, price=price, price_usd=price,
+                box_papers_status="full_set", listing_url=f"https://example.com/{platform}/{i}", is_active=True)
+        for i, (platform, price) in enumerate(
+            (platform, price) for platform, prices in PRICES.items() for price in prices
+        )
+    ]
+    engine = ArbitrageEngine(session)
+    engine._load_comp_stats([ref.id])
+
+    opportunities = engine._find_cross_platform_arbitrage(ref, listings)
+    assert {(opp.buy_platform, opp.sell_platform) for opp in opportunities} == {
+        ("ebay", "chrono24"), ("ebay", "watchbox"),
+        ("chrono24", "watchbox"),
+        ("forum", "ebay"), ("forum", "chrono24"), ("forum", "watchbox"),
+    }
+
+    for opp in opportunities:
+        sell_prices = PRICES[opp.sell_platform]
+        assert opp.buy_price == min(PRICES[opp.buy_platform])
+        assert opp.estimated_sell_price == sum(sell_prices) / len(sell_prices)
+        assert opp.platform_fee_estimate == pytest.approx(opp.estimated_sell_price * fees[opp.sell_platform])
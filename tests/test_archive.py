@@ -0,0 +1,26 @@
+"""
+Compaction moves retired opportunities to the archive instead of deleting them.
+"""
+
+from datetime import datetime, timedelta
+
+from models import ArbitrageOpportunity
+
+
+def test_compact_archives_retired_opportunities(session):
+    from config import Config
+    from services.archive import load_history
+    from services.arbitrage import ArbitrageEngine
+
+    opportunity = session.query(ArbitrageOpportunity).filter(ArbitrageOpportunity.is_active == True).first()
+    opportunity.is_active = False
+    opportunity.retired_at = datetime.utcnow() - timedelta(days=Config.OPPORTUNITY_RETENTION_DAYS + 1)
+    session.commit()
+    opportunity_id = opportunity.id
+
+    assert ArbitrageEngine(session).compact() == 1
+    assert session.get(ArbitrageOpportunity, opportunity_id) is None
+
+    # ARCHIVE_DIR is the test run's temporary directory (see conftest.py)
+    history = load_history("arbitrage_opportunities", include_hot=False)
+    assert history["id"].tolist() == [opportunity_id]
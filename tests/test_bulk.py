@@ -0,0 +1,72 @@
+"""
+The bulk listing loader on SQLite: new listings are inserted with the model
+defaults, loaded again they're updated in place, and batches commit on
+their own. Also the COPY text encoding used on PostgreSQL.
+"""
+
+from datetime import datetime, timedelta
+
+from models import Listing, WatchReference
+from services.bulk import _copy_text, load_listings
+
+
+def _row(reference_id, external_id, price, **fields) -> dict:
+    return {
+        "watch_reference_id": reference_id, "platform": "ebay", "external_id": external_id,
+        "price": price, "price_usd": price, "listing_url": f"https://example.com/bulk/{external_id}", **fields,
+    }
+
+
+def _listings(session, prefix="bulk-") -> dict:
+    session.expire_all()
+    return {
+        listing.external_id: listing
+        for listing in session.query(Listing).filter(Listing.external_id.like(f"{prefix}%"))
+    }
+
+
+def test_new_listings_get_model_defaults(session):
+    reference_id = session.query(WatchReference.id).order_by(WatchReference.id).first()[0]
+
+    assert load_listings(session, [_row(reference_id, "bulk-1", 9_000.0, title="Tab\tand\nnewline \\N")]) == 1
+    listing = _listings(session)["bulk-1"]
+    assert (listing.currency, listing.box_papers_status, listing.is_active) == ("USD", "unknown", True)
+    assert listing.title == "Tab\tand\nnewline \\N"
+    assert listing.scraped_at is not None and listing.created_at is not None
+
+
+def test_reloading_updates_in_place(session):
+    first, second = [ref_id for (ref_id,) in session.query(WatchReference.id).order_by(WatchReference.id).limit(2)]
+    created = datetime.utcnow() - timedelta(days=3)
+    load_listings(session, [_row(first, "bulk-1", 9_000.0, created_at=created, seller_name="First")])
+    original = _listings(session)["bulk-1"]
+    listing_id = original.id
+
+    load_listings(session, [_row(second, "bulk-1", 8_500.0, seller_name="Second", is_active=False)])
+    listing = _listings(session)["bulk-1"]
+    assert listing.id == listing_id
+    # Reference and created_at are kept, everything else is replaced
+    assert (listing.watch_reference_id, listing.created_at) == (first, created)
+    assert (listing.price_usd, listing.seller_name, listing.is_active) == (8_500.0, "Second", False)
+
+
+def test_batches_and_repeats(session):
+    reference_id = session.query(WatchReference.id).order_by(WatchReference.id).first()[0]
+    before = session.query(Listing).count()
+    rows = [_row(reference_id, f"bulk-{i}", 5_000.0 + i) for i in range(7)]
+    # Within a batch the last row for a listing wins; rows without an external ID are always new
+    rows += [_row(reference_id, "bulk-6", 7_777.0), _row(reference_id, None, 4_000.0), _row(reference_id, None, 4_000.0)]
+
+    assert load_listings(session, rows, batch_size=3) == len(rows) - 1
+    listings = _listings(session)
+    assert len(listings) == 7
+    assert listings["bulk-6"].price_usd == 7_777.0
+    assert session.query(Listing).count() == before + 9
+
+
+def test_copy_text_format():
+    assert _copy_text(None) == r"\N"
+    assert _copy_text("\\N") == r"\\N"
+    assert _copy_text("a\tb\nc\rd\\e") == r"a\tb\nc\rd\\e"
+    assert _copy_text(True) == "True"
+    assert _copy_text(12.5) == "12.5"
@@ -0,0 +1,57 @@
+"""
+Cassettes: a recorded response replays without touching the network, and a
+query that was never recorded is a CassetteMiss rather than a live request.
+"""
+
+import pytest
+import requests
+
+from api.cassette import Cassette, CassetteMiss
+
+KEY = {"q": "Rolex 126610LN", "limit": 25}
+PAYLOAD = {"total": 1, "itemSummaries": [{"itemId": "v1|123|0", "price": {"value": "11500.00"}}]}
+
+
+@pytest.fixture
+def cassette(tmp_path):
+    cassette = Cassette()
+    cassette.configure(mode="record", directory=str(tmp_path), latency_ms=0, error_rate=0)
+    return cassette
+
+
+def _offline():
+    raise AssertionError("The network was used in replay mode")
+
+
+def test_recorded_response_replays_offline(cassette):
+    calls = []
+
+    def live():
+        calls.append(1)
+        return PAYLOAD
+
+    assert cassette.fetch("ebay", KEY, live) == PAYLOAD
+    assert calls == [1]
+
+    cassette.configure(mode="replay")
+    assert cassette.fetch("ebay", dict(reversed(list(KEY.items()))), _offline) == PAYLOAD
+
+
+def test_replay_miss_raises(cassette):
+    cassette.configure(mode="replay")
+    with pytest.raises(CassetteMiss):
+        cassette.fetch("ebay", KEY, _offline)
+
+    # Recorded for another platform is still a miss
+    cassette.configure(mode="record")
+    cassette.fetch("chrono24", KEY, lambda: PAYLOAD)
+    cassette.configure(mode="replay")
+    with pytest.raises(CassetteMiss):
+        cassette.fetch("ebay", KEY, _offline)
+
+
+def test_replay_injects_errors(cassette):
+    cassette.fetch("ebay", KEY, lambda: PAYLOAD)
+    cassette.configure(mode="replay", error_rate=1.0, seed=1)
+    with pytest.raises(requests.ConnectionError):
+        cassette.fetch("ebay", KEY, _offline)
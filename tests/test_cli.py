@@ -0,0 +1,97 @@
+"""
+The headless CLI, run as a subprocess against a copy of the mock database
+with replayed marketplace responses: stdout is JSON lines only, the exit
+status follows the outcome, and a scan delivers its alerts before exiting.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+from config import Config
+from models import Listing, WatchRule, bump_generation
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def cli(session, tmp_path):
+    """Runs `python -m cli ...` against a copy of the database as it is when first called."""
+    from benchmarks.bench_scan_queue import write_cassettes
+    from models import engine
+
+    write_cassettes(str(tmp_path / "cassettes"))
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{tmp_path / 'cli.db'}",
+        DEBUG="false",
+        QUERY_TRACKING="false",
+        CASSETTE_MODE="replay",
+        CASSETTE_DIR=str(tmp_path / "cassettes"),
+        REPLAY_LATENCY_MS="0",
+        REPLAY_ERROR_RATE="0",
+        ALERT_FILE=str(tmp_path / "alerts.ndjson"),
+        ARCHIVE_DIR=str(tmp_path / "archive"),
+    )
+
+    def run(*args, **overrides):
+        if not os.path.exists(tmp_path / "cli.db"):
+            session.commit()
+            engine.dispose()
+            shutil.copyfile(Config.DATABASE_URL.removeprefix("sqlite:///"), tmp_path / "cli.db")
+        process = subprocess.run(
+            [sys.executable, "-m", "cli", *args], cwd=ROOT, env={**env, **overrides},
+            capture_output=True, text=True, timeout=300
+        )
+        events = [json.loads(line) for line in process.stdout.splitlines()]
+        return process.returncode, events
+
+    run.tmp_path = tmp_path
+    return run
+
+
+def test_scan_emits_json_lines_and_flushes_alerts(session, cli):
+    session.add(WatchRule(name="Anything", notifier="file"))
+    bump_generation(session, "rules")
+
+    status, events = cli("scan", "--references", "1", "2", "3")
+    assert status == 0
+    assert events[0]["event"] == "start" and events[0]["command"] == "scan"
+    assert {event["event"] for event in events[1:-1]} == {"progress"}
+    done = events[-1]
+    assert (done["event"], done["references"]) == ("done", 3)
+    # The cassettes hold searches only, so verifying top opportunities misses
+    assert all(error.startswith("eBay verify error") for error in done["errors"])
+    assert done["ebay_listings"] > 0
+
+    # The alerts queued during the scan were written before the process exited
+    with open(cli.tmp_path / "alerts.ndjson") as f:
+        alerts = [json.loads(line) for line in f]
+    assert alerts and {alert["rule"] for alert in alerts} == {"Anything"}
+
+
+def test_strict_scan_with_platform_errors_fails(cli):
+    status, events = cli("scan", "--references", "1", "--strict", REPLAY_ERROR_RATE="1")
+    assert status == 1
+    assert events[-1]["event"] == "error"
+    assert events[-1]["errors"] and "Scan finished with" in events[-1]["error"]
+
+    # Without --strict the same scan succeeds
+    status, events = cli("scan", "--references", "1", REPLAY_ERROR_RATE="1")
+    assert (status, events[-1]["event"]) == (0, "done")
+
+
+def test_export_and_failure_exit_codes(session, cli):
+    output = cli.tmp_path / "listings.ndjson"
+    status, events = cli("export", "listings", "--output", str(output), "--active-only")
+    assert (status, events[-1]["event"]) == (0, "done")
+    with open(output) as f:
+        assert sum(1 for _ in f) == session.query(Listing).filter(Listing.is_active == True).count()
+
+    status, events = cli("export", "listings", "--output", str(cli.tmp_path / "missing" / "listings.ndjson"))
+    assert status == 1
+    assert events[-1]["event"] == "error" and "No such file" in events[-1]["error"]
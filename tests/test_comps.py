@@ -0,0 +1,74 @@
+"""
+Comp statistics: flushed changes match a rebuild from the listings, and
+concurrent workers flushing the same new key neither collide nor lose
+each other's prices.
+"""
+
+import threading
+
+import pytest
+
+from models import CompStat, WatchReference, get_session
+from services.comps import CompTracker, rebuild_comp_stats
+
+
+def _stat(session, reference_id, tier, platform) -> CompStat:
+    session.expire_all()
+    return session.query(CompStat).filter(
+        CompStat.watch_reference_id == reference_id, CompStat.box_papers_status == tier,
+        CompStat.platform == platform
+    ).one()
+
+
+def test_flush_adds_updates_and_removes(session):
+    reference_id = session.query(WatchReference.id).order_by(WatchReference.id).first()[0]
+    tracker = CompTracker()
+    for price in (1_000.0, 2_000.0, 3_000.0):
+        tracker.add(reference_id, None, "comps", price)
+    tracker.flush(session)
+    session.commit()
+    stat = _stat(session, reference_id, "unknown", "comps")
+    assert (stat.comp_count, stat.mean_price_usd, stat.variance) == (3, 2_000.0, 1_000_000.0)
+
+    tracker.update(reference_id, None, "comps", 3_000.0, 6_000.0)
+    tracker.remove(reference_id, None, "comps", 1_000.0)
+    tracker.flush(session)
+    session.commit()
+    stat = _stat(session, reference_id, "unknown", "comps")
+    assert (stat.comp_count, stat.mean_price_usd) == (2, 4_000.0)
+    assert stat.variance == pytest.approx(8_000_000.0)
+
+
+def test_concurrent_flushes_of_a_new_key(session):
+    reference_id = session.query(WatchReference.id).order_by(WatchReference.id).first()[0]
+    start, errors = threading.Barrier(6), []
+
+    def work(price):
+        worker_session = get_session()
+        tracker = CompTracker()
+        tracker.add(reference_id, "full_set", "comps", price)
+        start.wait()
+        try:
+            tracker.flush(worker_session)
+            worker_session.commit()
+        except Exception as e:
+            errors.append(e)
+        finally:
+            worker_session.close()
+
+    threads = [threading.Thread(target=work, args=(1_000.0 * (i + 1),)) for i in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    stat = _stat(session, reference_id, "full_set", "comps")
+    assert (stat.comp_count, stat.mean_price_usd) == (6, 3_500.0)
+
+
+def test_rebuild_matches_the_seeded_stats(session):
+    before = {(s.watch_reference_id, s.box_papers_status, s.platform): s.comp_count for s in session.query(CompStat)}
+    assert rebuild_comp_stats(session) == len(before)
+    after = {(s.watch_reference_id, s.box_papers_status, s.platform): s.comp_count for s in session.query(CompStat)}
+    assert after == before
@@ -0,0 +1,55 @@
+"""
+Duplicate detection: near-identical titles land in a shared LSH bucket and
+are linked, different watches of the same reference are not.
+"""
+
+from models import Listing, ListingLSHBucket, WatchReference
+
+SHARED = {"rolex", "submariner", "126610ln", "date"}
+TITLE = "Rolex Submariner Date 126610LN 2021 full set box papers warranty card unworn"
+RETITLED = "Rolex Submariner Date 126610LN 2021 full set box & papers warranty card, unworn"
+DIFFERENT = "Rolex Submariner Date 126610LN 2019 watch only polished bracelet stretched"
+
+
+def _buckets(title: str) -> set[int]:
+    from services.dedupe import lsh_buckets, minhash, shingles, title_tokens
+
+    return set(lsh_buckets(minhash(shingles(title_tokens(title, SHARED)))))
+
+
+def test_near_duplicate_titles_share_a_bucket():
+    assert _buckets(TITLE) & _buckets(RETITLED)
+
+
+def test_distinct_titles_share_no_bucket():
+    assert not _buckets(TITLE) & _buckets(DIFFERENT)
+
+
+def test_link_duplicates_across_platforms(session):
+    from services.dedupe import link_duplicates
+
+    reference_id = session.query(WatchReference.id).filter(WatchReference.reference_number == "126610LN").scalar()
+
+    def listing(platform, title, price):
+        return Listing(
+            watch_reference_id=reference_id, platform=platform, external_id=f"lsh-{platform}-{price}",
+            title=title, price=price, price_usd=price, box_papers_status="full_set",
+            seller_name="Crown Dealers", listing_url=f"https://example.com/lsh/{platform}/{price}", is_active=True
+        )
+
+    original = listing("ebay", TITLE, 14_000.0)
+    session.add(original)
+    session.flush()
+    assert link_duplicates(session, [original]) == set()
+    session.commit()
+
+    relisted, different = listing("chrono24", RETITLED, 14_100.0), listing("chrono24", DIFFERENT, 14_050.0)
+    session.add_all([relisted, different])
+    session.flush()
+    assert link_duplicates(session, [relisted, different]) == {relisted.id}
+    assert relisted.duplicate_of_id == original.id
+    assert different.duplicate_of_id is None
+
+    # Both new listings are indexed for later batches
+    indexed = {row.listing_id for row in session.query(ListingLSHBucket.listing_id)}
+    assert {original.id, relisted.id, different.id} <= indexed
@@ -0,0 +1,54 @@
+"""
+When a listing that others duplicate goes inactive, its earliest active
+duplicate takes its place in the comp statistics, and the rest follow it.
+"""
+
+import json
+
+from models import CompStat, Listing, WatchReference
+
+
+def _comp_stats(session) -> dict:
+    return {
+        (row.watch_reference_id, row.box_papers_status, row.platform):
+            (row.comp_count, round(row.mean_price_usd, 6), json.loads(row.sketch))
+        for row in session.query(CompStat).filter(CompStat.comp_count > 0)
+    }
+
+
+def test_deactivating_an_original_promotes_its_duplicate(session):
+    from services.comps import rebuild_comp_stats
+    from services.scanner import Scanner
+
+    reference_id = session.query(WatchReference.id).filter(WatchReference.reference_number == "126610LN").scalar()
+    original, first, second = [
+        Listing(
+            watch_reference_id=reference_id, platform=platform, external_id=f"dedupe-{platform}-{i}",
+            price=11_500.0 + i, price_usd=11_500.0 + i, box_papers_status="full_set",
+            listing_url=f"https://example.com/dedupe/{i}", is_active=True
+        )
+        for i, platform in enumerate(["ebay", "chrono24", "ebay"])
+    ]
+    session.add(original)
+    session.flush()
+    first.duplicate_of_id = second.duplicate_of_id = original.id
+    session.add_all([first, second])
+    session.commit()
+    rebuild_comp_stats(session)
+
+    scanner = Scanner()
+    try:
+        scanner._deactivate(scanner.session.query(Listing).filter(Listing.id == original.id))
+        scanner.session.commit()
+    finally:
+        scanner.session.close()
+
+    session.expire_all()
+    assert first.duplicate_of_id is None
+    assert second.duplicate_of_id == first.id
+
+    # The incremental update matches a rebuild from the active originals
+    updated = _comp_stats(session)
+    rebuild_comp_stats(session)
+    assert updated == _comp_stats(session)
+
@@ -0,0 +1,54 @@
+"""
+Live updates: published events reach subscribers as server-sent event
+frames, and streams are capped per process and closed after max_age.
+"""
+
+import json
+
+from services.events import EventBroker
+
+
+def test_publish_reaches_subscriber():
+    broker = EventBroker()
+    subscription = broker.subscribe()
+    stream = broker.stream(subscription, heartbeat=5)
+
+    broker.publish("opportunities", {"added": [1, 2], "retired": [], "generation": 7})
+    frame = next(stream)
+    assert frame.startswith("event: opportunities\n")
+    assert json.loads(frame.split("data: ", 1)[1]) == {"added": [1, 2], "retired": [], "generation": 7}
+
+    # Closing the stream unsubscribes
+    stream.close()
+    broker.publish("opportunities", {"added": [3]})
+    assert subscription.empty()
+
+
+def test_generation_poll_reports_other_processes():
+    broker = EventBroker()
+    generations = iter([1, 2])
+    stream = broker.stream(broker.subscribe(), heartbeat=0.01, poll=lambda: next(generations))
+    assert next(stream) == 'event: generation\ndata: {"generation": 2}\n\n'
+    stream.close()
+
+
+def test_streams_are_capped_and_expire():
+    broker = EventBroker(max_streams=2)
+    first = broker.subscribe()
+    assert broker.subscribe() is not None
+    assert broker.subscribe() is None
+
+    # A stream past max_age ends, freeing its slot
+    frames = list(broker.stream(first, heartbeat=0.01, max_age=0.05))
+    assert frames and set(frames) == {": keepalive\n\n"}
+    assert broker.subscribe() is not None
+
+
+def test_events_endpoint_rejects_streams_over_the_cap(database, monkeypatch):
+    from app import app
+    from services.events import event_broker
+
+    monkeypatch.setattr(event_broker, "max_streams", 0)
+    response = app.server.test_client().get("/events")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "60"
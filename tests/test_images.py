@@ -0,0 +1,94 @@
+"""
+The card image proxy against the stand-in origin: misses fetch once and
+hits are served from disk, the least recently used thumbnails are evicted
+first, and only allowed hosts are fetched.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+import pytest
+import requests
+
+from config import Config
+from services.images import PLACEHOLDER, ImageCache, _OriginStandIn, _png
+
+
+class _RecordingOrigin(_OriginStandIn):
+    requests = []
+
+    def do_GET(self):
+        self.requests.append(self.path)
+        super().do_GET()
+
+
+@pytest.fixture(scope="module")
+def origin():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _RecordingOrigin)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+@pytest.fixture
+def cache(origin, tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "IMAGE_PROXY_HOSTS", ["127.0.0.1"])
+    _RecordingOrigin.requests.clear()
+    return ImageCache(directory=str(tmp_path))
+
+
+def test_miss_fetches_and_hit_reads_from_disk(origin, cache):
+    url = f"{origin}/300x200/rolex.png"
+
+    data, key, cached = cache.get(url)
+    assert not cached
+    assert os.path.exists(cache._path(key))
+
+    assert cache.get(url) == (data, key, True)
+    assert _RecordingOrigin.requests == ["/300x200/rolex.png"]
+
+
+def test_least_recently_used_is_evicted(origin, cache):
+    urls = {name: f"{origin}/64x64/{name}.png" for name in ("a", "b", "c")}
+    paths = {name: cache._path(cache.key(url)) for name, url in urls.items()}
+    sizes = {name: len(cache.get(url)[0]) for name, url in urls.items() if name != "c"}
+    sizes["c"] = len(_png(64, 64, tuple(hashlib.md5(b"c.png").digest()[:3])))
+
+    # b was used after a, then a is read again
+    now = time.time()
+    os.utime(paths["a"], (now - 200, now - 200))
+    os.utime(paths["b"], (now - 100, now - 100))
+    cache.get(urls["a"])
+
+    # Fetching c takes the cache over its bound
+    cache.max_bytes = sum(sizes.values()) - 1
+    cache.get(urls["c"])
+
+    assert os.path.exists(paths["a"])
+    assert not os.path.exists(paths["b"])
+    assert os.path.exists(paths["c"])
+
+
+def test_disallowed_host_is_rejected(origin, cache):
+    with pytest.raises(ValueError, match="not allowed"):
+        cache.get(origin.replace("127.0.0.1", "localhost") + "/64x64/rolex.png")
+    with pytest.raises(ValueError, match="not allowed"):
+        cache.get("file:///etc/passwd")
+    assert _RecordingOrigin.requests == []
+
+
+def test_origin_failure(origin, cache, monkeypatch):
+    with pytest.raises(requests.HTTPError):
+        cache.get(f"{origin}/not-an-image")
+    assert not any(name for _, _, names in os.walk(cache.directory) for name in names)
+
+    # The proxy falls back to the placeholder
+    import app
+
+    monkeypatch.setattr(app, "image_cache", cache)
+    response = app.app.server.test_client().get("/img", query_string={"url": f"{origin}/not-an-image"})
+    assert response.status_code == 302
+    assert response.headers["Location"].endswith(PLACEHOLDER)
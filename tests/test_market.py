@@ -0,0 +1,92 @@
+"""
+Market estimates: the quantile sketch against a known distribution, the
+trimmed mean shrugging off outliers, and the scanner only changing the
+estimate once its transaction commits.
+"""
+
+import random
+import statistics
+
+import pytest
+
+from models import Listing
+from services.market import MarketEstimator, QuantileSketch
+
+TRIM = 0.2
+
+
+@pytest.fixture(scope="module")
+def prices():
+    rng = random.Random(42)
+    return sorted(rng.lognormvariate(9.5, 0.25) for _ in range(20_000))
+
+
+def _exact_quantile(values, q):
+    return values[int(q * (len(values) - 1))]
+
+
+def _exact_trimmed_mean(values, trim):
+    cut = int(trim * len(values))
+    return statistics.fmean(values[cut:len(values) - cut])
+
+
+@pytest.mark.parametrize("q", [0.05, 0.25, 0.5, 0.75, 0.95])
+def test_quantiles_within_relative_accuracy(prices, q):
+    sketch = QuantileSketch(relative_accuracy=0.005)
+    sketch.add_all(prices)
+    assert sketch.quantile(q) == pytest.approx(_exact_quantile(prices, q), rel=0.006)
+
+
+def test_add_all_matches_add(prices):
+    one_by_one, at_once = QuantileSketch(), QuantileSketch()
+    for price in prices[:500]:
+        one_by_one.add(price)
+    at_once.add_all(prices[:500] + [0, -1])
+    assert (one_by_one.buckets, one_by_one.count) == (at_once.buckets, at_once.count)
+
+
+def test_trimmed_mean_ignores_outliers(prices):
+    sketch = QuantileSketch()
+    sketch.add_all(prices)
+    expected = _exact_trimmed_mean(prices, TRIM)
+    assert sketch.trimmed_mean(TRIM) == pytest.approx(expected, rel=0.005)
+
+    # A handful of absurd asks (and $1 placeholders) land in the trimmed tails
+    outliers = [5_000_000.0] * 200 + [1.0] * 200
+    sketch.add_all(outliers)
+    assert sketch.trimmed_mean(TRIM) == pytest.approx(expected, rel=0.01)
+
+    for value in outliers:
+        sketch.remove(value)
+    assert sketch.trimmed_mean(TRIM) == pytest.approx(expected, rel=0.005)
+    assert sketch.count == len(prices)
+
+
+def test_estimator_follows_commits_not_rollbacks(session):
+    from services.market import market_estimator
+    from services.scanner import Scanner
+
+    listing = session.query(Listing).filter(
+        Listing.is_active == True, Listing.duplicate_of_id.is_(None)
+    ).order_by(Listing.id).first()
+    market_estimator.ensure_loaded(session)
+    before = market_estimator.estimate(listing.watch_reference_id, listing.box_papers_status)
+
+    scanner = Scanner()
+    try:
+        deactivate = scanner.session.query(Listing).filter(Listing.id == listing.id)
+        scanner._deactivate(deactivate)
+        scanner.session.rollback()
+        assert market_estimator.estimate(listing.watch_reference_id, listing.box_papers_status) == before
+
+        scanner._deactivate(deactivate)
+        scanner.session.commit()
+    finally:
+        scanner.session.close()
+
+    # The same as a reload from the committed listings
+    reloaded = MarketEstimator()
+    reloaded.ensure_loaded(session)
+    after = market_estimator.estimate(listing.watch_reference_id, listing.box_papers_status)
+    assert after != before
+    assert after == reloaded.estimate(listing.watch_reference_id, listing.box_papers_status)
@@ -0,0 +1,122 @@
+"""
+WatchCharts refresh against the stand-in API (api/watchcharts.py): prices
+are stored, unlisted references get an empty UUID, a stale UUID is reset,
+a 429 ends the run, and due_references honours the TTL.
+"""
+
+import threading
+from datetime import datetime, timedelta
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from config import Config
+from models import MarketPrice, PriceHistory, WatchReference
+from api.watchcharts import WatchChartsClient, _StandIn
+from services.market_data import SOURCE, due_references, refresh_market_prices
+
+
+class _FastStandIn(_StandIn):
+    min_interval = 0.0
+
+
+@pytest.fixture
+def stand_in(monkeypatch):
+    """A WatchCharts client pointed at a stand-in server, without the 1 request/second wait."""
+    from api.ratelimit import rate_limits
+
+    monkeypatch.setattr(rate_limits, "acquire", lambda platform: None)
+    servers = []
+
+    def start(handler=_FastStandIn) -> WatchChartsClient:
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        client = WatchChartsClient()
+        client.api_key = "test"
+        client.base_url = f"http://127.0.0.1:{server.server_port}/v3"
+        return client
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+def _due_ids(session) -> list[int]:
+    return [ref.id for ref in due_references(session, limit=1000)]
+
+
+def _reference(session, reference_id) -> WatchReference:
+    ref = session.get(WatchReference, reference_id)
+    session.refresh(ref)
+    return ref
+
+
+def test_refresh_stores_prices_and_marks_unlisted(session, stand_in):
+    listed, unlisted = [ref.id for ref in due_references(session, limit=2)]
+    session.get(WatchReference, unlisted).reference_number = "UNLISTED-1"
+    session.commit()
+
+    stats = refresh_market_prices(session, limit=2, client=stand_in())
+    assert (stats["checked"], stats["refreshed"], stats["resolved"], stats["unlisted"]) == (2, 1, 1, 1)
+    assert stats["reference_ids"] == [listed] and stats["errors"] == []
+
+    [price] = session.query(MarketPrice).filter(MarketPrice.source == SOURCE, MarketPrice.watch_reference_id == listed)
+    assert price.box_papers_status == "full_set" and 5000 <= price.market_price_usd < 55000
+    assert session.query(PriceHistory).filter(PriceHistory.watch_reference_id == listed).count() >= 1
+
+    # WatchCharts doesn't list it: an empty UUID, and never due again until cleared
+    assert _reference(session, unlisted).watchcharts_uuid == ""
+    assert listed not in _due_ids(session) and unlisted not in _due_ids(session)
+
+
+def test_stale_uuid_is_reset(session, stand_in):
+    [reference_id] = [ref.id for ref in due_references(session, limit=1)]
+    session.get(WatchReference, reference_id).watchcharts_uuid = "0" * 31 + "x"  # Not a UUID the stand-in knows
+    session.commit()
+
+    stats = refresh_market_prices(session, limit=1, client=stand_in())
+    assert stats["refreshed"] == 0 and "404" in stats["errors"][0]
+    ref = _reference(session, reference_id)
+    assert ref.watchcharts_uuid is None and ref.watchcharts_checked_at is not None
+
+
+def test_rate_limited_run_stops_early(session, stand_in, monkeypatch):
+    class _SlowStandIn(_StandIn):
+        min_interval = 60.0
+
+    monkeypatch.setattr(_StandIn, "_last_request", 0.0)
+    due = [ref.id for ref in due_references(session, limit=3)]
+
+    # The search answers, the price lookup right after it is a 429
+    stats = refresh_market_prices(session, limit=3, client=stand_in(_SlowStandIn))
+    assert stats["checked"] == 1 and stats["refreshed"] == 0
+    assert len(stats["errors"]) == 1 and "429" in stats["errors"][0]
+    assert set(due) <= set(_due_ids(session))
+
+
+def test_due_references_ttl(session):
+    reference_id = _due_ids(session)[0]
+    now = datetime.utcnow()
+    ttl = timedelta(hours=Config.MARKET_PRICE_TTL_HOURS)
+
+    price = MarketPrice(watch_reference_id=reference_id, box_papers_status="full_set", market_price_usd=10_000,
+                        source=SOURCE, recorded_at=now)
+    session.add(price)
+    session.commit()
+    assert reference_id not in _due_ids(session)
+
+    price.recorded_at = now - ttl - timedelta(minutes=1)
+    session.commit()
+    assert reference_id in _due_ids(session)
+
+    # A recent lookup without a price also counts
+    session.get(WatchReference, reference_id).watchcharts_checked_at = now
+    session.commit()
+    assert reference_id not in _due_ids(session)
+
+    # Prices from other sources don't
+    price.source, price.recorded_at = "manual", now
+    session.get(WatchReference, reference_id).watchcharts_checked_at = None
+    session.commit()
+    assert reference_id in _due_ids(session)
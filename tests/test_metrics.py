@@ -0,0 +1,35 @@
+"""
+/metrics reports the time since the last full scan completed, whichever
+process ran it, and not since anything else touched listings.
+"""
+
+import re
+from datetime import datetime, timedelta
+
+from models import Generation, bump_generation
+
+
+def _last_scan_age() -> float:
+    from app import app
+
+    body = app.server.test_client().get("/metrics").get_data(as_text=True)
+    return float(re.search(r"^watch_last_scan_age_seconds (\S+)$", body, re.MULTILINE).group(1))
+
+
+def test_last_scan_age_follows_completed_scans(session):
+    from services.scanner import Scanner
+
+    scanner = Scanner()
+    try:
+        scanner.sweep_stale_listings()
+    finally:
+        scanner.session.close()
+    assert _last_scan_age() < 60
+
+    session.query(Generation).filter(Generation.name == "scan_completed").update(
+        {"updated_at": datetime.utcnow() - timedelta(hours=1)}
+    )
+    # Bulk loads, backfills and the archive bump listings too
+    bump_generation(session, "listings")
+    session.commit()
+    assert 3590 < _last_scan_age() < 3700
@@ -0,0 +1,74 @@
+"""
+The migration chain: upgrading a database with the original schema must
+reach exactly the schema the models describe, keeping its data.
+"""
+
+import os
+from datetime import datetime
+
+import pytest
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config as AlembicConfig
+from alembic.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from models import Base, BASELINE_REVISION, SCHEMA_REVISION
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+
+
+@pytest.fixture
+def baseline_engine(tmp_path):
+    """A database at the baseline revision with a few rows, including a repeated listing."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'baseline.db'}")
+    with engine.begin() as connection:
+        _upgrade(connection, BASELINE_REVISION)
+        connection.execute(text("INSERT INTO brands (id, name, slug) VALUES (1, 'Rolex', 'rolex')"))
+        connection.execute(text(
+            "INSERT INTO watch_references (id, brand_id, reference_number) VALUES (1, 1, '126610LN')"
+        ))
+        now = datetime.utcnow()
+        for listing_id in (1, 2, 3):
+            connection.execute(text(
+                "INSERT INTO listings (id, watch_reference_id, platform, external_id, price, price_usd, "
+                "listing_url, is_active, scraped_at, created_at) "
+                "VALUES (:id, 1, 'ebay', :external_id, 12000, 12000, 'https://example.com', 1, :now, :now)"
+            ), {"id": listing_id, "external_id": "repeated" if listing_id < 3 else "single", "now": now})
+        connection.execute(text(
+            "INSERT INTO arbitrage_opportunities (listing_id, watch_reference_id, opportunity_type, buy_price, "
+            "buy_platform, found_at, is_active) VALUES (1, 1, 'undervalued', 12000, 'ebay', :now, 1)"
+        ), {"now": now})
+    yield engine
+    engine.dispose()
+
+
+def _upgrade(connection, revision: str):
+    config = AlembicConfig(ALEMBIC_INI)
+    config.attributes["connection"] = connection
+    command.upgrade(config, revision)
+
+
+def test_schema_revision_is_head():
+    assert ScriptDirectory.from_config(AlembicConfig(ALEMBIC_INI)).get_current_head() == SCHEMA_REVISION
+
+
+def test_upgrade_from_baseline_matches_models(baseline_engine):
+    with baseline_engine.begin() as connection:
+        _upgrade(connection, "head")
+        assert compare_metadata(MigrationContext.configure(connection), Base.metadata) == []
+
+    # Every model loads against the upgraded database
+    with Session(baseline_engine) as session:
+        for mapper in Base.registry.mappers:
+            session.query(mapper.class_).all()
+
+    with baseline_engine.connect() as connection:
+        # The repeated listing was merged into the newest row, which keeps the old row's opportunity, retired
+        assert connection.execute(text("SELECT id FROM listings ORDER BY id")).scalars().all() == [2, 3]
+        [(listing_id, is_active, retired_at)] = connection.execute(text(
+            "SELECT listing_id, is_active, retired_at FROM arbitrage_opportunities"
+        )).all()
+        assert (listing_id, bool(is_active)) == (2, False) and retired_at is not None
@@ -0,0 +1,81 @@
+"""
+The scan -> analysis pipeline: every scanned reference is analyzed after it
+was scanned, analysis overlaps the scan, and a failed analysis stops the scan.
+"""
+
+import threading
+
+import pytest
+
+from models import WatchReference
+from services.arbitrage import ArbitrageEngine
+from services.pipeline import ScanPipeline
+from services.scanner import Scanner
+
+NO_SWEEP = {"expired": 0, "reference_ids": [], "errors": []}
+
+
+@pytest.fixture
+def events(monkeypatch):
+    """Record scans and analyses in order, without touching the marketplaces."""
+    events = []
+    monkeypatch.setattr(Scanner, "sweep_stale_listings", lambda self: events.append(("sweep",)) or NO_SWEEP)
+    return events
+
+
+def test_references_are_analyzed_after_their_scan_while_the_scan_runs(session, monkeypatch, events):
+    reference_ids = [reference_id for (reference_id,) in session.query(WatchReference.id).order_by(WatchReference.id)]
+    analyzed = threading.Event()
+
+    def scan_reference(self, ref):
+        if ref.id == reference_ids[-1]:
+            # Only finishes if analysis started before the scan was over
+            assert analyzed.wait(timeout=10)
+        events.append(("scan", ref.id))
+        return {"ebay": 1, "chrono24": 0, "errors": []}
+
+    def analyze_references(self, batch):
+        events.append(("analyze", list(batch)))
+        analyzed.set()
+        return []
+
+    monkeypatch.setattr(Scanner, "scan_reference", scan_reference)
+    monkeypatch.setattr(ArbitrageEngine, "analyze_references", analyze_references)
+
+    stats = ScanPipeline(queue_size=4, analyze_batch=3).run()
+    assert stats["references_scanned"] == stats["references_analyzed"] == len(reference_ids)
+    assert stats["ebay_listings"] == len(reference_ids)
+
+    position = {}
+    for i, event in enumerate(events):
+        if event[0] == "scan":
+            position[event[1]] = i
+        elif event[0] == "analyze":
+            assert all(position[reference_id] < i for reference_id in event[1])
+            assert len(event[1]) <= 3
+    analyzed_ids = [reference_id for event in events if event[0] == "analyze" for reference_id in event[1]]
+    assert analyzed_ids == reference_ids
+    assert events.index(("sweep",)) > max(position.values())
+
+
+def test_failed_analysis_stops_the_scan(session, monkeypatch, events):
+    total = session.query(WatchReference).count()
+
+    def scan_reference(self, ref):
+        events.append(("scan", ref.id))
+        return {"ebay": 0, "chrono24": 0, "errors": []}
+
+    def analyze_references(self, batch):
+        raise RuntimeError("analysis failed")
+
+    monkeypatch.setattr(Scanner, "scan_reference", scan_reference)
+    monkeypatch.setattr(ArbitrageEngine, "analyze_references", analyze_references)
+
+    with pytest.raises(RuntimeError, match="analysis failed"):
+        ScanPipeline(queue_size=2, analyze_batch=1).run()
+
+    # The producer stopped instead of scanning the rest into a queue nobody reads
+    scans = [event for event in events if event[0] == "scan"]
+    assert len(scans) < total
+    assert ("sweep",) not in events
+    assert not any(thread.name == "pipeline-scan" for thread in threading.enumerate())
@@ -0,0 +1,80 @@
+"""
+Statement budgets for the dashboard feed, analysis and listing ingest.
+Each path loads what it needs in bulk, so its statement count must not grow
+with the number of opportunities or listings.
+"""
+
+from models import WatchReference
+
+
+def test_feed_query_budget(database, query_budget):
+    from app import get_opportunities
+
+    with query_budget("get_opportunities", max_queries=1, max_repeats=1):
+        results = get_opportunities()
+    assert results
+
+
+def test_analyze_all_query_budget(session, query_budget):
+    from services.arbitrage import ArbitrageEngine
+
+    with query_budget("analyze_all", max_queries=15, max_repeats=2):
+        opportunities = ArbitrageEngine(session).analyze_all()
+    assert opportunities
+
+
+def _listings(prefix: str, count: int, price: float = 12_000.0) -> list[dict]:
+    return [
+        {
+            "platform": "ebay",
+            "external_id": f"{prefix}-{i}",
+            "price": price + i,
+            "price_usd": price + i,
+            "box_papers_status": "full_set",
+            "title": f"Rolex Submariner Date 126610LN listing {prefix} {i}",
+            "listing_url": f"https://example.com/{prefix}/{i}",
+        }
+        for i in range(count)
+    ]
+
+
+def _reference_id(session) -> int:
+    return session.query(WatchReference.id).filter(WatchReference.reference_number == "126610LN").scalar()
+
+
+def test_save_listings_query_budget_new(session, query_budget):
+    from services.scanner import Scanner
+
+    scanner = Scanner()
+    reference_id = _reference_id(session)
+    listings = _listings("budget-new", 40)
+    try:
+        # SQLite gets one INSERT per new ORM row (Postgres batches them);
+        # everything else is a fixed number of statements
+        with query_budget("_save_listings (new)", max_queries=len(listings) + 12, max_repeats=None) as log:
+            assert scanner._save_listings(listings, reference_id) == len(listings)
+        assert sum(n for shape, n in log.shapes.items() if not shape.startswith("INSERT INTO listings ")) <= 12
+    finally:
+        scanner.session.close()
+
+
+def test_save_listings_query_budget_repeat_scan(session, query_budget):
+    from services.scanner import Scanner
+
+    scanner = Scanner()
+    reference_id = _reference_id(session)
+    listings = _listings("budget-repeat", 40)
+    try:
+        scanner._save_listings(listings, reference_id)
+
+        # Seen again unchanged: one lookup and one batched touch
+        with query_budget("_save_listings (unchanged)", max_queries=6, max_repeats=2):
+            assert scanner._save_listings(listings, reference_id) == 0
+
+        # Every price changed: batched rewrites and price events
+        repriced = [dict(listing, price=listing["price"] - 100, price_usd=listing["price_usd"] - 100)
+                    for listing in listings]
+        with query_budget("_save_listings (repriced)", max_queries=10, max_repeats=2):
+            assert scanner._save_listings(repriced, reference_id) == 0
+    finally:
+        scanner.session.close()
@@ -0,0 +1,86 @@
+"""
+The scan work queue: claiming under a lease, taking over expired leases,
+failing tasks out of attempts, and concurrent workers never sharing a task.
+"""
+
+import threading
+from datetime import datetime, timedelta
+
+from config import Config
+from models import ScanTask, WatchReference, get_session
+from services.scan_queue import claim_tasks, complete_task, enqueue_scan, queue_status
+
+
+def _expire(session, task_id):
+    session.query(ScanTask).filter(ScanTask.id == task_id).update(
+        {"lease_expires_at": datetime.utcnow() - timedelta(seconds=1)}
+    )
+    session.commit()
+
+
+def test_claim_leases_pending_tasks(session):
+    pending = enqueue_scan(session)
+    assert pending == session.query(WatchReference).count()
+
+    claimed = claim_tasks(session, "worker-1", limit=3)
+    assert len(claimed) == 3
+    tasks = session.query(ScanTask).filter(ScanTask.id.in_([task_id for task_id, _ in claimed])).all()
+    assert {(task.status, task.lease_owner, task.attempts) for task in tasks} == {("leased", "worker-1", 1)}
+    assert {task.watch_reference_id for task in tasks} == {reference_id for _, reference_id in claimed}
+
+    # Leased tasks aren't claimed again
+    assert not {task_id for task_id, _ in claimed} & {task_id for task_id, _ in claim_tasks(session, "worker-2", limit=100)}
+    assert queue_status(session)["pending"] == 0
+
+
+def test_expired_lease_is_taken_over(session):
+    enqueue_scan(session)
+    [(task_id, _)] = claim_tasks(session, "worker-1", limit=1)
+    _expire(session, task_id)
+
+    [(taken_id, _)] = claim_tasks(session, "worker-2", limit=1)
+    assert taken_id == task_id
+    task = session.get(ScanTask, task_id)
+    session.refresh(task)
+    assert (task.lease_owner, task.attempts) == ("worker-2", 2)
+
+    # The first worker finishing late doesn't overwrite the new lease
+    assert not complete_task(session, "worker-1", task_id)
+    assert complete_task(session, "worker-2", task_id)
+
+
+def test_expired_lease_out_of_attempts_fails(session):
+    enqueue_scan(session)
+    [(task_id, _)] = claim_tasks(session, "worker-1", limit=1)
+    session.query(ScanTask).filter(ScanTask.id == task_id).update({"attempts": Config.SCAN_MAX_ATTEMPTS})
+    session.commit()
+    _expire(session, task_id)
+
+    assert task_id not in {claimed_id for claimed_id, _ in claim_tasks(session, "worker-2", limit=1000)}
+    task = session.get(ScanTask, task_id)
+    session.refresh(task)
+    assert (task.status, task.lease_owner, task.last_error) == ("failed", None, "lease expired")
+    assert queue_status(session)["failed"] == 1
+
+
+def test_concurrent_claims_never_share_a_task(session):
+    total = enqueue_scan(session)
+    claims = {}
+
+    def work(worker_id):
+        worker_session = get_session()
+        try:
+            claims[worker_id] = []
+            while batch := claim_tasks(worker_session, worker_id, limit=2):
+                claims[worker_id].extend(task_id for task_id, _ in batch)
+        finally:
+            worker_session.close()
+
+    workers = [threading.Thread(target=work, args=(f"worker-{i}",)) for i in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    claimed = [task_id for task_ids in claims.values() for task_id in task_ids]
+    assert len(claimed) == len(set(claimed)) == total
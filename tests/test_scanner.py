@@ -0,0 +1,82 @@
+"""
+Listings leave the feed when a complete search no longer returns them or
+when eBay reports them gone, and verification is skipped without eBay.
+"""
+
+import pytest
+
+from models import ArbitrageOpportunity, Listing
+
+
+def _ebay_opportunities(session, limit):
+    """Active opportunities on active eBay listings, most profitable first."""
+    return session.query(ArbitrageOpportunity).join(
+        Listing, ArbitrageOpportunity.listing_id == Listing.id
+    ).filter(
+        ArbitrageOpportunity.is_active == True, Listing.is_active == True, Listing.platform == "ebay"
+    ).order_by(ArbitrageOpportunity.estimated_profit.desc()).limit(limit).all()
+
+
+@pytest.fixture
+def scanner():
+    from services.scanner import Scanner
+
+    scanner = Scanner()
+    yield scanner
+    scanner.session.close()
+
+
+def test_listing_missing_from_a_complete_search_expires(session, scanner):
+    from services.arbitrage import ArbitrageEngine
+
+    [opportunity] = _ebay_opportunities(session, 1)
+    listing = opportunity.listing
+    others = session.query(Listing).filter(
+        Listing.watch_reference_id == listing.watch_reference_id, Listing.platform == "ebay",
+        Listing.is_active == True, Listing.id != listing.id
+    ).all()
+
+    returned = [{"external_id": other.external_id} for other in others]
+    assert scanner.expire_missing_listings(listing.watch_reference_id, "ebay", returned) == 1
+    ArbitrageEngine(scanner.session).analyze_references([listing.watch_reference_id])
+
+    session.expire_all()
+    assert not listing.is_active
+    assert all(other.is_active for other in others)
+    assert session.query(ArbitrageOpportunity).filter(
+        ArbitrageOpportunity.listing_id == listing.id, ArbitrageOpportunity.is_active == True
+    ).count() == 0
+
+
+def test_verification_expires_sold_and_ended_listings(session, scanner, monkeypatch):
+    from api.ebay import ebay_client
+
+    sold, ended, live = [opportunity.listing for opportunity in _ebay_opportunities(session, 3)]
+    items = {
+        sold.external_id: {"itemId": sold.external_id,
+                           "estimatedAvailabilities": [{"estimatedAvailabilityStatus": "OUT_OF_STOCK"}]},
+        live.external_id: {"itemId": live.external_id},
+    }
+    monkeypatch.setattr(ebay_client, "is_available", lambda: True)
+    monkeypatch.setattr(ebay_client, "get_items", lambda item_ids: {i: items[i] for i in item_ids if i in items})
+
+    result = scanner.verify_top_opportunities(limit=3)
+    assert (result["checked"], result["expired"]) == (3, 2)
+    assert set(result["reference_ids"]) == {sold.watch_reference_id, ended.watch_reference_id}
+
+    session.expire_all()
+    assert (sold.is_active, ended.is_active, live.is_active) == (False, False, True)
+
+
+def test_verification_is_skipped_without_ebay(session, scanner, monkeypatch):
+    from api.ebay import ebay_client
+
+    def get_items(item_ids):
+        raise AssertionError("eBay isn't available")
+
+    monkeypatch.setattr(ebay_client, "is_available", lambda: False)
+    monkeypatch.setattr(ebay_client, "get_items", get_items)
+    active = session.query(Listing).filter(Listing.is_active == True).count()
+
+    assert scanner.verify_top_opportunities() == {"checked": 0, "expired": 0, "reference_ids": []}
+    assert session.query(Listing).filter(Listing.is_active == True).count() == active
@@ -0,0 +1,64 @@
+"""
+Explorer typeahead: the queries the search docstring promises, the minimum
+query length, and a rebuild once the catalog generation moves.
+"""
+
+import pytest
+
+from config import Config
+from models import Brand, WatchReference, bump_generation
+from services.search import MIN_QUERY_CHARS, CatalogIndex
+
+
+@pytest.fixture
+def index(session):
+    index = CatalogIndex()
+    index.build(session)
+    return index
+
+
+@pytest.fixture
+def nautilus(session):
+    return session.query(WatchReference).filter(WatchReference.reference_number == "5711/1A-010").one()
+
+
+@pytest.mark.parametrize("query", ["5711 1a", "57111a", "nautilus 5711", "5711/1A-010", "Patek 5711"])
+def test_documented_queries(index, nautilus, query):
+    results = index.search(query)
+    assert results[0]["id"] == nautilus.id
+    assert results[0]["label"] == "Patek Philippe Nautilus Blue 5711/1A-010"
+
+
+def test_words_match_anywhere_in_the_key(index, nautilus):
+    assert nautilus.id in [entry["id"] for entry in index.search("blue nautilus")]
+    assert index.search("nautilus 126610") == []
+
+
+def test_minimum_query_length(index):
+    assert MIN_QUERY_CHARS == 2
+    assert index.search("5") == []
+    assert index.search(" 5 /-") == []  # Separators don't count
+    assert index.search("57") != []
+    assert len(index.search("ro", limit=5)) == 5
+
+
+def test_rebuild_when_the_catalog_generation_changes(session, monkeypatch):
+    monkeypatch.setattr(Config, "CATALOG_INDEX_CHECK_SECONDS", 0)
+    index = CatalogIndex()
+    index.ensure_loaded()
+    size = len(index)
+
+    brand = session.query(Brand).filter(Brand.name == "Patek Philippe").one()
+    session.add(WatchReference(brand_id=brand.id, reference_number="5811/1G-001", model_name="Nautilus Blue",
+                               collection="Nautilus"))
+    session.commit()
+
+    # Not picked up until the generation says the catalog changed
+    index.ensure_loaded()
+    assert index.search("5811") == []
+
+    bump_generation(session, "catalog")
+    session.commit()
+    index.ensure_loaded()
+    assert len(index) == size + 1
+    assert [entry["label"] for entry in index.search("5811")] == ["Patek Philippe Nautilus Blue 5811/1G-001"]
@@ -0,0 +1,81 @@
+"""
+Re-analysis keeps opportunity IDs: unchanged opportunities are left alone,
+changed ones are updated in place, and one that comes back after being
+retired is reactivated instead of duplicated.
+"""
+
+import pytest
+
+from models import ArbitrageOpportunity, Listing, bump_generation
+
+
+def _opportunities(session) -> dict:
+    return {
+        (opp.listing_id, opp.opportunity_type, opp.sell_platform): opp.id
+        for opp in session.query(ArbitrageOpportunity).filter(ArbitrageOpportunity.is_active == True)
+    }
+
+
+def _reprice(session, listing, price):
+    listing.price = listing.price_usd = price
+    bump_generation(session, "listings")
+    session.commit()
+
+
+@pytest.fixture
+def published(monkeypatch):
+    from services.events import event_broker
+
+    events = []
+    monkeypatch.setattr(event_broker, "publish", lambda event, data: events.append(data))
+    return events
+
+
+def test_reanalysis_keeps_ids(session, published):
+    from services.arbitrage import ArbitrageEngine
+
+    ArbitrageEngine(session).analyze_all()
+    before = _opportunities(session)
+    rows = session.query(ArbitrageOpportunity).count()
+    published.clear()
+
+    ArbitrageEngine(session).analyze_all()
+    assert _opportunities(session) == before
+    assert session.query(ArbitrageOpportunity).count() == rows
+    assert published == []
+
+
+def test_changed_opportunity_is_updated_in_place(session, published):
+    from services.arbitrage import ArbitrageEngine
+
+    ArbitrageEngine(session).analyze_all()
+    opportunity = session.query(ArbitrageOpportunity).filter(
+        ArbitrageOpportunity.is_active == True, ArbitrageOpportunity.opportunity_type == "undervalued"
+    ).order_by(ArbitrageOpportunity.id).first()
+    listing = session.get(Listing, opportunity.listing_id)
+    reference_id, opportunity_id, price = listing.watch_reference_id, opportunity.id, listing.price_usd
+    same_key = session.query(ArbitrageOpportunity).filter(
+        ArbitrageOpportunity.listing_id == listing.id, ArbitrageOpportunity.opportunity_type == "undervalued"
+    )
+
+    # Cheaper still: the same row, with the new figures
+    _reprice(session, listing, price - 100)
+    ArbitrageEngine(session).analyze_references([reference_id])
+    session.refresh(opportunity)
+    assert (opportunity.is_active, opportunity.buy_price) == (True, price - 100)
+    assert opportunity_id in published[-1]["updated"]
+    assert same_key.count() == 1
+
+    # Priced out, then back: retired, then the same row reactivated
+    _reprice(session, listing, price * 10)
+    ArbitrageEngine(session).analyze_references([reference_id])
+    session.refresh(opportunity)
+    assert not opportunity.is_active and opportunity.retired_at is not None
+    assert opportunity_id in published[-1]["retired"]
+
+    _reprice(session, listing, price)
+    ArbitrageEngine(session).analyze_references([reference_id])
+    session.refresh(opportunity)
+    assert (opportunity.is_active, opportunity.retired_at, opportunity.buy_price) == (True, None, price)
+    assert opportunity_id in published[-1]["added"]
+    assert same_key.count() == 1